@@ -0,0 +1,250 @@
+"""Auto Wi-Fi Changer entry point
+
+    python auto_wifi.py daemon --ssid Home [--interval 10] [--strategy connect,radio_cycle]
+    python auto_wifi.py daemon --ssid Home --fallback Phone --fallback Guest
+    python auto_wifi.py daemon --target wlan0=Home --target wlan1=Backhaul
+    python auto_wifi.py daemon --config auto_wifi.json
+    python auto_wifi.py daemon --ssid Home --metrics-port 9105
+    python auto_wifi.py ctl state|events|scan|rescan|pause|resume|watch
+    python auto_wifi.py ctl set-target Home [Phone ...]
+    python auto_wifi.py gui
+
+Only the gui subcommand imports Kivy. A running daemon serves its state on a
+Unix domain socket; ctl and the gui talk to it instead of probing again.
+"""
+import argparse
+import json
+import signal
+import sys
+import threading
+
+from backends import BACKENDS, detect_backend, get_backend
+from connection_store import DEFAULT_PATH, ConnectionStore
+from control import DEFAULT_SOCKET, SYSTEM_SOCKET, ControlClient, ControlServer, socket_paths
+from eventlog import EventLog
+from metrics import Metrics
+from monitor import ConnectionMonitor, Supervisor
+from recovery import DEFAULT_STEPS, RecoveryStep
+from roaming import RoamPolicy
+from scheduler import AdaptiveInterval
+
+DEFAULTS = {
+    "ssid": None,
+    "fallbacks": None,
+    "targets": None,
+    "interval": 10,
+    "min_interval": None,
+    "max_interval": None,
+    "strategy": None,
+    "backend": None,
+    "log_file": None,
+    "events": True,
+    "metrics_port": None,
+    "roaming": True,
+    "state_file": DEFAULT_PATH,
+    "control_socket": DEFAULT_SOCKET,
+    "socket_group": None,
+}
+
+
+def parse_strategy(value):
+    """Turn "connect,radio_cycle:20" (or a list of the same) into recovery steps"""
+    timeouts = {step.name: step.timeout for step in DEFAULT_STEPS}
+    items = value.split(',') if isinstance(value, str) else value
+    steps = []
+    for item in items:
+        name, _, timeout = str(item).strip().partition(':')
+        if name not in timeouts:
+            raise ValueError(f"unknown recovery step {name!r}; choose from {', '.join(timeouts)}")
+        steps.append(RecoveryStep(name, float(timeout) if timeout else timeouts[name]))
+    return steps
+
+
+def parse_targets(value):
+    """Turn ["wlan0=Home", ...] (or a {"wlan0": "Home"} mapping) into (interface, ssid) pairs"""
+    if isinstance(value, dict):
+        return list(value.items())
+    targets = []
+    for item in value:
+        interface, sep, ssid = item.partition('=')
+        if not sep or not interface or not ssid:
+            raise ValueError(f"bad target {item!r}; expected INTERFACE=SSID")
+        targets.append((interface, ssid))
+    return targets
+
+
+def load_config(args):
+    """Merge defaults, the JSON config file and command line flags, in that order"""
+    config = dict(DEFAULTS)
+    if args.config:
+        with open(args.config, encoding="utf-8") as f:
+            config.update(json.load(f))
+    for key in DEFAULTS:
+        value = getattr(args, key, None)
+        if value is not None:
+            config[key] = value
+    return config
+
+
+def run_daemon(config):
+    if not config["ssid"] and not config["targets"]:
+        sys.exit("No SSID configured; pass --ssid or --target, or set them in the config file")
+    try:
+        steps = parse_strategy(config["strategy"]) if config["strategy"] else DEFAULT_STEPS
+        targets = parse_targets(config["targets"]) if config["targets"] else None
+    except ValueError as e:
+        sys.exit(str(e))
+    backend = get_backend(config["backend"]) if config["backend"] else detect_backend()
+    if backend is None:
+        sys.exit("No supported Wi-Fi backend found")
+
+    roaming = RoamPolicy() if config["roaming"] else None
+    interval = config["interval"]
+    if config["min_interval"] or config["max_interval"]:
+        interval = AdaptiveInterval(start=config["interval"], min_interval=config["min_interval"] or 2,
+                                    max_interval=config["max_interval"] or 60)
+    log = EventLog(path=config["log_file"])
+    log.subscribe(lambda event: print(event.format(), flush=True))
+    store = ConnectionStore(config["state_file"], notify=lambda message: log.emit(message, "warning", "store")) \
+        if config["state_file"] else None
+    if config["metrics_port"]:
+        backend.metrics = Metrics()
+        try:
+            backend.metrics.serve(int(config["metrics_port"]))
+        except OSError as e:
+            sys.exit(f"Cannot serve metrics on port {config['metrics_port']}: {e}")
+        log.emit(f"Serving Prometheus metrics on http://127.0.0.1:{config['metrics_port']}/metrics")
+    # systemd stops services with SIGTERM; leave through the normal exit path
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    if targets:
+        supervisor = Supervisor(backend, targets, interval=interval, log=log, steps=steps,
+                                roaming=roaming, store=store)
+        log.emit(f"Supervising {', '.join(f'{i}={s}' for i, s in targets)} with {backend.name}")
+        if config["events"] and supervisor.watch_events():
+            log.emit("Following link state events")
+        try:
+            supervisor.run()
+        finally:
+            log.close()
+        return
+
+    monitor = ConnectionMonitor(backend, interval=interval, log=log, steps=steps, roaming=roaming,
+                                store=store)
+    pace = (f"every {interval.min_interval:g}-{interval.max_interval:g}s" if isinstance(interval, AdaptiveInterval)
+            else f"every {interval}s")
+    log.emit(f"Monitoring {config['ssid']} with {backend.name} {pace}")
+    if config["events"] and monitor.watch_events():
+        log.emit("Following link state events")
+    monitor.set_targets([config["ssid"], *(config["fallbacks"] or [])])
+    control = ControlServer(monitor, config["control_socket"], group=config["socket_group"]) \
+        if config["control_socket"] else None
+    try:
+        if control and control.start():
+            log.emit(f"Serving the control socket on {control.path}")
+    except OSError as e:
+        sys.exit(f"Cannot serve the control socket: {e}")
+    try:
+        monitor.run()
+    finally:
+        if control:
+            control.stop()
+        monitor.stop(timeout=0)
+        log.close()
+
+
+CTL_COMMANDS = {"state": "state", "events": "events", "scan": "scan", "rescan": "rescan", "pause": "pause",
+                "resume": "resume", "set-target": "set_target"}
+
+
+def run_ctl(args):
+    client, blocked = ControlClient.find(args.socket)
+    if client is None:
+        if blocked:
+            sys.exit(f"Cannot use the monitor socket {blocked}; ask for its group or pass --socket")
+        sys.exit(f"No monitor is serving {args.socket or ' or '.join(socket_paths())}; "
+                 "start one with: auto_wifi.py daemon")
+    if args.action == "watch":
+        client.subscribe(lambda message: print(json.dumps(message), flush=True))
+        threading.Event().wait()
+    extra = {}
+    if args.action == "set-target":
+        if not args.ssids:
+            sys.exit("set-target needs at least one SSID")
+        extra["ssids"] = args.ssids
+    elif args.action == "events":
+        extra["count"] = args.count
+    elif args.action == "scan":
+        extra["fresh"] = args.fresh
+    reply = client.request(CTL_COMMANDS[args.action], **extra)
+    client.close()
+    print(json.dumps(reply, indent=1))
+    if not reply.get("ok"):
+        sys.exit(1)
+
+
+def run_gui(config):
+    # Kivy is heavy to import and opens a window, so it is only loaded here
+    from main_V3 import WiFiManager
+    WiFiManager().run()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="auto_wifi", description="Keep a Wi-Fi connection on the network you chose.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    daemon = commands.add_parser("daemon", help="monitor without a GUI")
+    daemon.add_argument("--config", help="JSON file with ssid or targets, interval, strategy, backend and log_file")
+    daemon.add_argument("--ssid", help="network to stay connected to")
+    daemon.add_argument("--fallback", dest="fallbacks", action="append", metavar="SSID",
+                        help="acceptable network when the preferred one is gone; repeat in order of preference")
+    daemon.add_argument("--target", dest="targets", action="append", metavar="INTERFACE=SSID",
+                        help="supervise this interface; repeat for several radios")
+    daemon.add_argument("--interval", type=float, help="seconds between checks (default 10)")
+    daemon.add_argument("--min-interval", dest="min_interval", type=float,
+                        help="adapt the interval to link stability, never checking more often than this")
+    daemon.add_argument("--max-interval", dest="max_interval", type=float,
+                        help="adapt the interval to link stability, never waiting longer than this")
+    daemon.add_argument("--strategy", help="comma separated recovery steps, optionally name:timeout")
+    daemon.add_argument("--backend", choices=sorted(BACKENDS), help="skip auto-detection")
+    daemon.add_argument("--log-file", dest="log_file", help="append events to this rotated JSONL file")
+    daemon.add_argument("--no-events", dest="events", action="store_false", default=None,
+                        help="poll only, do not follow link state events")
+    daemon.add_argument("--state-file", dest="state_file",
+                        help=f"remember working BSSIDs and connect times here (default {DEFAULT_PATH})")
+    daemon.add_argument("--no-roaming", dest="roaming", action="store_false", default=None,
+                        help="stay on the current BSSID even when a stronger one is in range")
+    daemon.add_argument("--metrics-port", dest="metrics_port", type=int,
+                        help="serve Prometheus metrics on this localhost port")
+    daemon.add_argument("--control-socket", dest="control_socket",
+                        help=f"serve the JSON control API on this Unix socket (default {DEFAULT_SOCKET})")
+    daemon.add_argument("--socket-group", dest="socket_group",
+                        help="let this group use the control socket (mode 0660), e.g. for a root daemon on "
+                             f"{SYSTEM_SOCKET}")
+    daemon.set_defaults(func=run_daemon)
+
+    ctl = commands.add_parser("ctl", help="query or steer a running daemon")
+    ctl.add_argument("action", choices=[*CTL_COMMANDS, "watch"])
+    ctl.add_argument("ssids", nargs="*", help="networks for set-target, most preferred first")
+    ctl.add_argument("--count", type=int, default=20, help="number of events to show")
+    ctl.add_argument("--fresh", action="store_true", help="scan now instead of returning the cached scan")
+    ctl.add_argument("--socket", help=f"the daemon's socket (default: try {' then '.join(socket_paths())})")
+    ctl.set_defaults(func=run_ctl)
+
+    gui = commands.add_parser("gui", help="open the Kivy window")
+    gui.set_defaults(func=run_gui, config=None)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == "ctl":
+        run_ctl(args)
+    else:
+        args.func(load_config(args))
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\nScript stopped by user.")
@@ -0,0 +1,685 @@
+import copy
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from typing import NamedTuple, Optional
+
+from parsers import (NMCLI_SCAN_FIELDS, ScanRecord, dbm_to_percent, normalize_bssid, parse_airport_scan,
+                     parse_key_values, parse_netsh_interfaces, parse_netsh_networks, parse_nmcli_scan,
+                     parse_nmcli_terse)
+
+AIRPORT = "/System/Library/PrivateFrameworks/Apple80211.framework/Versions/Current/Resources/airport"
+
+# Keep Windows from flashing a console window for every command
+_CREATION_FLAGS = getattr(subprocess, "CREATE_NO_WINDOW", 0)
+
+
+class LinkSnapshot(NamedTuple):
+    """Radio state and active link, collected in one backend query"""
+    powered: bool
+    ssid: Optional[str] = None
+    bssid: Optional[str] = None
+    signal: Optional[int] = None  # percent, 0-100
+
+
+BACKENDS = {}
+
+
+class SharedState:
+    """Probe cache and counters shared by a backend and its per-interface views"""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.snapshots = {}  # interface -> (taken_at, LinkSnapshot)
+        self.scans = {}  # interface -> (taken_at, [ScanRecord])
+        self.interfaces = None
+        self.spawn_count = 0
+        self.spawn_time = 0.0
+        self.metrics = None  # metrics.Metrics, when exporting
+
+
+def register_backend(cls):
+    """Class decorator adding a backend to the registry under its name"""
+    BACKENDS[cls.name] = cls
+    return cls
+
+
+class WifiBackend:
+    """OS commands as argv lists, with a short-lived cache of the link snapshot"""
+
+    name = None
+    os_type = None
+    # sys.platform prefixes this backend can be auto-detected on
+    platforms = ()
+    # Among backends that probe successfully, the highest preference wins
+    preference = 0
+    default_interface = None
+    # Optional recovery actions: "bssid_connect", "rescan", "radio", "interface"
+    capabilities = frozenset()
+    # Capabilities whose actions hit every interface at once; views bound to one interface drop them
+    global_capabilities = frozenset()
+    # Long-running command whose output reports link state changes, if any
+    event_command = None
+
+    # Time source for the snapshot cache and probe timings
+    clock = staticmethod(time.monotonic)
+
+    def __init__(self, interface=None, ttl=1.0):
+        self._interface = interface
+        self.ttl = ttl
+        self._shared = SharedState()
+
+    @property
+    def spawn_count(self):
+        """Processes spawned by this backend and all its views"""
+        return self._shared.spawn_count
+
+    @property
+    def spawn_time(self):
+        return self._shared.spawn_time
+
+    @property
+    def metrics(self):
+        """Metrics sink shared with every view, or None"""
+        return self._shared.metrics
+
+    @metrics.setter
+    def metrics(self, metrics):
+        self._shared.metrics = metrics
+
+    def _observe_probe(self, probe, started):
+        if self._shared.metrics:
+            self._shared.metrics.observe_probe(probe, self.clock() - started)
+
+    def for_interface(self, interface):
+        """A view of this backend bound to interface; probes and counters stay shared"""
+        view = copy.copy(self)
+        view._interface = interface
+        view.capabilities = self.capabilities - self.global_capabilities
+        return view
+
+    @classmethod
+    def probe(cls):
+        """Whether the tools this backend needs exist on this machine"""
+        return False
+
+    def probe_capabilities(self):
+        """Capabilities that actually work here; called once at detection"""
+        return set(self.capabilities)
+
+    @property
+    def interface(self):
+        """The interface to manage: the one given, else the first one discovered"""
+        if self._interface is None:
+            found = self.interfaces()
+            self._interface = found[0] if found else self.default_interface
+        return self._interface
+
+    def interfaces(self):
+        """Wireless interface names, discovered once and cached"""
+        shared = self._shared
+        if shared.interfaces is None:
+            try:
+                shared.interfaces = self.discover_interfaces()
+            except (subprocess.CalledProcessError, OSError):
+                shared.interfaces = []
+        return shared.interfaces
+
+    def discover_interfaces(self):
+        return []
+
+    def run(self, argv):
+        """Run a command without a shell and return its output"""
+        start = time.monotonic()
+        self._shared.spawn_count += 1
+        try:
+            return subprocess.check_output(
+                argv, text=True, stderr=subprocess.DEVNULL, creationflags=_CREATION_FLAGS
+            )
+        finally:
+            self._shared.spawn_time += time.monotonic() - start
+
+    def stream(self, argv):
+        """Run a command without a shell and yield its output line by line"""
+        start = time.monotonic()
+        self._shared.spawn_count += 1
+        try:
+            with subprocess.Popen(argv, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+                                  creationflags=_CREATION_FLAGS) as proc:
+                yield from proc.stdout
+        finally:
+            self._shared.spawn_time += time.monotonic() - start
+
+    def call(self, argv):
+        """Run an action command; the cached snapshot is stale afterwards"""
+        start = time.monotonic()
+        self._shared.spawn_count += 1
+        try:
+            return subprocess.call(
+                argv, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, creationflags=_CREATION_FLAGS
+            )
+        except OSError:
+            return -1
+        finally:
+            self._shared.spawn_time += time.monotonic() - start
+            self.invalidate()
+
+    def snapshot(self, max_age=None):
+        """Return the link snapshot, reusing one taken within the TTL
+
+        Batch-capable backends refresh every interface with the same query,
+        so views supervising other interfaces get their answer for free.
+        """
+        max_age = self.ttl if max_age is None else max_age
+        interface = self.interface
+        shared = self._shared
+        with shared.lock:
+            now = self.clock()
+            cached = shared.snapshots.get(interface)
+            if cached is None or now - cached[0] > max_age:
+                try:
+                    found = self.query_snapshots()
+                except (subprocess.CalledProcessError, OSError):
+                    found = {}
+                self._observe_probe("snapshot", now)
+                for name, snap in found.items():
+                    shared.snapshots[name] = (now, snap)
+                # An interface missing from the answer is disabled or gone
+                cached = shared.snapshots[interface] = (now, found.get(interface, LinkSnapshot(powered=False)))
+            return cached[1]
+
+    def cached_snapshot(self):
+        """(age in seconds, LinkSnapshot) from the cache without probing, or None"""
+        with self._shared.lock:
+            cached = self._shared.snapshots.get(self.interface)
+        return None if cached is None else (self.clock() - cached[0], cached[1])
+
+    def invalidate(self):
+        """Drop the cached snapshot of this interface"""
+        with self._shared.lock:
+            self._shared.snapshots.pop(self.interface, None)
+
+    def forget_link(self):
+        """Drop everything cached about this interface's link; the OS just reported a change"""
+        self.invalidate()
+
+    def query_snapshots(self):
+        """Snapshots by interface name
+
+        Backends whose one query covers every interface (netsh, nmcli) return
+        them all, and snapshot() caches each so other views read it for free.
+        """
+        return {self.interface: self.query_snapshot()}
+
+    def query_snapshot(self):
+        raise NotImplementedError
+
+    def scan(self):
+        """Return a list of ScanRecord, one per BSSID"""
+        started = self.clock()
+        try:
+            records = list(self.iter_scan())
+        except OSError:
+            records = []
+        self._observe_probe("scan", started)
+        with self._shared.lock:
+            self._shared.scans[self.interface] = (self.clock(), records)
+        return records
+
+    def cached_scan(self, max_age=None):
+        """The records of the last scan taken within max_age seconds, or None"""
+        with self._shared.lock:
+            cached = self._shared.scans.get(self.interface)
+        if cached is None or (max_age is not None and self.clock() - cached[0] > max_age):
+            return None
+        return cached[1]
+
+    def iter_scan(self):
+        """Yield ScanRecord as the scan output streams in"""
+        return self.parse_scan(self.stream(self.scan_command()))
+
+    def scan_command(self):
+        raise NotImplementedError
+
+    def parse_scan(self, lines):
+        raise NotImplementedError
+
+    def has_ip(self):
+        """Whether the interface holds a usable IPv4 address"""
+        started = self.clock()
+        try:
+            return self.query_has_ip()
+        except (subprocess.CalledProcessError, OSError):
+            return False
+        finally:
+            self._observe_probe("has_ip", started)
+
+    def query_has_ip(self):
+        raise NotImplementedError
+
+    def connect(self, ssid, bssid=None):
+        raise NotImplementedError
+
+    def rescan(self):
+        """Ask the driver for a fresh scan"""
+        self.scan()
+
+    def enable(self):
+        raise NotImplementedError
+
+    def disable(self):
+        raise NotImplementedError
+
+    def interface_down(self):
+        raise NotImplementedError
+
+    def interface_up(self):
+        raise NotImplementedError
+
+
+@register_backend
+class WindowsBackend(WifiBackend):
+    name = "windows"
+    os_type = "Windows"
+    platforms = ("win32",)
+    default_interface = "Wi-Fi"
+    # netsh has no radio switch or BSSID-pinned connect; enable/disable act on the interface
+    capabilities = frozenset({"interface"})
+
+    def query_snapshots(self):
+        # A disabled adapter drops out of `show interfaces` entirely, which
+        # snapshot() reports as powered down
+        result = self.run(["netsh", "wlan", "show", "interfaces"])
+        return {block.get("Name"): self.block_snapshot(block)
+                for block in parse_netsh_interfaces(result.split('\n'))}
+
+    @staticmethod
+    def block_snapshot(fields):
+        """LinkSnapshot from one interface block of `netsh wlan show interfaces`"""
+        if fields.get("State", "").lower() != "connected":
+            return LinkSnapshot(powered=True)
+        signal = fields.get("Signal", "").rstrip('%')
+        bssid = fields.get("BSSID") or fields.get("AP BSSID")
+        return LinkSnapshot(
+            powered=True,
+            ssid=fields.get("SSID") or None,
+            bssid=normalize_bssid(bssid),
+            signal=int(signal) if signal.isdigit() else None,
+        )
+
+    def query_has_ip(self):
+        result = self.run(["netsh", "interface", "ipv4", "show", "addresses", f"name={self.interface}"])
+        return any(key == "IP Address" and not value.startswith("169.254.")
+                   for key, value in parse_key_values(result.split('\n')))
+
+    def scan_command(self):
+        # Only what this adapter sees; another radio's APs are no use to it
+        return ["netsh", "wlan", "show", "networks", f"interface={self.interface}", "mode=bssid"]
+
+    def parse_scan(self, lines):
+        return parse_netsh_networks(lines)
+
+    def connect(self, ssid, bssid=None):
+        self.call(["netsh", "wlan", "connect", f"name={ssid}", f"ssid={ssid}", f"interface={self.interface}"])
+
+    def enable(self):
+        self.call(["netsh", "interface", "set", "interface", self.interface, "enable"])
+
+    def disable(self):
+        self.call(["netsh", "interface", "set", "interface", self.interface, "disable"])
+
+    interface_up = enable
+    interface_down = disable
+
+    @classmethod
+    def probe(cls):
+        return shutil.which("netsh") is not None
+
+    def discover_interfaces(self):
+        result = self.run(["netsh", "wlan", "show", "interfaces"])
+        return [block["Name"] for block in parse_netsh_interfaces(result.split('\n'))]
+
+
+@register_backend
+class MacBackend(WifiBackend):
+    name = "macos"
+    os_type = "macOS"
+    platforms = ("darwin",)
+    default_interface = "en0"
+    capabilities = frozenset({"rescan", "radio", "interface"})
+
+    def query_snapshot(self):
+        fields = dict(parse_key_values(self.run([AIRPORT, "-I"]).split('\n')))
+        if fields.get("AirPort") == "Off":
+            return LinkSnapshot(powered=False)
+        rssi = fields.get("agrCtlRSSI")
+        return LinkSnapshot(
+            powered=True,
+            ssid=fields.get("SSID") or None,
+            bssid=normalize_bssid(fields.get("BSSID")),
+            signal=dbm_to_percent(rssi) if rssi and fields.get("SSID") else None,
+        )
+
+    def query_has_ip(self):
+        address = self.run(["ipconfig", "getifaddr", self.interface]).strip()
+        return bool(address) and not address.startswith("169.254.")
+
+    def scan_command(self):
+        return [AIRPORT, "-s"]
+
+    def parse_scan(self, lines):
+        return parse_airport_scan(lines)
+
+    def connect(self, ssid, bssid=None):
+        self.call(["networksetup", "-setairportnetwork", self.interface, ssid])
+
+    def enable(self):
+        self.call(["networksetup", "-setairportpower", self.interface, "on"])
+
+    def disable(self):
+        self.call(["networksetup", "-setairportpower", self.interface, "off"])
+
+    def interface_down(self):
+        self.call(["ifconfig", self.interface, "down"])
+
+    def interface_up(self):
+        self.call(["ifconfig", self.interface, "up"])
+
+    @classmethod
+    def probe(cls):
+        return os.path.exists(AIRPORT) and shutil.which("networksetup") is not None
+
+    def probe_capabilities(self):
+        capabilities = super().probe_capabilities()
+        if os.geteuid() != 0:
+            # ifconfig down/up needs root
+            capabilities.discard("interface")
+        return capabilities
+
+    def discover_interfaces(self):
+        result = self.run(["networksetup", "-listallhardwareports"])
+        found, is_wifi = [], False
+        for line in result.split('\n'):
+            key, _, value = line.partition(':')
+            if key.strip() == "Hardware Port":
+                is_wifi = value.strip() in ("Wi-Fi", "AirPort")
+            elif key.strip() == "Device" and is_wifi:
+                found.append(value.strip())
+        return found
+
+
+@register_backend
+class NmcliBackend(WifiBackend):
+    name = "nmcli"
+    os_type = "Linux"
+    platforms = ("linux",)
+    event_command = ("nmcli", "device", "monitor")
+    capabilities = frozenset({"bssid_connect", "rescan", "radio", "interface"})
+    # `nmcli radio wifi off` switches off every wireless device
+    global_capabilities = frozenset({"radio"})
+
+    def query_snapshots(self):
+        fields = ("DEVICE", "ACTIVE", "SSID", "BSSID", "SIGNAL")
+        result = self.run(["nmcli", "-t", "-f", ",".join(fields), "device", "wifi", "list", "--rescan", "no"])
+        found = {}
+        for row in parse_nmcli_terse(result.split('\n'), fields):
+            if row["ACTIVE"] == "yes":
+                found[row["DEVICE"]] = LinkSnapshot(
+                    powered=True,
+                    ssid=row["SSID"] or None,
+                    bssid=normalize_bssid(row["BSSID"]),
+                    signal=int(row["SIGNAL"]) if row["SIGNAL"].isdigit() else None,
+                )
+        idle = [name for name in {*self.interfaces(), self.interface} if name not in found]
+        if idle:
+            # Only interfaces without a link need a second query to tell "off" from "idle"
+            radio = self.run(["nmcli", "radio", "wifi"])
+            for name in idle:
+                found[name] = LinkSnapshot(powered="disabled" not in radio.lower())
+        return found
+
+    @classmethod
+    def probe(cls):
+        return shutil.which("nmcli") is not None
+
+    def discover_interfaces(self):
+        result = self.run(["nmcli", "-t", "-f", "DEVICE,TYPE", "device"])
+        return [row["DEVICE"] for row in parse_nmcli_terse(result.split('\n'), ("DEVICE", "TYPE"))
+                if row["TYPE"] == "wifi"]
+
+    def query_has_ip(self):
+        device = self.interface
+        if not device:
+            return False
+        return bool(self.run(["nmcli", "-g", "IP4.ADDRESS", "device", "show", device]).strip())
+
+    def scan_command(self):
+        # Only what this device sees; another radio's APs are no use to it
+        return ["nmcli", "-t", "-f", ",".join(NMCLI_SCAN_FIELDS), "device", "wifi", "list"] + self._ifname()
+
+    def parse_scan(self, lines):
+        return parse_nmcli_scan(lines)
+
+    def _ifname(self):
+        device = self.interface
+        return ["ifname", device] if device else []
+
+    def connect(self, ssid, bssid=None):
+        argv = ["nmcli", "device", "wifi", "connect", ssid]
+        if bssid:
+            argv += ["bssid", bssid]
+        self.call(argv + self._ifname())
+
+    def rescan(self):
+        self.call(["nmcli", "device", "wifi", "rescan"] + self._ifname())
+
+    def enable(self):
+        self.call(["nmcli", "radio", "wifi", "on"])
+
+    def disable(self):
+        self.call(["nmcli", "radio", "wifi", "off"])
+
+    def interface_down(self):
+        device = self.interface
+        if device:
+            self.call(["nmcli", "device", "disconnect", device])
+
+    def interface_up(self):
+        device = self.interface
+        if device:
+            self.call(["nmcli", "device", "connect", device])
+
+
+@register_backend
+class LinuxNativeBackend(NmcliBackend):
+    """Read link state from sysfs/procfs; nmcli is only used for the SSID and actions"""
+
+    name = "linux-native"
+    preference = 1
+
+    def __init__(self, interface=None, ttl=1.0, sysfs_root="/sys", procfs_root="/proc", ssid_ttl=30.0):
+        super().__init__(interface, ttl)
+        self.sysfs_root = sysfs_root
+        self.procfs_root = procfs_root
+        self.ssid_ttl = ssid_ttl
+        # device -> (taken_at, LinkSnapshot) from the last nmcli query; shared with views
+        self._links = {}
+
+    def _read(self, *parts):
+        try:
+            with open(os.path.join(*parts)) as f:
+                return f.read().strip()
+        except OSError:
+            return None
+
+    def _net(self, *parts):
+        return os.path.join(self.sysfs_root, "class", "net", *parts)
+
+    @classmethod
+    def probe(cls):
+        return super().probe() and bool(cls().discover_interfaces(native_only=True))
+
+    def discover_interfaces(self, native_only=False):
+        """Interfaces with a wireless sysfs entry, falling back to nmcli"""
+        try:
+            names = sorted(os.listdir(self._net()))
+        except OSError:
+            names = []
+        found = [name for name in names
+                 if os.path.isdir(self._net(name, "wireless")) or os.path.isdir(self._net(name, "phy80211"))]
+        if found or native_only:
+            return found
+        return super().discover_interfaces()
+
+    def radio_blocked(self, device=None):
+        """True/False from the rfkill switch of device's own radio, None if unknown"""
+        phy = self._net(device or self.interface, "phy80211")
+        try:
+            names = [name for name in os.listdir(phy) if name.startswith("rfkill")]
+        except OSError:
+            return None
+        if not names:
+            return None
+        # A platform kill switch shows up in the hard state of every radio it cuts
+        return any(self._read(phy, name, "soft") == "1" or self._read(phy, name, "hard") == "1" for name in names)
+
+    def link_signal(self, device):
+        """Signal level of device from /proc/net/wireless, as a percentage"""
+        table = self._read(self.procfs_root, "net", "wireless")
+        for line in (table or "").split('\n')[2:]:
+            name, _, values = line.partition(':')
+            if name.strip() == device:
+                fields = values.split()
+                if len(fields) >= 3:
+                    level = float(fields[2].rstrip('.'))
+                    # Some drivers report unsigned levels (256-based)
+                    return dbm_to_percent(level - 256 if level > 0 else level)
+        return None
+
+    # sysfs reads are cheap, so every interface answers for itself
+    def query_snapshots(self):
+        return {self.interface: self.query_snapshot()}
+
+    def nmcli_snapshot(self, device):
+        """Ask nmcli about every device at once and remember the answers"""
+        now = self.clock()
+        for name, snap in super().query_snapshots().items():
+            self._links[name] = (now, snap)
+        return self._links.get(device, (now, LinkSnapshot(powered=False)))[1]
+
+    def query_snapshot(self):
+        device = self.interface
+        operstate = self._read(self._net(device, "operstate")) if device else None
+        if operstate is None:
+            return self.nmcli_snapshot(device)
+        blocked = self.radio_blocked(device)
+        if blocked:
+            self._links.pop(device, None)
+            return LinkSnapshot(powered=False)
+        if operstate != "up" or self._read(self._net(device, "carrier")) != "1":
+            self._links.pop(device, None)
+            if blocked is None:
+                # rfkill unavailable: let nmcli tell "off" from "idle"
+                return self.nmcli_snapshot(device)
+            return LinkSnapshot(powered=True)
+        # The link is up; only ask nmcli for the SSID when it is not already known
+        taken_at, link = self._links.get(device, (0.0, None))
+        if link is None or link.ssid is None or self.clock() - taken_at > self.ssid_ttl:
+            link = self.nmcli_snapshot(device)
+        return link._replace(powered=True, signal=self.link_signal(device) or link.signal)
+
+    def query_has_ip(self):
+        device = self.interface
+        routes = self._read(self.procfs_root, "net", "route")
+        if routes is None:
+            return super().query_has_ip()
+        return any(line.split('\t', 1)[0] == device for line in routes.split('\n')[1:])
+
+    def forget_link(self):
+        # A foreign SSID can come up between probes without the carrier ever reading down
+        self._links.pop(self.interface, None)
+        super().forget_link()
+
+    def call(self, argv):
+        self._links.clear()
+        return super().call(argv)
+
+
+@register_backend
+class FakeBackend(WifiBackend):
+    """In-memory backend for tests and simulations; every action applies at once"""
+
+    name = "fake"
+    os_type = "Fake"
+    default_interface = "wlan0"
+    capabilities = frozenset({"bssid_connect", "rescan", "radio", "interface"})
+
+    def __init__(self, networks=(), interface=None, ttl=0.0):
+        super().__init__(interface, ttl)
+        # ScanRecord (or ssid, bssid, signal tuples) currently in range
+        self.networks = [ScanRecord(*network) for network in networks]
+        self.powered = True
+        self.link = None
+        self.actions = []
+
+    def discover_interfaces(self):
+        return [self.default_interface]
+
+    def query_snapshot(self):
+        if not self.powered:
+            return LinkSnapshot(powered=False)
+        if self.link is None:
+            return LinkSnapshot(powered=True)
+        return LinkSnapshot(True, *self.link)
+
+    def query_has_ip(self):
+        return self.link is not None
+
+    def iter_scan(self):
+        return iter(self.networks if self.powered else [])
+
+    def connect(self, ssid, bssid=None):
+        self.actions.append("connect")
+        self.invalidate()
+        candidates = [n for n in self.networks if n.ssid == ssid and bssid in (None, n.bssid)]
+        if self.powered and candidates:
+            best = max(candidates, key=lambda n: n.signal or 0)
+            self.link = (best.ssid, best.bssid, best.signal)
+
+    def rescan(self):
+        self.actions.append("rescan")
+
+    def enable(self):
+        self.actions.append("enable")
+        self.powered = True
+        self.invalidate()
+
+    def disable(self):
+        self.actions.append("disable")
+        self.powered = False
+        self.link = None
+        self.invalidate()
+
+    interface_up = enable
+    interface_down = disable
+
+
+def get_backend(name, **kwargs):
+    """Create a backend by its registered name, or None if it is unknown"""
+    backend = BACKENDS.get(name)
+    return backend(**kwargs) if backend else None
+
+
+def detect_backend(platform=None, **kwargs):
+    """Pick the preferred backend that supports this platform and probes successfully"""
+    platform = platform or sys.platform
+    candidates = [cls for cls in BACKENDS.values()
+                  if any(platform.startswith(p) for p in cls.platforms) and cls.probe()]
+    if not candidates:
+        return None
+    backend = max(candidates, key=lambda cls: cls.preference)(**kwargs)
+    backend.capabilities = frozenset(backend.probe_capabilities())
+    return backend
@@ -0,0 +1,80 @@
+"""Scan parser throughput on synthetic scans with thousands of BSSIDs
+
+    python benchmarks/bench_parsers.py [--bssids 5000] [--repeat 5]
+
+Each scan is built from the row shapes in tests/fixtures: SSIDs with spaces
+and colons, escaped '\\:' BSSIDs in nmcli terse output, and several BSSIDs
+per SSID in netsh blocks.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from parsers import parse_airport_scan, parse_netsh_networks, parse_nmcli_scan  # noqa: E402
+
+BSSIDS_PER_SSID = 4
+
+
+def bssid(i):
+    return ":".join(f"{b:02x}" for b in (0xaa, 0xbb, i >> 16 & 0xff, i >> 8 & 0xff, i & 0xff, 0x01))
+
+
+def ssid(i):
+    return f"Net {i // BSSIDS_PER_SSID}: floor {i % 7}"
+
+
+def netsh_scan(count):
+    lines = ["", "Interface name : Wi-Fi", f"There are {count // BSSIDS_PER_SSID} networks currently visible.", ""]
+    for i in range(count):
+        if i % BSSIDS_PER_SSID == 0:
+            lines += [f"SSID {i // BSSIDS_PER_SSID + 1} : {ssid(i)}", "    Network type            : Infrastructure",
+                      "    Authentication          : WPA2-Personal", "    Encryption              : CCMP"]
+        lines += [f"    BSSID {i % BSSIDS_PER_SSID + 1}                 : {bssid(i).upper()}",
+                  f"         Signal             : {i % 100}%", "         Radio type         : 802.11ac",
+                  f"         Channel            : {(1, 6, 11, 36, 149)[i % 5]}",
+                  "         Basic rates (Mbps) : 6 12 24"]
+    return [line + "\n" for line in lines]
+
+
+def airport_scan(count):
+    lines = ["                            SSID BSSID             RSSI CHANNEL HT CC SECURITY (auth/unicast/group)"]
+    lines += [f"{ssid(i):>32} {bssid(i)} {-40 - i % 50:<4} {(1, 6, 11, 36, 149)[i % 5]:<7} Y  US WPA2(PSK/AES/AES)"
+              for i in range(count)]
+    return [line + "\n" for line in lines]
+
+
+def nmcli_scan(count):
+    return [f"{ssid(i).replace(':', chr(92) + ':')}:{bssid(i).upper().replace(':', chr(92) + ':')}:{i % 100}:"
+            f"{(1, 6, 11, 36, 149)[i % 5]}:{(2412, 2437, 2462, 5180, 5745)[i % 5]} MHz:WPA2\n" for i in range(count)]
+
+
+PARSERS = (
+    ("netsh", netsh_scan, parse_netsh_networks),
+    ("airport", airport_scan, parse_airport_scan),
+    ("nmcli", nmcli_scan, parse_nmcli_scan),
+)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure scan parser throughput.")
+    parser.add_argument("--bssids", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    print(f"{'Parser':<10}{'BSSIDs':>8}{'Lines':>8}{'Best':>11}{'BSSIDs/s':>12}")
+    for name, build, parse in PARSERS:
+        lines = build(args.bssids)
+        best = float("inf")
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            records = list(parse(lines))
+            best = min(best, time.perf_counter() - started)
+        assert len(records) == args.bssids, f"{name}: parsed {len(records)} of {args.bssids}"
+        print(f"{name:<10}{len(records):>8}{len(lines):>8}{best * 1000:>9.2f}ms{len(records) / best:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Cost of building and diffing the network table at about 1k rows
+
+    python benchmarks/bench_rows.py [--rows 1000] [--repeat 20]
+
+network_rows turns a scan into table rows; diff_rows merges the next scan
+into the rows already on screen. The scenarios cover a rescan that changed
+nothing, one where every signal moved, and one where a tenth of the BSSIDs
+came and went.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from network_table import diff_rows, network_rows  # noqa: E402
+from parsers import ScanRecord  # noqa: E402
+
+BSSIDS_PER_SSID = 3
+
+
+def make_scan(rows, rng):
+    """Records yielding about `rows` table rows: one per SSID plus one per BSSID"""
+    networks = rows // (BSSIDS_PER_SSID + 1)
+    return [ScanRecord(f"Net {n}", f"aa:bb:cc:{n >> 8 & 0xff:02x}:{n & 0xff:02x}:{b:02x}", rng.randint(1, 100),
+                       (1, 6, 11, 36, 149)[b % 5], "2.4 GHz" if b % 5 < 3 else "5 GHz", "WPA2")
+            for n in range(networks) for b in range(BSSIDS_PER_SSID)]
+
+
+def jitter(records, rng):
+    return [record._replace(signal=max(1, min(100, record.signal + rng.randint(-5, 5)))) for record in records]
+
+
+def churn(records, rng, fraction=0.1):
+    kept = [record for record in records if rng.random() >= fraction]
+    extra = len(records) - len(kept)
+    return kept + [ScanRecord(f"New {i}", f"cc:dd:ee:00:{i >> 8 & 0xff:02x}:{i & 0xff:02x}", rng.randint(1, 100))
+                   for i in range(extra)]
+
+
+def best_of(repeat, func):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure network table row building and diffing.")
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+    rng = random.Random(args.seed)
+
+    records = make_scan(args.rows, rng)
+    spent, rows = best_of(args.repeat, lambda: network_rows(records, "Net 0"))
+    print(f"{'Operation':<26}{'Rows':>7}{'Best':>10}{'Added':>7}{'Removed':>9}{'Updated':>9}")
+    print(f"{'network_rows':<26}{len(rows):>7}{spent * 1000:>8.2f}ms")
+    for label, scan in (("diff_rows unchanged", records), ("diff_rows signal jitter", jitter(records, rng)),
+                        ("diff_rows 10% churn", churn(records, rng))):
+        fresh = network_rows(scan, "Net 0")
+        # diff_rows updates the current rows in place, so every run starts from its own copy
+        copies = [[dict(row) for row in rows] for _ in range(args.repeat)]
+        spent, diff = best_of(args.repeat, lambda: diff_rows(copies.pop(), fresh))
+        print(f"{label:<26}{len(diff.rows):>7}{spent * 1000:>8.2f}ms{diff.added:>7}{diff.removed:>9}"
+              f"{diff.updated:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Processes spawned and wall time per monitor tick, before and after the snapshot backend
+
+    python benchmarks/bench_spawns.py [--ticks 50]
+
+A fake `nmcli` on PATH answers with canned output, so the numbers measure
+process start-up and parsing rather than NetworkManager. "before" replays
+what main_V3.py did on every tick of a healthy link: one shell for the radio
+state and one for the active SSID. "after" runs ConnectionMonitor.check_once
+on NmcliBackend with the snapshot cache expired before every tick, as it is
+between real checks.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backends import NmcliBackend  # noqa: E402
+from eventlog import EventLog  # noqa: E402
+from monitor import ConnectionMonitor  # noqa: E402
+
+FAKE_NMCLI = r"""#!/bin/sh
+case "$*" in
+  "radio wifi") echo enabled ;;
+  "-t -f active,ssid dev wifi") printf 'yes:Home\nno:Cafe\n' ;;
+  "-t -f DEVICE,TYPE device") printf 'wlan0:wifi\nwlan1:wifi\neth0:ethernet\n' ;;
+  "-t -f DEVICE,ACTIVE,SSID,BSSID,SIGNAL device wifi list --rescan no")
+    printf 'wlan0:yes:Home:AA\\:BB\\:CC\\:DD\\:EE\\:01:70\nwlan0:no:Cafe:AA\\:BB\\:CC\\:DD\\:EE\\:02:40\n'
+    printf 'wlan1:yes:Backhaul:AA\\:BB\\:CC\\:DD\\:EE\\:03:65\n' ;;
+esac
+"""
+
+
+def legacy_tick():
+    """One healthy-link tick of main_V3.monitor_connection on Linux; returns processes started"""
+    result = subprocess.check_output("nmcli radio wifi", shell=True, text=True)
+    if "disabled" in result.lower():
+        return 1
+    result = subprocess.check_output("nmcli -t -f active,ssid dev wifi", shell=True, text=True)
+    assert any(line.startswith("yes:Home") for line in result.split('\n'))
+    return 2
+
+
+def bench_before(ticks):
+    spawns = 0
+    started = time.perf_counter()
+    for _ in range(ticks):
+        spawns += legacy_tick()
+    return spawns / ticks, (time.perf_counter() - started) / ticks
+
+
+def bench_after(ticks, interfaces=("wlan0",)):
+    backend = NmcliBackend()
+    targets = {"wlan0": "Home", "wlan1": "Backhaul"}
+    monitors = []
+    for interface in interfaces:
+        monitor = ConnectionMonitor(backend.for_interface(interface), log=EventLog(maxlen=10), name=interface)
+        monitor.target_ssid = targets[interface]
+        monitors.append(monitor)
+    # Interface discovery happens once per process; keep it out of the per-tick numbers
+    backend.interfaces()
+    spawns, spent = backend.spawn_count, backend.spawn_time
+    started = time.perf_counter()
+    for _ in range(ticks):
+        for monitor in monitors:
+            monitor.backend.invalidate()
+        for monitor in monitors:
+            monitor.check_once()
+    wall = (time.perf_counter() - started) / ticks
+    return (backend.spawn_count - spawns) / ticks, wall, (backend.spawn_time - spent) / ticks
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare process spawns per monitor tick.")
+    parser.add_argument("--ticks", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as bindir:
+        nmcli = os.path.join(bindir, "nmcli")
+        with open(nmcli, "w") as f:
+            f.write(FAKE_NMCLI)
+        os.chmod(nmcli, 0o755)
+        os.environ["PATH"] = bindir + os.pathsep + os.environ.get("PATH", "")
+
+        print(f"{'Variant':<28}{'Spawns/tick':>12}{'Wall/tick':>12}{'In spawns':>12}")
+        spawns, wall = bench_before(args.ticks)
+        print(f"{'before (main_V3, shell)':<28}{spawns:>12.1f}{wall * 1000:>10.2f}ms{'-':>12}")
+        for label, interfaces in (("after (1 interface)", ("wlan0",)), ("after (2 interfaces)", ("wlan0", "wlan1"))):
+            spawns, wall, spent = bench_after(args.ticks, interfaces)
+            print(f"{label:<28}{spawns:>12.1f}{wall * 1000:>10.2f}ms{spent * 1000:>10.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Cold start of the headless daemon against importing the Kivy GUI module
+
+    python benchmarks/bench_startup.py [--runs 5]
+
+Every measurement runs in a fresh interpreter. "daemon" is the time from
+launching `auto_wifi.py daemon` on the fake backend until it logs that it is
+monitoring; "import main_V3" is the import alone, before any window exists,
+and is skipped when Kivy is not installed.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def time_import(module):
+    """Seconds for a fresh interpreter to import module, or None if the import fails"""
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, "-c", f"import {module}"], cwd=ROOT,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - started if result.returncode == 0 else None
+
+
+def time_daemon(socket_path):
+    """Seconds from launch until the daemon reports it is monitoring"""
+    argv = [sys.executable, os.path.join(ROOT, "auto_wifi.py"), "daemon", "--ssid", "Home", "--backend", "fake",
+            "--no-events", "--state-file", "", "--control-socket", socket_path]
+    started = time.perf_counter()
+    with subprocess.Popen(argv, cwd=ROOT, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True) as proc:
+        try:
+            for line in proc.stdout:
+                if "Monitoring Home" in line:
+                    return time.perf_counter() - started
+            return None
+        finally:
+            proc.terminate()
+            proc.wait()
+
+
+def report(label, samples):
+    samples = [sample for sample in samples if sample is not None]
+    if not samples:
+        print(f"{label:<24}{'n/a':>10}")
+        return
+    print(f"{label:<24}{min(samples) * 1000:>8.0f}ms{statistics.median(samples) * 1000:>8.0f}ms")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare daemon cold start with importing the GUI.")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    print(f"{'Start':<24}{'Best':>10}{'Median':>10}")
+    report("python (empty)", [time_import("sys") for _ in range(args.runs)])
+    report("import auto_wifi", [time_import("auto_wifi") for _ in range(args.runs)])
+    with tempfile.TemporaryDirectory() as tmp:
+        report("daemon until monitoring", [time_daemon(os.path.join(tmp, "control.sock")) for _ in range(args.runs)])
+    report("import main_V3 (Kivy)", [time_import("main_V3") for _ in range(args.runs)])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+import json
+import os
+import tempfile
+import threading
+import time
+
+DEFAULT_PATH = os.path.join(os.path.expanduser("~"), ".auto_wifi_state.json")
+
+
+def _median(values):
+    if not values:
+        return None
+    ordered = sorted(values)
+    middle = len(ordered) // 2
+    return ordered[middle] if len(ordered) % 2 else (ordered[middle - 1] + ordered[middle]) / 2
+
+
+class ConnectionStore:
+    """Per-SSID connection memory that survives restarts
+
+    For every network it keeps the last BSSID and channel that worked,
+    recent time-to-connect samples (split into fast-path and full
+    reconnects) and recent failure times. The file is rewritten through a
+    temporary file and os.replace, so a crash never leaves it half written.
+    It is best-effort memory: a file that cannot be written is reported
+    through notify once and the store carries on in memory.
+    """
+
+    def __init__(self, path=DEFAULT_PATH, history=20, notify=print):
+        self.path = path
+        self.history = history
+        self.notify = notify
+        self.save_failed = False
+        self._lock = threading.RLock()
+        self.data = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        data.setdefault("networks", {})
+        data.setdefault("last_target", None)
+        data.setdefault("last_fallbacks", [])
+        return data
+
+    def save(self):
+        """Write the file; return False if it could not be written"""
+        with self._lock:
+            text = json.dumps(self.data, indent=1, sort_keys=True)
+            tmp = None
+            try:
+                # A temp name of our own, so two processes sharing the file never write into each other's
+                fd, tmp = tempfile.mkstemp(".tmp", os.path.basename(self.path) + ".",
+                                           dir=os.path.dirname(os.path.abspath(self.path)))
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    f.write(text)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp, self.path)
+            except OSError as e:
+                if tmp:
+                    try:
+                        os.remove(tmp)
+                    except OSError:
+                        pass
+                if not self.save_failed:
+                    self.notify(f"Cannot save connection memory to {self.path}: {e}; keeping it in memory only")
+                self.save_failed = True
+                return False
+            self.save_failed = False
+            return True
+
+    def network(self, ssid):
+        """The stored record for ssid, created on first use"""
+        with self._lock:
+            return self.data["networks"].setdefault(
+                ssid, {"bssid": None, "channel": None, "connect_times": {"fast": [], "full": []}, "failures": []}
+            )
+
+    @property
+    def last_target(self):
+        return self.data["last_target"]
+
+    @property
+    def last_fallbacks(self):
+        """Fallback SSIDs that went with last_target, most preferred first"""
+        return list(self.data["last_fallbacks"])
+
+    def set_last_target(self, ssid, fallbacks=()):
+        with self._lock:
+            fallbacks = list(fallbacks)
+            if (self.data["last_target"], self.data["last_fallbacks"]) != (ssid, fallbacks):
+                self.data["last_target"] = ssid
+                self.data["last_fallbacks"] = fallbacks
+                self.save()
+
+    def remembered(self, ssid):
+        """(bssid, channel) that last worked for ssid; bssid is None if unknown"""
+        record = self.data["networks"].get(ssid)
+        return (record["bssid"], record["channel"]) if record else (None, None)
+
+    def remember(self, ssid, bssid, channel=None):
+        """Store the working BSSID; only touches the disk when it changed"""
+        with self._lock:
+            record = self.network(ssid)
+            if bssid == record["bssid"] and channel is None:
+                channel = record["channel"]
+            if bssid and (record["bssid"], record["channel"]) != (bssid, channel):
+                record["bssid"], record["channel"] = bssid, channel
+                self.save()
+
+    def record_connect(self, ssid, seconds, fast, bssid=None, channel=None):
+        with self._lock:
+            record = self.network(ssid)
+            samples = record["connect_times"]["fast" if fast else "full"]
+            samples.append(round(seconds, 3))
+            del samples[:-self.history]
+            record["last_connected"] = time.time()
+            if bssid:
+                record["bssid"], record["channel"] = bssid, channel
+            self.save()
+
+    def record_failure(self, ssid):
+        with self._lock:
+            failures = self.network(ssid)["failures"]
+            failures.append(time.time())
+            del failures[:-self.history]
+            self.save()
+
+    def typical_connect_time(self, ssid, fast=False):
+        """Median recorded time-to-connect, or None before any sample"""
+        record = self.data["networks"].get(ssid)
+        return _median(record["connect_times"]["fast" if fast else "full"]) if record else None
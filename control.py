@@ -0,0 +1,422 @@
+"""Local control socket: many clients share one monitor's cached state
+
+Each request is one JSON object per line with a "cmd" key and gets one JSON
+reply line with "ok" set:
+
+    {"cmd": "state"}                       link state from the probe cache
+    {"cmd": "events", "count": 50}         recent events, oldest first
+    {"cmd": "scan"}                        cached scan results ("fresh": true scans on the worker)
+    {"cmd": "set_target", "ssid": "Home"}  or "ssids": [...] for a failover list
+    {"cmd": "rescan"}                      queue a scan on the monitor worker
+    {"cmd": "pause"} / {"cmd": "resume"}
+    {"cmd": "subscribe"}                   keep the connection open for pushed
+                                           {"event": ...} and {"state": ...} lines
+
+A daemon run as root (say under systemd) binds SYSTEM_SOCKET; with a socket
+group it is mode 0660, so members of that group can reach it from their own
+session. Clients look in their own socket path first and SYSTEM_SOCKET second.
+
+Reads never touch the OS; all probing stays on the monitor's worker, so any
+number of clients cost no extra netsh/nmcli calls. Pushes go through a
+bounded queue per subscriber, and a subscriber that stops reading is
+disconnected instead of stalling the monitor.
+"""
+import json
+import os
+import queue
+import socket
+import socketserver
+import stat
+import tempfile
+import threading
+
+from parsers import ScanRecord
+
+
+def _private_dir():
+    """Per-user 0700 directory in the temp directory, for when there is no runtime directory"""
+    return os.path.join(tempfile.gettempdir(), f"auto_wifi-{os.getuid() if hasattr(os, 'getuid') else 0}")
+
+
+SYSTEM_SOCKET = "/run/auto_wifi.sock"
+
+
+def default_socket_path():
+    """The per-user runtime directory, /run for root, else a private directory under the temp directory
+
+    A bare name in /tmp could be bound first by any local user, who would
+    then lock the daemon out and answer its clients.
+    """
+    runtime = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime and os.path.isdir(runtime):
+        return os.path.join(runtime, "auto_wifi.sock")
+    if hasattr(os, "getuid") and os.getuid() == 0 and os.path.isdir(os.path.dirname(SYSTEM_SOCKET)):
+        return SYSTEM_SOCKET
+    return os.path.join(_private_dir(), "auto_wifi.sock")
+
+
+def _ensure_private_dir(directory):
+    """Create directory 0700, or check that the existing one is ours and private"""
+    try:
+        os.mkdir(directory, 0o700)
+    except FileExistsError:
+        pass
+    st = os.lstat(directory)
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid() or st.st_mode & 0o077:
+        raise OSError(f"{directory} is not a private directory owned by this user")
+
+
+def socket_paths():
+    """Where clients look for a monitor: this user's socket, then the system one"""
+    paths = [default_socket_path()]
+    return paths if SYSTEM_SOCKET in paths else paths + [SYSTEM_SOCKET]
+
+
+def _check_socket(path, owners=None):
+    """Raise OSError unless path is a Unix socket owned by this user (or one of owners)"""
+    st = os.lstat(path)
+    if not stat.S_ISSOCK(st.st_mode):
+        raise OSError(f"{path} exists and is not a socket")
+    if st.st_uid not in (owners or (os.getuid(),)):
+        raise OSError(f"{path} is owned by another user")
+
+
+def _group_id(group):
+    if isinstance(group, int) or str(group).isdigit():
+        return int(group)
+    import grp
+    try:
+        return grp.getgrnam(group).gr_gid
+    except KeyError:
+        raise OSError(f"no group named {group!r}") from None
+
+
+DEFAULT_SOCKET = default_socket_path()
+
+
+class _Connection:
+    """One client socket; replies and pushes are written under a lock"""
+
+    def __init__(self, sock, backlog=100):
+        self.sock = sock
+        self.lock = threading.Lock()
+        self.backlog = backlog
+        self.closed = False
+        self._pushes = None
+
+    def send(self, message):
+        data = (json.dumps(message) + "\n").encode()
+        with self.lock:
+            self.sock.sendall(data)
+
+    def start_pushes(self):
+        """Write pushed messages from a thread of our own so a slow client only stalls itself"""
+        self._pushes = queue.Queue(self.backlog)
+        threading.Thread(target=self._write_pushes, name="wifi-control-push", daemon=True).start()
+
+    def push(self, messages):
+        """Queue messages without blocking; False once the client has fallen too far behind"""
+        if self.closed:
+            return False
+        try:
+            for message in messages:
+                self._pushes.put_nowait(message)
+        except queue.Full:
+            self.close()
+            return False
+        return True
+
+    def _write_pushes(self):
+        while not self.closed:
+            message = self._pushes.get()
+            if message is None:
+                return
+            try:
+                self.send(message)
+            except OSError:
+                self.close()
+
+    def close(self):
+        """Hang up; the handler thread sees end of input and unsubscribes"""
+        if self.closed:
+            return
+        self.closed = True
+        if self._pushes:
+            try:
+                self._pushes.put_nowait(None)
+            except queue.Full:
+                # The writer notices self.closed after its current send fails
+                pass
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+
+class ControlServer:
+    """Serve one ConnectionMonitor over a Unix domain socket"""
+
+    def __init__(self, monitor, path=DEFAULT_SOCKET, request_timeout=30, group=None):
+        self.monitor = monitor
+        self.path = path
+        # Group allowed to use the socket (name or id); None keeps it owner-only
+        self.group = group
+        self.request_timeout = request_timeout
+        self.server = None
+        self.subscribers = []
+        self._lock = threading.Lock()
+        self._last_state = None
+
+    def start(self):
+        """Bind and serve on a background thread; return False where Unix sockets are missing"""
+        if not hasattr(socketserver, "ThreadingUnixStreamServer"):
+            return False
+        if os.path.dirname(self.path) == _private_dir():
+            _ensure_private_dir(_private_dir())
+        if os.path.lexists(self.path):
+            # Only ever replace our own socket, and only one left behind by a crashed daemon
+            _check_socket(self.path)
+            live = ControlClient.connect(self.path)
+            if live is not None:
+                live.close()
+                raise OSError(f"{self.path} is already served by another monitor")
+            os.unlink(self.path)
+        control = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                connection = _Connection(self.connection)
+                try:
+                    for line in self.rfile:
+                        if not line.strip():
+                            continue
+                        try:
+                            reply = control.handle(json.loads(line), connection)
+                        except (ValueError, KeyError, TypeError, TimeoutError) as e:
+                            reply = {"ok": False, "error": str(e)}
+                        connection.send(reply)
+                except OSError:
+                    pass
+                finally:
+                    control.unsubscribe(connection)
+
+        # Create the socket owner-only from the start; a chmod after bind leaves a window
+        umask = os.umask(0o177)
+        try:
+            self.server = socketserver.ThreadingUnixStreamServer(self.path, Handler)
+        finally:
+            os.umask(umask)
+        if self.group is not None:
+            # Widen owner-only to the group only after the group is set
+            try:
+                os.chown(self.path, -1, _group_id(self.group))
+                os.chmod(self.path, 0o660)
+            except OSError:
+                self.server.server_close()
+                os.unlink(self.path)
+                self.server = None
+                raise
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, name="wifi-control", daemon=True).start()
+        self.monitor.log.subscribe(self._on_event)
+        return True
+
+    def stop(self):
+        if self.server is None:
+            return
+        self.monitor.log.unsubscribe(self._on_event)
+        self.server.shutdown()
+        self.server.server_close()
+        self.server = None
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+    def state(self):
+        """Everything a status check needs, from caches only"""
+        monitor = self.monitor
+        backend = monitor.backend
+        # set_targets swaps the Failover on the worker; read it once and copy its totals under its lock
+        failover = monitor.failover
+        time_on, time_off_preferred = failover.usage() if failover else (None, None)
+        state = {
+            "target": monitor.target_ssid,
+            "targets": list(failover.ssids) if failover else None,
+            # Seconds on each acceptable network, and on any but the preferred one
+            "time_on": {ssid: round(spent, 1) for ssid, spent in time_on.items()} if failover else None,
+            "time_off_preferred": round(time_off_preferred, 1) if failover else None,
+            "paused": monitor.paused,
+            "interval": monitor.schedule.interval if monitor.schedule else monitor.interval,
+            "reconnects": monitor.reconnect_stats.summary(),
+            "backend": backend.name if backend else None,
+            "os_type": backend.os_type if backend else None,
+            "interface": backend.interface if backend else None,
+            "link": None,
+        }
+        cached = backend.cached_snapshot() if backend else None
+        if cached:
+            age, snap = cached
+            state["link"] = dict(snap._asdict(), age=round(age, 3))
+        return state
+
+    def _run_on_worker(self, func):
+        """Run func between monitor jobs and wait for its result"""
+        done = threading.Event()
+        result = []
+        self.monitor.submit(func, on_done=lambda value: (result.append(value), done.set()))
+        if not done.wait(self.request_timeout):
+            raise TimeoutError("the monitor is busy; try again")
+        return result[0]
+
+    def handle(self, request, connection):
+        cmd = request["cmd"]
+        monitor = self.monitor
+        if cmd == "state":
+            return {"ok": True, "state": self.state()}
+        if cmd == "events":
+            count = request.get("count")
+            # bool is an int too, and recent(0) would return the whole history
+            if count is not None and (not isinstance(count, int) or isinstance(count, bool) or count < 1):
+                raise TypeError("count must be a positive integer")
+            return {"ok": True, "events": [event._asdict() for event in monitor.log.recent(count)]}
+        if cmd == "scan":
+            if not monitor.backend:
+                return {"ok": False, "error": "no backend"}
+            records = self._run_on_worker(monitor.backend.scan) if request.get("fresh") else \
+                monitor.backend.cached_scan()
+            return {"ok": True, "records": None if records is None else [list(record) for record in records]}
+        if cmd == "set_target":
+            ssids = request["ssids"] if "ssids" in request else [request["ssid"]]
+            if not isinstance(ssids, list) or not ssids or not all(isinstance(ssid, str) and ssid for ssid in ssids):
+                raise TypeError("ssids must be a non-empty list of SSID strings")
+            monitor.set_targets(ssids)
+            return {"ok": True}
+        if cmd == "rescan":
+            if monitor.backend:
+                monitor.submit(monitor.backend.scan)
+            return {"ok": True}
+        if cmd == "pause":
+            monitor.pause()
+            return {"ok": True}
+        if cmd == "resume":
+            monitor.resume()
+            return {"ok": True}
+        if cmd == "subscribe":
+            with self._lock:
+                if connection not in self.subscribers:
+                    connection.start_pushes()
+                    self.subscribers.append(connection)
+            return {"ok": True, "state": self.state()}
+        return {"ok": False, "error": f"unknown command {cmd!r}"}
+
+    def unsubscribe(self, connection):
+        with self._lock:
+            if connection in self.subscribers:
+                self.subscribers.remove(connection)
+        connection.close()
+
+    def _on_event(self, event):
+        """Push the event, and the state when it changed, to every subscriber"""
+        with self._lock:
+            subscribers = list(self.subscribers)
+        if not subscribers:
+            return
+        messages = [{"event": event._asdict()}]
+        state = self.state()
+        # The snapshot age changes on every event; only a real change is pushed
+        key = dict(state, link=state["link"] and dict(state["link"], age=None))
+        if key != self._last_state:
+            self._last_state = key
+            messages.append({"state": state})
+        for connection in subscribers:
+            if not connection.push(messages):
+                self.unsubscribe(connection)
+
+
+class ControlClient:
+    """Talk to a ControlServer"""
+
+    def __init__(self, path=DEFAULT_SOCKET, timeout=35):
+        self.path = path
+        self.timeout = timeout
+        self.sock = self._open()
+        self.rfile = self.sock.makefile("rb")
+        self._lock = threading.Lock()
+        self._subscription = None
+
+    @classmethod
+    def connect(cls, path=None):
+        """A client, or None when nothing is serving path (by default any of socket_paths())"""
+        return cls.find(path)[0]
+
+    @classmethod
+    def find(cls, path=None):
+        """(client, None) for the first monitor that answers, else (None, blocked)
+
+        blocked is the first socket that exists but refused us for something
+        other than having nobody behind it: another user's socket, or one we
+        lack the permissions for. A stale socket left by a crashed daemon
+        does not count.
+        """
+        if not hasattr(socket, "AF_UNIX"):
+            return None, None
+        blocked = None
+        for candidate in [path] if path else socket_paths():
+            try:
+                return cls(candidate), None
+            except (ConnectionRefusedError, FileNotFoundError):
+                continue
+            except OSError:
+                if blocked is None and os.path.lexists(candidate):
+                    blocked = candidate
+        return None, blocked
+
+    def _open(self):
+        # Whoever owns the socket owns the answers; trust only ours and root's
+        _check_socket(self.path, {os.getuid(), 0})
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.path)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    def request(self, cmd, **args):
+        """Send one command and return its reply"""
+        with self._lock:
+            self.sock.sendall((json.dumps(dict(args, cmd=cmd)) + "\n").encode())
+            line = self.rfile.readline()
+        if not line:
+            raise ConnectionError("control socket closed")
+        return json.loads(line)
+
+    def scan(self, fresh=False):
+        records = self.request("scan", fresh=fresh).get("records")
+        return [ScanRecord(*record) for record in records or []]
+
+    def subscribe(self, on_message):
+        """Call on_message with every pushed message, on a background thread"""
+        sock = self._open()
+        sock.settimeout(None)
+        sock.sendall(b'{"cmd": "subscribe"}\n')
+        self._subscription = sock
+
+        def read():
+            try:
+                with sock.makefile("rb") as lines:
+                    for line in lines:
+                        on_message(json.loads(line))
+            except (OSError, ValueError):
+                pass
+        threading.Thread(target=read, name="wifi-control-client", daemon=True).start()
+
+    def close(self):
+        for sock in (self.sock, self._subscription):
+            if sock:
+                try:
+                    sock.close()
+                except OSError:
+                    pass
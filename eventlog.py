@@ -0,0 +1,149 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import NamedTuple, Optional
+
+
+class Event(NamedTuple):
+    """One monitor event"""
+    timestamp: float
+    level: str
+    kind: str
+    ssid: Optional[str]
+    message: str
+
+    def format(self):
+        return f"{time.strftime('%H:%M:%S', time.localtime(self.timestamp))} {self.message}"
+
+
+class RotatingJsonlWriter:
+    """Append events as JSON lines, rotating the file once it reaches max_bytes
+
+    The file is best-effort: an OSError (full or read-only disk) is reported
+    through notify once, the event is dropped from the file and the next
+    write tries again.
+    """
+
+    def __init__(self, path, max_bytes=1_000_000, backups=3, notify=print):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.notify = notify
+        self.write_failed = False
+        self._file = None
+        try:
+            self._open()
+        except OSError as e:
+            self._failed(e)
+
+    def _open(self):
+        # Binary, so tell() and the line length are both in bytes even for non-ASCII SSIDs
+        self._file = open(self.path, "ab")
+
+    def _failed(self, error):
+        if not self.write_failed:
+            _report(self.notify, f"Cannot write the event log {self.path}: {error}; keeping events in memory only")
+        self.write_failed = True
+
+    def write(self, event):
+        """Append one event; return False if it could not be written"""
+        line = (json.dumps(event._asdict(), ensure_ascii=False) + "\n").encode("utf-8")
+        try:
+            if self._file is None:
+                self._open()
+            if self._file.tell() + len(line) > self.max_bytes and self._file.tell() > 0:
+                if not self.rotate():
+                    return False
+            self._file.write(line)
+            self._file.flush()
+        except OSError as e:
+            self._failed(e)
+            return False
+        self.write_failed = False
+        return True
+
+    def rotate(self):
+        """Shift path -> path.1 -> ... -> path.<backups>, dropping the oldest; False if that failed"""
+        try:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            for i in range(self.backups - 1, 0, -1):
+                if os.path.exists(f"{self.path}.{i}"):
+                    os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+            if self.backups > 0:
+                os.replace(self.path, f"{self.path}.1")
+            else:
+                os.remove(self.path)
+            self._open()
+        except OSError as e:
+            self._failed(e)
+            return False
+        return True
+
+    def close(self):
+        if self._file is not None:
+            try:
+                self._file.close()
+            except OSError:
+                pass
+            self._file = None
+
+
+def _report(notify, message):
+    # notify is usually print, which itself raises once stdout is a broken pipe
+    try:
+        notify(message)
+    except Exception:
+        pass
+
+
+class EventLog:
+    """Bounded in-memory event history with listeners and an optional JSONL file"""
+
+    def __init__(self, maxlen=500, path=None, max_bytes=1_000_000, backups=3, notify=print):
+        self.events = deque(maxlen=maxlen)
+        self.notify = notify
+        self.writer = RotatingJsonlWriter(path, max_bytes, backups, notify) if path else None
+        self._listeners = []
+        self._failed_listeners = set()
+        self._lock = threading.Lock()
+
+    def emit(self, message, level="info", kind="info", ssid=None):
+        """Record an event and tell the listeners; safe to call from any thread"""
+        event = Event(time.time(), level, kind, ssid, message)
+        with self._lock:
+            self.events.append(event)
+            if self.writer:
+                self.writer.write(event)
+            listeners = list(self._listeners)
+        for listener in listeners:
+            # A broken listener (print to a closed pipe, a dead control client) must not
+            # reach the caller, which is usually the monitor's worker loop
+            try:
+                listener(event)
+            except Exception as e:
+                if id(listener) not in self._failed_listeners:
+                    self._failed_listeners.add(id(listener))
+                    _report(self.notify, f"Event listener {listener!r} failed: {e}")
+        return event
+
+    def subscribe(self, listener):
+        with self._lock:
+            self._listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        with self._lock:
+            self._listeners.remove(listener)
+
+    def recent(self, count=None):
+        """The newest events, oldest first"""
+        with self._lock:
+            events = list(self.events)
+        return events if count is None else events[-count:]
+
+    def close(self):
+        if self.writer:
+            self.writer.close()
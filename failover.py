@@ -0,0 +1,115 @@
+import threading
+import time
+from typing import NamedTuple
+
+
+class FailoverPolicy(NamedTuple):
+    """How to move between a ranked list of acceptable networks"""
+    stability_window: float = 300  # seconds on a fallback before trying the preferred network again
+    scan_age: float = 120  # rank candidates from a scan this fresh; older ones trigger one new scan
+    cooldown: float = 120  # skip a network this long after failing to connect to it
+    failback_timeout: float = 15  # seconds a failback connect gets before returning to the fallback
+
+
+class Failover:
+    """Pick which of several ranked SSIDs the monitor should hold
+
+    Candidates come from the backend's cached scan, so ordinary checks never
+    block on a scan; a new one is taken only once the cache is older than
+    scan_age. After stability_window seconds on a fallback the preferred
+    network is tried again if it is in range; see failback().
+    """
+
+    def __init__(self, backend, ssids, policy=FailoverPolicy(), notify=print, clock=time.monotonic):
+        if not ssids:
+            raise ValueError("failover needs at least one SSID")
+        self.backend = backend
+        self.ssids = list(ssids)
+        self.policy = policy
+        self.notify = notify
+        self.clock = clock
+        self.failed_at = {}
+        self.stable_since = None
+        self.time_off_preferred = 0.0
+        self.time_on = {}
+        # Guards time_on and time_off_preferred, which usage() reads from other threads
+        self._lock = threading.Lock()
+        self._last = None  # (ssid, seen_at) of the previous check
+
+    @property
+    def preferred(self):
+        return self.ssids[0]
+
+    def _account(self, ssid, now):
+        """Add the time since the previous check to the network that was up"""
+        if self._last and self._last[0] in self.ssids:
+            spent = now - self._last[1]
+            off_preferred = self._last[0] != self.preferred
+            with self._lock:
+                self.time_on[self._last[0]] = self.time_on.get(self._last[0], 0.0) + spent
+                if off_preferred:
+                    self.time_off_preferred += spent
+            if off_preferred and self.backend.metrics:
+                self.backend.metrics.observe_off_preferred(self.backend.interface, spent)
+        if not self._last or self._last[0] != ssid:
+            self.stable_since = now
+        self._last = (ssid, now)
+
+    def usage(self):
+        """(seconds on each network, seconds off the preferred one), safe to call from any thread"""
+        with self._lock:
+            return dict(self.time_on), self.time_off_preferred
+
+    def visible(self):
+        """SSIDs in range according to the cached scan, scanning only when it is stale"""
+        records = self.backend.cached_scan(self.policy.scan_age)
+        if records is None:
+            records = self.backend.scan()
+        return {record.ssid for record in records}
+
+    def candidates(self):
+        """Acceptable SSIDs in range and not cooling down, best first"""
+        now = self.clock()
+        visible = self.visible()
+        return [ssid for ssid in self.ssids if ssid in visible
+                and now - self.failed_at.get(ssid, float("-inf")) >= self.policy.cooldown]
+
+    def target(self, snapshot):
+        """The SSID to hold given the current link"""
+        now = self.clock()
+        current = snapshot.ssid if snapshot.powered else None
+        self._account(current, now)
+        if current in self.ssids:
+            return current
+        candidates = self.candidates()
+        if candidates:
+            if candidates[0] != self.preferred:
+                self.notify(f"Failing over to {candidates[0]} (rank {self.ssids.index(candidates[0]) + 1} "
+                            f"of {len(self.ssids)})")
+            return candidates[0]
+        # Nothing acceptable in range: keep trying the least recently failed network
+        return min(self.ssids, key=lambda ssid: self.failed_at.get(ssid, float("-inf")))
+
+    def failback(self, current):
+        """A better ranked SSID worth one plain connect from a stable fallback, or None
+
+        Failing back is not a recovery: the link is healthy, so the caller
+        tries the SSID once and returns to current if it does not come up.
+        """
+        now = self.clock()
+        if current not in self.ssids or current == self.preferred or self._last is None or \
+                now - self.stable_since < self.policy.stability_window:
+            return None
+        better = [ssid for ssid in self.candidates() if self.ssids.index(ssid) < self.ssids.index(current)]
+        if not better:
+            return None
+        self.notify(f"Failing back from {current} to {better[0]} after {now - self.stable_since:.0f}s stable "
+                    f"({self.time_off_preferred:.0f}s off {self.preferred} so far)")
+        return better[0]
+
+    def record(self, ssid, connected):
+        """Note the outcome of a recovery towards ssid"""
+        if connected:
+            self.failed_at.pop(ssid, None)
+        else:
+            self.failed_at[ssid] = self.clock()
@@ -1,60 +1,51 @@
-import os
-import time
-import subprocess
-
-def get_current_wifi():
-    """Get the current Wi-Fi SSID"""
-    try:
-        # Run netsh command to get current wifi info
-        result = subprocess.check_output('netsh wlan show interfaces', shell=True, text=True)
-        for line in result.split('\n'):
-            if "SSID" in line and "BSSID" not in line:
-                ssid = line.split(':')[1].strip()
-                return ssid if ssid else None
-        return None
-    except subprocess.CalledProcessError:
-        return None
-
-def toggle_wifi():
-    """Turn Wi-Fi off and on"""
-    # Disable Wi-Fi
-    os.system('netsh interface set interface "Wi-Fi" disable')
-    time.sleep(5)  # Wait for 5 seconds
-    
-    # Enable Wi-Fi
-    os.system('netsh interface set interface "Wi-Fi" enable')
-    time.sleep(5)  # Wait for 5 seconds
-
-def connect_to_wifi(ssid):
-    """Connect to the specified Wi-Fi"""
-    os.system(f'netsh wlan connect name="{ssid}" ssid="{ssid}"')
-    time.sleep(5)  # Wait for connection to establish
+from backends import detect_backend
+from connection_store import ConnectionStore
+from monitor import ConnectionMonitor
+from scheduler import AdaptiveInterval
 
 def main():
-    # Ask user for the target Wi-Fi name
-    TARGET_SSID = input("Enter the Wi-Fi name you want to stay connected to: ").strip()
+    backend = detect_backend()
+    if backend is None:
+        print("No supported Wi-Fi tools found on this system. Exiting...")
+        return
+
+    # Ask user for the target Wi-Fi name, defaulting to the last one used
+    store = ConnectionStore()
+    last = store.last_target
+    prompt = f"Enter the Wi-Fi name you want to stay connected to [{last}]: " if last else \
+        "Enter the Wi-Fi name you want to stay connected to: "
+    TARGET_SSID = input(prompt).strip() or last
     if not TARGET_SSID:
         print("No Wi-Fi name provided. Exiting...")
         return
-    
-    print(f"Monitoring Wi-Fi connection. Target network: {TARGET_SSID}")
-    
+
+    # Fallbacks are asked for one per line, so an SSID may contain any character
+    remembered = store.last_fallbacks if TARGET_SSID == last else []
+    hint = f" (Enter keeps {', '.join(remembered)}; '-' for none)" if remembered else ""
+    print(f"Fallback Wi-Fi names, most preferred first, one per line; an empty line ends the list{hint}")
+    fallbacks = []
     while True:
-        current_ssid = get_current_wifi()
-        
-        if current_ssid is None:
-            print("Wi-Fi is disconnected. Attempting to reconnect to target network...")
-            toggle_wifi()
-            connect_to_wifi(TARGET_SSID)
-        elif current_ssid != TARGET_SSID:
-            print(f"Connected to {current_ssid} instead of {TARGET_SSID}. Switching back...")
-            toggle_wifi()
-            connect_to_wifi(TARGET_SSID)
-        else:
-            print(f"Connected to {TARGET_SSID} - All good!")
-        
-        # Check every 10 seconds
-        time.sleep(10)
+        name = input("Fallback: ").strip()
+        if not name:
+            break
+        if name == "-" and remembered and not fallbacks:
+            remembered = []
+            break
+        fallbacks.append(name)
+    fallbacks = fallbacks or remembered
+
+    print(f"Monitoring Wi-Fi connection on {backend.interface} ({backend.name}). Target network: {TARGET_SSID}"
+          + (f", then {', '.join(fallbacks)}" if fallbacks else ""))
+
+    # Start at 10 seconds, back off to a minute while stable; the monitor recovers the link when it drifts
+    monitor = ConnectionMonitor(backend, interval=AdaptiveInterval(start=10), store=store)
+    monitor.log.subscribe(lambda event: print(event.message))
+    # Queued on the worker, so the first check runs as soon as monitoring starts
+    monitor.set_targets([TARGET_SSID, *fallbacks])
+    # Where the OS reports link changes, react to them and keep polling only as a slow fallback
+    if monitor.watch_events():
+        print("Following link state events")
+    monitor.run()
 
 if __name__ == "__main__":
     try:
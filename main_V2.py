@@ -1,140 +1,79 @@
-import os
 import time
-import subprocess
+from backends import detect_backend
+from connection_store import ConnectionStore
+from monitor import ConnectionMonitor
+from recovery import wait_for_power
+from scheduler import AdaptiveInterval
 
-def get_current_wifi():
-    """Get the current Wi-Fi SSID"""
-    try:
-        result = subprocess.check_output('netsh wlan show interfaces', shell=True, text=True)
-        for line in result.split('\n'):
-            if "SSID" in line and "BSSID" not in line:
-                ssid = line.split(':')[1].strip()
-                return ssid if ssid else None
-            if "State" in line:
-                state = line.split(':')[1].strip()
-                if "disconnected" in state.lower():
-                    return None
-        return None
-    except subprocess.CalledProcessError:
-        return None
-
-def is_wifi_powered_down():
-    """Check if the Wi-Fi interface is powered down"""
-    try:
-        result = subprocess.check_output('netsh interface show interface "Wi-Fi"', shell=True, text=True)
-        for line in result.split('\n'):
-            if "Admin State" in line:
-                state = line.split(':')[1].strip()
-                return "disable" in state.lower()
-        return False
-    except subprocess.CalledProcessError:
-        return True
-
-def toggle_wifi(power_up_only=False):
-    """Turn Wi-Fi off and on, or just power up if specified"""
-    if is_wifi_powered_down():
-        print("Wi-Fi interface is powered down. Powering up...")
-        os.system('netsh interface set interface "Wi-Fi" enable')
-        time.sleep(5)
-    elif not power_up_only:
-        print("Toggling Wi-Fi...")
-        os.system('netsh interface set interface "Wi-Fi" disable')
-        time.sleep(5)
-        os.system('netsh interface set interface "Wi-Fi" enable')
-        time.sleep(5)
-
-def get_available_wifi():
-    """Get list of available Wi-Fi networks with SSID and BSSID"""
-    try:
-        result = subprocess.check_output('netsh wlan show networks mode=bssid', shell=True, text=True)
-        networks = []
-        current_ssid = None
-        current_bssid = None
-        
-        for line in result.split('\n'):
-            line = line.strip()
-            if line.startswith("SSID"):
-                current_ssid = line.split(':')[1].strip()
-            elif line.startswith("BSSID") and current_ssid:
-                current_bssid = line.split(':')[1].strip()
-                networks.append((current_ssid, current_bssid))
-        return networks
-    except subprocess.CalledProcessError:
-        return []
-
-def display_wifi_list():
+def display_wifi_list(backend):
     """Display available Wi-Fi networks and return the list"""
-    networks = get_available_wifi()
+    networks = backend.scan()
     if not networks:
         print("No Wi-Fi networks available or scanning failed.")
         return []
-    
+
     print("\nAvailable Wi-Fi Networks:")
-    print(f"{'Si No':<6} {'Name':<20} {'BSSID':<17}")
-    print("-" * 43)
-    for i, (ssid, bssid) in enumerate(networks, 1):
-        print(f"{i:<6} {ssid:<20} {bssid:<17}")
+    print(f"{'Si No':<6} {'Name':<20} {'BSSID':<17} {'Signal':>6}")
+    print("-" * 50)
+    for i, network in enumerate(networks, 1):
+        signal = f"{network.signal}%" if network.signal is not None else ""
+        print(f"{i:<6} {network.ssid:<20} {network.bssid:<17} {signal:>6}")
     return networks
 
-def connect_to_wifi(ssid):
-    """Connect to the specified Wi-Fi"""
-    os.system(f'netsh wlan connect name="{ssid}" ssid="{ssid}"')
-    time.sleep(5)
-
 def main():
     print("Wi-Fi Connection Manager")
-    
+    backend = detect_backend()
+    if backend is None:
+        print("No supported Wi-Fi tools found on this system. Exiting...")
+        return
+    print(f"Using {backend.interface} ({backend.name})")
+
     # Ensure Wi-Fi is powered on
-    if is_wifi_powered_down():
-        toggle_wifi(power_up_only=True)
-    
+    if not backend.snapshot().powered:
+        print("Wi-Fi interface is powered down. Powering up...")
+        backend.enable()
+        wait_for_power(backend, True)
+
+    # Offer the network from the last run before showing the picker
+    store = ConnectionStore()
+    selected_ssid = None
+    if store.last_target:
+        answer = input(f"Press Enter to reconnect to {store.last_target}, or 'l' to list networks: ").strip().lower()
+        if answer != 'l':
+            selected_ssid = store.last_target
+
     # Show available networks and get user selection with refresh option
-    while True:
-        networks = display_wifi_list()
+    while selected_ssid is None:
+        networks = display_wifi_list(backend)
         if not networks:
             print("Waiting for networks to appear...")
             time.sleep(5)
             continue
-        
+
         try:
             choice = input("\nEnter the Si No of the Wi-Fi to connect (or 'r' to refresh): ").strip().lower()
             if choice == 'r':
                 print("Refreshing Wi-Fi list...")
                 continue  # Refresh the list
-            
+
             choice = int(choice)
             if 1 <= choice <= len(networks):
-                selected_ssid = networks[choice - 1][0]
+                selected_ssid = networks[choice - 1].ssid
                 print(f"Selected {selected_ssid}. Starting connection monitoring...")
-                connect_to_wifi(selected_ssid)
                 break
             else:
                 print("Invalid Si No. Please try again.")
         except ValueError:
             print("Invalid input. Enter a number or 'r' to refresh.")
-    
-    # Monitor and maintain connection to selected Wi-Fi
-    while True:
-        if is_wifi_powered_down():
-            print(f"Wi-Fi interface is powered down. Attempting to power up and connect to {selected_ssid}...")
-            toggle_wifi(power_up_only=True)
-            connect_to_wifi(selected_ssid)
-        else:
-            current_ssid = get_current_wifi()
-            
-            if current_ssid is None:
-                print(f"Disconnected from {selected_ssid}. Reconnecting...")
-                toggle_wifi()
-                connect_to_wifi(selected_ssid)
-            elif current_ssid != selected_ssid:
-                print(f"Connected to {current_ssid} instead of {selected_ssid}. Switching back...")
-                toggle_wifi()
-                connect_to_wifi(selected_ssid)
-            else:
-                print(f"Connected to {selected_ssid} - All good!")
-        
-        # Check every 10 seconds
-        time.sleep(10)
+
+    # Monitor and maintain connection to selected Wi-Fi, checking every 10 seconds at first
+    monitor = ConnectionMonitor(backend, interval=AdaptiveInterval(start=10), store=store)
+    monitor.log.subscribe(lambda event: print(event.message))
+    monitor.set_target(selected_ssid)
+    # Where the OS reports link changes, react to them and keep polling only as a slow fallback
+    if monitor.watch_events():
+        print("Following link state events")
+    monitor.run()
 
 if __name__ == "__main__":
     try:
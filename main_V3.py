@@ -1,16 +1,55 @@
-import os
-import time
-import subprocess
 from kivy.app import App
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.label import Label
 from kivy.uix.button import Button
 from kivy.uix.checkbox import CheckBox
-from kivy.uix.gridlayout import GridLayout
+from kivy.uix.recycleboxlayout import RecycleBoxLayout
+from kivy.uix.recycleview import RecycleView
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
 from kivy.uix.scrollview import ScrollView
 from kivy.clock import Clock
 from kivy.core.window import Window
 from kivy.properties import ColorProperty
+from backends import detect_backend
+from connection_store import ConnectionStore
+from control import ControlClient
+from eventlog import EventLog
+from monitor import ConnectionMonitor
+from network_table import diff_rows, network_rows, select_rows
+from scheduler import AdaptiveInterval
+
+TERMINAL_LINES = 40
+
+class NetworkRow(RecycleDataViewBehavior, BoxLayout):
+    """Recycled table row: an SSID group header or one of its BSSIDs"""
+
+    def __init__(self, **kwargs):
+        super().__init__(orientation='horizontal', **kwargs)
+        self.ssid = None
+        self.checkbox = CheckBox(color=[0, 0, 0, 1], size_hint_x=0.1)
+        self.checkbox.bind(on_press=self.on_checkbox_press)
+        self.name_label = Label(color=[0, 0, 0, 1], size_hint_x=0.35)
+        self.bssid_label = Label(color=[0, 0, 0, 1], size_hint_x=0.3)
+        self.signal_label = Label(color=[0, 0, 0, 1], size_hint_x=0.1)
+        self.detail_label = Label(color=[0, 0, 0, 1], size_hint_x=0.15)
+        for widget in (self.checkbox, self.name_label, self.bssid_label, self.signal_label, self.detail_label):
+            self.add_widget(widget)
+
+    def refresh_view_attrs(self, rv, index, data):
+        """Rebind this recycled row to the row dict at index"""
+        is_group = data["kind"] == "ssid"
+        self.ssid = data["ssid"]
+        self.checkbox.opacity = 1 if is_group else 0
+        self.checkbox.disabled = not is_group
+        self.checkbox.active = data["selected"]
+        self.name_label.text = data["name"]
+        self.name_label.bold = is_group
+        self.bssid_label.text = data["bssid"]
+        self.signal_label.text = "" if data["signal"] is None else f"{data['signal']}%"
+        self.detail_label.text = data["detail"]
+
+    def on_checkbox_press(self, checkbox):
+        App.get_running_app().on_checkbox_active(self.ssid, checkbox.active)
 
 class WiFiManager(App):
     background_color = ColorProperty([1, 1, 1, 1])  # White background
@@ -19,233 +58,113 @@ class WiFiManager(App):
         super().__init__()
         self.selected_ssid = None
         self.monitoring = False
-        self.os_type = None
-        self.terminal_text = ""
+        # Set up by attach() on the worker once the app starts
+        self.client = None
+        self.blocked_socket = None
+        self.backend = None
+        self.attached = False
+        self.events = EventLog(maxlen=500)
+        self.monitor = ConnectionMonitor(interval=AdaptiveInterval(start=5), log=self.events)
+        # Any number of events between two frames cost a single redraw
+        self.flush_trigger = Clock.create_trigger(self.flush_terminal)
+        self.events.subscribe(lambda event: self.flush_trigger())
         Window.clearcolor = self.background_color
 
-    def get_os_commands(self):
-        """Return OS-specific commands"""
-        if self.os_type == "Windows":
-            return {
-                "show_interfaces": "netsh wlan show interfaces",
-                "show_networks": "netsh wlan show networks mode=bssid",
-                "connect": lambda ssid: f'netsh wlan connect name="{ssid}" ssid="{ssid}"',
-                "enable": 'netsh interface set interface "Wi-Fi" enable',
-                "disable": 'netsh interface set interface "Wi-Fi" disable',
-                "interface_state": 'netsh interface show interface "Wi-Fi"'
-            }
-        elif self.os_type == "macOS":
-            return {
-                "show_interfaces": "/System/Library/PrivateFrameworks/Apple80211.framework/Versions/Current/Resources/airport -I",
-                "show_networks": "/System/Library/PrivateFrameworks/Apple80211.framework/Versions/Current/Resources/airport -s",
-                "connect": lambda ssid: f'networksetup -setairportnetwork en0 "{ssid}"',
-                "enable": "networksetup -setairportpower en0 on",
-                "disable": "networksetup -setairportpower en0 off",
-                "interface_state": "networksetup -getairportpower en0"
-            }
-        elif self.os_type == "Linux":
-            return {
-                "show_interfaces": "nmcli -t -f active,ssid dev wifi",
-                "show_networks": "nmcli -t -f ssid,bssid dev wifi",
-                "connect": lambda ssid: f'nmcli dev wifi connect "{ssid}"',
-                "enable": "nmcli radio wifi on",
-                "disable": "nmcli radio wifi off",
-                "interface_state": "nmcli radio wifi"
-            }
-        return None
-
-    def get_current_wifi(self):
-        """Get the current Wi-Fi SSID"""
-        commands = self.get_os_commands()
-        if not commands:
-            return None
-        try:
-            result = subprocess.check_output(commands["show_interfaces"], shell=True, text=True)
-            if self.os_type == "Windows":
-                for line in result.split('\n'):
-                    if "SSID" in line and "BSSID" not in line:
-                        ssid = line.split(':')[1].strip()
-                        return ssid if ssid else None
-                    if "State" in line and "disconnected" in line.lower():
-                        return None
-            elif self.os_type == "macOS":
-                for line in result.split('\n'):
-                    if "SSID" in line:
-                        return line.split(':')[1].strip()
-            elif self.os_type == "Linux":
-                for line in result.split('\n'):
-                    if "yes" in line:
-                        return line.split(':')[1].strip()
-            return None
-        except subprocess.CalledProcessError:
-            return None
-
-    def is_wifi_powered_down(self):
-        """Check if Wi-Fi is powered down"""
-        commands = self.get_os_commands()
-        if not commands:
-            return True
-        try:
-            result = subprocess.check_output(commands["interface_state"], shell=True, text=True)
-            if self.os_type == "Windows":
-                for line in result.split('\n'):
-                    if "Admin State" in line:
-                        return "disable" in line.lower()
-            elif self.os_type == "macOS":
-                return "Off" in result
-            elif self.os_type == "Linux":
-                return "disabled" in result.lower()
-            return False
-        except subprocess.CalledProcessError:
-            return True
-
-    def toggle_wifi(self, power_up_only=False):
-        """Toggle Wi-Fi or power up"""
-        commands = self.get_os_commands()
-        if not commands:
-            return
-        if self.is_wifi_powered_down():
-            self.update_terminal("Wi-Fi powered down. Powering up...")
-            os.system(commands["enable"])
-            time.sleep(2)  # Reduced from 5 to 2 seconds
-        elif not power_up_only:
-            self.update_terminal("Toggling Wi-Fi...")
-            os.system(commands["disable"])
-            time.sleep(2)  # Reduced from 5 to 2 seconds
-            os.system(commands["enable"])
-            time.sleep(2)  # Reduced from 5 to 2 seconds
-
     def get_available_wifi(self):
         """Get list of available Wi-Fi networks"""
-        commands = self.get_os_commands()
-        if not commands:
+        if self.client:
+            return self.client.scan(fresh=True)
+        if not self.backend:
             return []
-        try:
-            result = subprocess.check_output(commands["show_networks"], shell=True, text=True)
-            networks = []
-            if self.os_type == "Windows":
-                current_ssid = None
-                for line in result.split('\n'):
-                    if line.strip().startswith("SSID"):
-                        current_ssid = line.split(':')[1].strip()
-                    elif line.strip().startswith("BSSID") and current_ssid:
-                        bssid = line.split(':')[1].strip()
-                        networks.append((current_ssid, bssid))
-            elif self.os_type == "macOS":
-                for line in result.split('\n')[1:]:
-                    parts = line.split()
-                    if len(parts) > 1:
-                        ssid = " ".join(parts[1:-6])
-                        bssid = parts[0]
-                        networks.append((ssid, bssid))
-            elif self.os_type == "Linux":
-                for line in result.split('\n'):
-                    if line.strip():
-                        ssid, bssid = line.split(':', 1)
-                        networks.append((ssid, bssid))
-            return networks
-        except subprocess.CalledProcessError:
-            return []
-
-    def connect_to_wifi(self, ssid):
-        """Connect to the specified Wi-Fi"""
-        commands = self.get_os_commands()
-        if commands:
-            os.system(commands["connect"](ssid))
-            time.sleep(2)  # Reduced from 5 to 2 seconds
+        return self.backend.scan()
 
     def update_terminal(self, message):
-        """Update the terminal with new lines at the bottom"""
-        self.terminal_text = f"{self.terminal_text}\n{message}"[-500:]
-        self.terminal_label.text = self.terminal_text
+        """Add a line to the terminal; safe from any thread"""
+        self.events.emit(message)
 
-    def monitor_connection(self, dt):
-        """Monitor and maintain connection"""
-        if not self.monitoring or not self.selected_ssid:
-            return
-        if self.is_wifi_powered_down():
-            self.update_terminal(f"Wi-Fi powered down. Reconnecting to {self.selected_ssid}...")
-            self.toggle_wifi(power_up_only=True)
-            self.connect_to_wifi(self.selected_ssid)
-        else:
-            current_ssid = self.get_current_wifi()
-            if current_ssid is None:
-                self.update_terminal(f"Disconnected from {self.selected_ssid}. Reconnecting...")
-                self.toggle_wifi()
-                self.connect_to_wifi(self.selected_ssid)
-            elif current_ssid != self.selected_ssid:
-                self.update_terminal(f"Connected to {current_ssid}. Switching to {self.selected_ssid}...")
-                self.toggle_wifi()
-                self.connect_to_wifi(self.selected_ssid)
-            else:
-                self.update_terminal(f"Connected to {self.selected_ssid} - All good!")
+    def flush_terminal(self, dt):
+        """Redraw the terminal from the newest events"""
+        self.terminal_label.text = "\n".join(event.format() for event in self.events.recent(TERMINAL_LINES))
 
     def refresh_wifi_list(self, instance):
-        """Refresh the Wi-Fi list in the table"""
-        self.wifi_table.clear_widgets()
-        self.wifi_table.add_widget(Label(text="Si No", color=[0, 0, 0, 1], size_hint_x=0.1, bold=True, height=40))
-        self.wifi_table.add_widget(Label(text="Radio", color=[0, 0, 0, 1], size_hint_x=0.2, bold=True, height=40))
-        self.wifi_table.add_widget(Label(text="WiFi Name", color=[0, 0, 0, 1], size_hint_x=0.4, bold=True, height=40))
-        self.wifi_table.add_widget(Label(text="BSSID", color=[0, 0, 0, 1], size_hint_x=0.3, bold=True, height=40))
-        networks = self.get_available_wifi()
-        if not networks:
+        """Scan for networks on the monitor worker and fill the table when done"""
+        # Grouping and sorting run on the worker too; the UI thread only merges
+        self.monitor.submit(
+            lambda: network_rows(self.get_available_wifi()),
+            on_done=lambda rows: Clock.schedule_once(lambda dt: self.show_wifi_list(rows)),
+        )
+
+    def show_wifi_list(self, rows):
+        """Merge fresh rows into the table by key, keeping the selection"""
+        if not rows:
             self.update_terminal("No networks found")
-            self.wifi_table.add_widget(Label(text="No networks", color=[0, 0, 0, 1], size_hint_x=0.1, height=40))
-            self.wifi_table.add_widget(Label(text="", color=[0, 0, 0, 1], size_hint_x=0.2, height=40))
-            self.wifi_table.add_widget(Label(text="available", color=[0, 0, 0, 1], size_hint_x=0.4, height=40))
-            self.wifi_table.add_widget(Label(text="", color=[0, 0, 0, 1], size_hint_x=0.3, height=40))
-            return
-        for i, (ssid, bssid) in enumerate(networks, 1):
-            si_no = Label(text=str(i), color=[0, 0, 0, 1], size_hint_x=0.1, height=40)
-            cb = CheckBox(group='wifi', color=[0, 0, 0, 1], size_hint_x=0.2, height=40)
-            cb.bind(active=lambda cb, value, s=ssid: self.on_checkbox_active(s, value))
-            wifi_name = Label(text=ssid, color=[0, 0, 0, 1], size_hint_x=0.4, height=40)
-            bssid_label = Label(text=bssid, color=[0, 0, 0, 1], size_hint_x=0.3, height=40)
-            self.wifi_table.add_widget(si_no)
-            self.wifi_table.add_widget(cb)
-            self.wifi_table.add_widget(wifi_name)
-            self.wifi_table.add_widget(bssid_label)
+        select_rows(rows, self.selected_ssid)
+        diff = diff_rows(self.wifi_table.data, rows)
+        if diff.added or diff.removed or diff.reordered:
+            self.wifi_table.data = diff.rows
+        elif diff.updated:
+            self.wifi_table.refresh_from_data()
 
     def on_checkbox_active(self, ssid, value):
         """Handle checkbox selection"""
-        if value:
-            self.selected_ssid = ssid
+        self.selected_ssid = ssid if value else None
+        if select_rows(self.wifi_table.data, self.selected_ssid):
+            self.wifi_table.refresh_from_data()
 
     def start_monitoring(self, instance):
         """Start monitoring the selected Wi-Fi"""
-        if self.selected_ssid and self.os_type:
+        if not self.attached:
+            self.update_terminal("Still looking for a monitor or Wi-Fi tools, try again in a moment")
+        elif self.blocked_socket:
+            self.show_blocked()
+        elif not self.backend and not self.client:
+            self.update_terminal("No supported Wi-Fi tools found on this system!")
+        elif self.selected_ssid:
             self.monitoring = True
-            self.connect_to_wifi(self.selected_ssid)
-            self.update_terminal(f"Connecting to {self.selected_ssid}...")
-            Clock.schedule_interval(self.monitor_connection, 5)  # Reduced from 10 to 5 seconds
+            if self.client:
+                ssid = self.selected_ssid
+                self.monitor.submit(lambda: self.client.request("set_target", ssid=ssid))
+            else:
+                self.monitor.set_target(self.selected_ssid)
         else:
-            self.update_terminal("Please select a Wi-Fi and OS!")
-
-    def set_os(self, os_name, value):
-        """Set the OS type"""
-        if value:
-            self.os_type = os_name
-            self.refresh_wifi_list(None)
+            self.update_terminal("Please select a Wi-Fi!")
+
+    def show_blocked(self):
+        self.update_terminal(f"A monitor is already running on {self.blocked_socket} but this user cannot use it "
+                             "(ask for its --socket-group); not starting a second one")
+
+    def show_backend(self, text):
+        """Show the detected backend and interface"""
+        self.backend_label.text = f"Backend: {text}"
+
+    def on_control_message(self, message):
+        """Mirror the daemon's pushed events into the terminal; runs on the client thread"""
+        if "event" in message:
+            event = message["event"]
+            self.events.emit(event["message"], event["level"], event["kind"], event["ssid"])
+        state = message.get("state")
+        if state:
+            text = f"{state['os_type']} ({state['backend']}) on {state['interface']}, shared with the daemon"
+            Clock.schedule_once(lambda dt: self.show_backend(text))
 
     def build(self):
         layout = BoxLayout(orientation='vertical', padding=10, spacing=10)
 
-        # OS Selection
-        os_layout = BoxLayout(orientation='horizontal', size_hint_y=0.1)
-        os_layout.add_widget(Label(text="Select OS:", color=[0, 0, 0, 1]))
-        for os_name in ["Windows", "macOS", "Linux"]:
-            cb = CheckBox(group='os', color=[0, 0, 0, 1], size_hint_x=0.1)
-            cb.bind(active=lambda cb, value, n=os_name: self.set_os(n, value))
-            os_layout.add_widget(cb)
-            os_layout.add_widget(Label(text=os_name, color=[0, 0, 0, 1], size_hint_x=0.3))
-        layout.add_widget(os_layout)
+        # Detected backend
+        self.backend_label = Label(text="Backend: none found", color=[0, 0, 0, 1], size_hint_y=0.1)
+        layout.add_widget(self.backend_label)
 
         # Wi-Fi Table
-        scroll = ScrollView(size_hint_y=0.5)
-        self.wifi_table = GridLayout(cols=4, spacing=5, size_hint_y=None, row_default_height=40)
-        self.wifi_table.bind(minimum_height=self.wifi_table.setter('height'))
-        scroll.add_widget(self.wifi_table)
-        layout.add_widget(scroll)
+        header = BoxLayout(orientation='horizontal', size_hint_y=None, height=40)
+        for text, width in (("Radio", 0.1), ("WiFi Name", 0.35), ("BSSID", 0.3), ("Signal", 0.1), ("Band", 0.15)):
+            header.add_widget(Label(text=text, color=[0, 0, 0, 1], size_hint_x=width, bold=True))
+        layout.add_widget(header)
+        self.wifi_table = RecycleView(size_hint_y=0.45, viewclass=NetworkRow)
+        rows_layout = RecycleBoxLayout(orientation='vertical', default_size=(None, 40),
+                                       default_size_hint=(1, None), size_hint_y=None)
+        rows_layout.bind(minimum_height=rows_layout.setter('height'))
+        self.wifi_table.add_widget(rows_layout)
+        layout.add_widget(self.wifi_table)
 
         # Buttons
         btn_layout = BoxLayout(orientation='horizontal', size_hint_y=0.1)
@@ -272,10 +191,53 @@ class WiFiManager(App):
         terminal_scroll.add_widget(self.terminal_label)
         layout.add_widget(terminal_scroll)
 
-        # Initial refresh
+        return layout
+
+    def attach(self):
+        """Join a running daemon or set up a local backend; runs on the monitor worker
+
+        Finding the daemon, detecting the backend (which spawns probes), reading
+        the state file and starting the event watcher all block, so none of it
+        runs on the frame loop. Returns the backend description for the label.
+        """
+        # With a daemon already running this window is just another client of it:
+        # no probes of its own, and the local monitor only runs background jobs
+        self.client, self.blocked_socket = ControlClient.find()
+        try:
+            if self.client:
+                self.client.subscribe(self.on_control_message)
+                self.update_terminal(f"Connected to the running monitor on {self.client.path}")
+                return None
+            if self.blocked_socket:
+                # A daemon we may not talk to still owns the adapter; never compete with it
+                self.show_blocked()
+                return None
+            backend = detect_backend()
+            if backend is None:
+                return None
+            self.monitor.store = ConnectionStore(
+                notify=lambda message: self.events.emit(message, "warning", "store"))
+            self.monitor.set_backend(backend)
+            self.backend = backend
+            if self.monitor.watch_events(backend.event_command):
+                self.update_terminal("Following link state events")
+            return f"{backend.os_type} ({backend.name}) on {backend.interface}"
+        finally:
+            self.attached = True
+
+    def on_start(self):
+        self.monitor.start()
+        self.monitor.submit(
+            self.attach,
+            on_done=lambda text: text and Clock.schedule_once(lambda dt: self.show_backend(text)),
+        )
+        # Queued behind attach(), so it scans through whatever attach() found
         self.refresh_wifi_list(None)
 
-        return layout
+    def on_stop(self):
+        self.monitor.stop(timeout=5)
+        if self.client:
+            self.client.close()
 
 if __name__ == "__main__":
     WiFiManager().run()
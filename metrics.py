@@ -0,0 +1,195 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PROBE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+# Connects and power cycles wait on the driver and often take tens of seconds
+ACTION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+RECONNECT_BUCKETS = (0.5, 1, 2, 5, 10, 20, 30, 60, 120, 300)
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{str(value)}"' for key, value in labels) + "}"
+
+
+def _value(value):
+    """Sample value at full precision; :g would turn 3703701 into 3.7037e+06"""
+    return str(value) if isinstance(value, int) else repr(float(value))
+
+
+class Metric:
+    """A named family of samples keyed by label set"""
+
+    kind = None
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self.values = {}
+
+    def header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self):
+        return self.header() + [f"{self.name}{_labels(labels)} {_value(value)}" for labels, value in self.values.items()]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, labels=(), amount=1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, labels, value):
+        self.values[labels] = value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, buckets):
+        super().__init__(name, help_text)
+        self.buckets = buckets
+
+    def observe(self, labels, value):
+        counts, total, count = self.values.get(labels, ([0] * len(self.buckets), 0.0, 0))
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+        self.values[labels] = (counts, total + value, count + 1)
+
+    def render(self):
+        lines = self.header()
+        for labels, (counts, total, count) in self.values.items():
+            for bound, bucket in zip(self.buckets, counts):
+                lines.append(f"{self.name}_bucket{_labels(labels + (('le', f'{bound:g}'),))} {bucket}")
+            lines.append(f"{self.name}_bucket{_labels(labels + (('le', '+Inf'),))} {count}")
+            lines.append(f"{self.name}_sum{_labels(labels)} {_value(total)}")
+            lines.append(f"{self.name}_count{_labels(labels)} {count}")
+        return lines
+
+
+class Metrics:
+    """Probe, action and recovery measurements, rendered in Prometheus text format"""
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._down_since = {}
+        self.probe_seconds = Histogram("wifi_probe_seconds", "Latency of link state probes", PROBE_BUCKETS)
+        self.action_seconds = Histogram("wifi_action_seconds", "Latency of OS recovery actions", ACTION_BUCKETS)
+        self.events = Counter("wifi_link_events_total", "Disconnects, SSID mismatches and radio-off detections")
+        self.toggles = Counter("wifi_toggles_total", "Radio or interface power cycles")
+        self.reconnects = Counter("wifi_reconnects_total", "Recoveries by outcome")
+        self.downtime = Counter("wifi_downtime_seconds_total", "Time spent away from the target network")
+        self.off_preferred = Counter("wifi_time_off_preferred_seconds_total",
+                                     "Time spent on a fallback instead of the preferred network")
+        self.signal = Gauge("wifi_signal_percent", "Signal of the current link, 0-100")
+        self.rssi = Gauge("wifi_rssi_dbm", "Approximate RSSI of the current link")
+        self.checks = Counter("wifi_checks_total", "Link checks, i.e. monitor wakeups")
+        self.check_interval = Gauge("wifi_check_interval_seconds", "Current base interval between checks")
+        self.reconnect_seconds = Histogram("wifi_reconnect_seconds", "Time from detection to a usable link",
+                                           RECONNECT_BUCKETS)
+        self.all = [self.probe_seconds, self.action_seconds, self.events, self.toggles, self.reconnects,
+                    self.downtime, self.off_preferred, self.signal, self.rssi, self.reconnect_seconds, self.checks,
+                    self.check_interval]
+
+    def observe_probe(self, probe, seconds):
+        with self._lock:
+            self.probe_seconds.observe((("probe", probe),), seconds)
+
+    def observe_action(self, action, seconds):
+        with self._lock:
+            self.action_seconds.observe((("action", action),), seconds)
+            if action in ("disable", "interface_down"):
+                self.toggles.inc((("kind", "radio" if action == "disable" else "interface"),))
+
+    def observe_check(self, interface, interval):
+        with self._lock:
+            self.checks.inc((("interface", interface),))
+            if interval is not None:
+                self.check_interval.set((("interface", interface),), interval)
+
+    def observe_interval(self, interface, interval):
+        """Set the check interval of an interface paced by someone else, e.g. a Supervisor"""
+        with self._lock:
+            self.check_interval.set((("interface", interface),), interval)
+
+    def observe_off_preferred(self, interface, seconds):
+        with self._lock:
+            self.off_preferred.inc((("interface", interface),), seconds)
+
+    def link_event(self, interface, kind):
+        """Count a disconnect, mismatch or powered_down and start the downtime clock"""
+        with self._lock:
+            self.events.inc((("interface", interface), ("kind", kind)))
+            self._down_since.setdefault(interface, self.clock())
+
+    def _end_downtime(self, interface):
+        started = self._down_since.pop(interface, None)
+        if started is not None:
+            self.downtime.inc((("interface", interface),), self.clock() - started)
+
+    def link_up(self, interface, signal):
+        """Stop the downtime clock and record the current signal"""
+        with self._lock:
+            self._end_downtime(interface)
+            if signal is not None:
+                self.signal.set((("interface", interface),), signal)
+                # Inverse of the usual percent = 2 * (dBm + 100) mapping
+                self.rssi.set((("interface", interface),), signal / 2 - 100)
+
+    def observe_reconnect(self, interface, seconds=None):
+        """Record one recovery; seconds is None when it failed"""
+        with self._lock:
+            outcome = "failed" if seconds is None else "ok"
+            self.reconnects.inc((("interface", interface), ("outcome", outcome)))
+            if seconds is not None:
+                self._end_downtime(interface)
+                self.reconnect_seconds.observe((("interface", interface),), seconds)
+
+    def render(self):
+        with self._lock:
+            now = self.clock()
+            # Count downtime that is still in progress
+            pending = {interface: now - started for interface, started in self._down_since.items()}
+            lines = []
+            for metric in self.all:
+                if metric is self.downtime and pending:
+                    values = dict(metric.values)
+                    for interface, seconds in pending.items():
+                        key = (("interface", interface),)
+                        values[key] = values.get(key, 0) + seconds
+                    lines += metric.header() + [f"{metric.name}{_labels(k)} {_value(v)}" for k, v in values.items()]
+                else:
+                    lines += metric.render()
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port, host="127.0.0.1"):
+        """Serve /metrics on a background thread; returns the server"""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, name="wifi-metrics", daemon=True).start()
+        return server
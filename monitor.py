@@ -0,0 +1,462 @@
+import functools
+import queue
+import subprocess
+import threading
+import time
+
+from eventlog import EventLog
+from failover import Failover, FailoverPolicy
+from recovery import DEFAULT_STEPS, ReconnectStats, RecoveryLadder, run_action, wait_for_link
+from roaming import RoamPolicy, Roamer
+from scheduler import AdaptiveInterval
+
+# Sentinel queued by wake() to request an immediate check
+_CHECK = object()
+
+# Words in nmcli monitor output that mean the link state may have changed
+LINK_EVENT_WORDS = ("connected", "unavailable", "unmanaged", "disabled", "enabled", "is now")
+
+
+class LinkEventWatcher:
+    """Follow a long-running `nmcli monitor` style stream and report state changes"""
+
+    def __init__(self, on_event, command=("nmcli", "device", "monitor")):
+        self.on_event = on_event
+        self.command = list(command)
+        self._proc = None
+        self._thread = None
+
+    def start(self):
+        """Spawn the monitor process; return False if it cannot be started"""
+        try:
+            self._proc = subprocess.Popen(
+                self.command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, bufsize=1
+            )
+        except OSError:
+            self._proc = None
+            return False
+        self._thread = threading.Thread(target=self._read, name="wifi-events", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        """Terminate the monitor process"""
+        if self._proc and self._proc.poll() is None:
+            self._proc.terminate()
+            try:
+                self._proc.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                self._proc.kill()
+        if self._thread:
+            self._thread.join(2)
+
+    def is_alive(self):
+        return self._proc is not None and self._proc.poll() is None
+
+    def _read(self):
+        for line in self._proc.stdout:
+            line = line.strip()
+            if line and any(word in line.lower() for word in LINK_EVENT_WORDS):
+                self.on_event(line)
+        self._proc.stdout.close()
+        self._proc.wait()
+        # Stream ended: one last event so the monitor falls back to polling
+        self.on_event(None)
+
+
+class ConnectionMonitor:
+    """Run every Wi-Fi probe and recovery action on one background worker"""
+
+    def __init__(self, backend=None, interval=5, log=None, event_interval=60, steps=DEFAULT_STEPS, name=None,
+                 clock=time.monotonic, sleep=time.sleep, roaming=RoamPolicy(),
+                 store=None, failover=FailoverPolicy()):
+        self.name = name
+        # Injectable so simulations can run the monitor on virtual time
+        self.clock = clock
+        self.sleep = sleep
+        self.backend = None
+        self.ladder = None
+        self.roamer = None
+        self.roaming = roaming
+        self.store = store
+        self.failover_policy = failover
+        self.failover = None
+        self.paused = False
+        self.steps = steps
+        self.interval = interval
+        # An AdaptiveInterval both paces the checks and learns from each one
+        self.schedule = interval if isinstance(interval, AdaptiveInterval) else None
+        if self.schedule and self.schedule.clock is time.monotonic:
+            # Flap windows then run on the monitor's time, virtual in simulations
+            self.schedule.clock = clock
+        self.event_interval = event_interval
+        self.log = log if log is not None else EventLog()
+        self.target_ssid = None
+        self.watcher = None
+        self.reconnect_stats = ReconnectStats()
+        self._jobs = queue.Queue()
+        self._stop = threading.Event()
+        self._wake_pending = threading.Event()
+        # Set by event wakes: the cached snapshot predates the change the OS reported
+        self._link_changed = threading.Event()
+        self._thread = None
+        if backend:
+            self._use_backend(backend)
+
+    def start(self):
+        """Start the worker thread"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        name = f"wifi-monitor-{self.name}" if self.name else "wifi-monitor"
+        self._thread = threading.Thread(target=self.run, name=name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """Ask the worker to exit and wait for it"""
+        self._stop.set()
+        if self.watcher:
+            self.watcher.stop()
+        self._jobs.put(None)
+        if self._thread:
+            self._thread.join(timeout)
+
+    def submit(self, func, on_done=None):
+        """Queue func to run on the worker; on_done receives its result there"""
+        self._jobs.put((func, on_done))
+
+    def pause(self):
+        """Stop checking and recovering until resume(); jobs still run"""
+        if not self.paused:
+            self.paused = True
+            self.emit("Monitoring paused", kind="paused")
+
+    def resume(self):
+        if self.paused:
+            self.paused = False
+            self.emit("Monitoring resumed", kind="resumed")
+            self.wake()
+
+    def wake(self, reason=None):
+        """Request an immediate check; bursts of wakes collapse into one
+
+        reason is the OS event line that caused the wake, if any; such a
+        check skips the probe cache, which still holds the link as it was
+        before the event.
+        """
+        if reason:
+            self._link_changed.set()
+        if not self._wake_pending.is_set():
+            self._wake_pending.set()
+            self._jobs.put(_CHECK)
+
+    def watch_events(self, command=None):
+        """Switch to event-driven checks; polling stays on as a slow fallback"""
+        if self.watcher and self.watcher.is_alive():
+            return True
+        command = command or (self.backend and self.backend.event_command)
+        if not command:
+            return False
+        self.watcher = LinkEventWatcher(self.wake, command)
+        if not self.watcher.start():
+            self.watcher = None
+            return False
+        return True
+
+    def current_interval(self):
+        """Polling interval, relaxed while a live event stream is attached; None means wake-only"""
+        if self.watcher and self.watcher.is_alive():
+            return self.event_interval
+        if self.schedule is not None and self.interval is not None:
+            return self.schedule.next_interval()
+        return self.interval
+
+    def set_backend(self, backend):
+        """Attach or replace the backend between worker jobs
+
+        main_V3 builds its monitor without one and attaches the detected
+        backend this way once the blocking detection has run on the worker.
+        """
+        self.submit(lambda: self._use_backend(backend))
+
+    def _use_backend(self, backend):
+        self.backend = backend
+        self.ladder = RecoveryLadder(backend, self.steps, notify=functools.partial(self.emit, kind="recovery"),
+                                     clock=self.clock, sleep=self.sleep, store=self.store)
+        # Roaming needs to pick the BSSID; without that it could only reconnect blindly
+        self.roamer = None
+        if self.roaming and "bssid_connect" in backend.capabilities:
+            self.roamer = Roamer(backend, self.roaming, notify=functools.partial(self.emit, kind="roam"),
+                                 clock=self.clock, sleep=self.sleep)
+
+    def set_target(self, ssid):
+        """Change the monitored SSID and connect to it from the worker unless already on it"""
+        def connect():
+            self.failover = None
+            self.target_ssid = ssid
+            if self.store:
+                self.store.set_last_target(ssid)
+            if not self.ladder:
+                return
+            started = self.clock()
+            snap = self.backend.snapshot()
+            if snap.powered and snap.ssid == ssid:
+                self.ladder.note_healthy(snap)
+                self.emit(f"Connected to {ssid} - All good!", kind="status", ssid=ssid)
+                return
+            self.emit(f"Connecting to {ssid}...", kind="connect", ssid=ssid)
+            self._finish_recovery(ssid, started, self.ladder.recover(ssid))
+        self.submit(connect)
+
+    def set_targets(self, ssids):
+        """Hold the best of several SSIDs, most preferred first"""
+        if len(ssids) == 1:
+            self.set_target(ssids[0])
+            return
+
+        def connect():
+            self.failover = Failover(self.backend, ssids, self.failover_policy,
+                                     notify=functools.partial(self.emit, kind="failover"), clock=self.clock)
+            self.target_ssid = ssids[0]
+            if self.store:
+                self.store.set_last_target(ssids[0], ssids[1:])
+            self.wake()
+        self.submit(connect)
+
+    def emit(self, message, level="info", kind="info", ssid=None):
+        """Log an event, tagged with this monitor's name when it has one"""
+        if self.name:
+            message = f"[{self.name}] {message}"
+        return self.log.emit(message, level, kind, ssid)
+
+    def _next_check(self):
+        interval = self.current_interval()
+        return None if interval is None else self.clock() + interval
+
+    def _get_job(self, timeout):
+        """Next queued job, waiting at most timeout seconds on the monitor's clock
+
+        A virtual clock (simulation.VirtualClock) provides get_job() so the
+        wait passes on its own time instead of the wall clock's.
+        """
+        get_job = getattr(self.clock, "get_job", None)
+        if get_job:
+            return get_job(self._jobs, timeout)
+        return self._jobs.get(timeout=timeout)
+
+    def run(self):
+        """Worker loop; start() runs it on a thread, console scripts call it directly"""
+        next_check = self._next_check()
+        while not self._stop.is_set():
+            try:
+                timeout = None if next_check is None else max(0, next_check - self.clock())
+                job = self._get_job(timeout)
+            except queue.Empty:
+                job = None
+            if self._stop.is_set():
+                break
+            try:
+                if job is None or job is _CHECK:
+                    self._wake_pending.clear()
+                    if self._link_changed.is_set():
+                        self._link_changed.clear()
+                        if self.backend:
+                            self.backend.forget_link()
+                    try:
+                        self.check_once()
+                    finally:
+                        # A check that raised still waits a full interval before the next one
+                        next_check = self._next_check()
+                else:
+                    func, on_done = job
+                    result = func()
+                    if on_done:
+                        on_done(result)
+            except Exception as e:
+                self.emit(f"Monitor error: {e}", level="error", kind="error")
+
+    def check_once(self):
+        """Check the link once and recover it if needed"""
+        ssid = self.target_ssid
+        if not ssid or not self.backend or self.paused:
+            return
+        started = self.clock()
+        snap = self.backend.snapshot()
+        if self.failover:
+            ssid = self.target_ssid = self.failover.target(snap)
+        metrics = self.backend.metrics
+        healthy = snap.powered and snap.ssid == ssid
+        if self.schedule:
+            self.schedule.record(healthy, snap.signal if healthy else None)
+        if metrics:
+            metrics.observe_check(self.backend.interface, self.schedule.interval if self.schedule else self.interval)
+        if healthy:
+            self.ladder.note_healthy(snap)
+            if metrics:
+                metrics.link_up(self.backend.interface, snap.signal)
+            self.emit(f"Connected to {ssid} - All good!", kind="status", ssid=ssid)
+            better = self.failover and self.failover.failback(ssid)
+            if better:
+                self._fail_back(ssid, better)
+            elif self.roamer:
+                self.roamer.consider(ssid, snap)
+            return
+        if not snap.powered:
+            kind, message = "powered_down", f"Wi-Fi powered down. Reconnecting to {ssid}..."
+        elif snap.ssid is None:
+            kind, message = "disconnect", f"Disconnected from {ssid}. Reconnecting..."
+        else:
+            kind, message = "mismatch", f"Connected to {snap.ssid}. Switching to {ssid}..."
+        if metrics:
+            metrics.link_event(self.backend.interface, kind)
+        self.emit(message, "warning", kind, ssid)
+        self._finish_recovery(ssid, started, self.ladder.recover(ssid))
+
+    def _fail_back(self, fallback, ssid):
+        """Try ssid with one plain connect and return to fallback if it does not come up
+
+        The link was healthy, so this stays out of the ladder's episodes, the
+        reconnect stats and the downtime metrics.
+        """
+        timeout = self.failover.policy.failback_timeout
+        waits = {"sleep": self.sleep, "clock": self.clock}
+        try:
+            run_action(self.backend, "connect", ssid, clock=self.clock)
+            connected = wait_for_link(self.backend, ssid, timeout, **waits)
+        except (subprocess.CalledProcessError, OSError):
+            connected = False
+        self.failover.record(ssid, connected)
+        if connected:
+            self.target_ssid = ssid
+            self.emit(f"Failed back to {ssid}", kind="failback", ssid=ssid)
+            return
+        self.emit(f"{ssid} did not come up; returning to {fallback}", "warning", "failback", ssid)
+        try:
+            run_action(self.backend, "connect", fallback, clock=self.clock)
+            wait_for_link(self.backend, fallback, timeout, **waits)
+        except (subprocess.CalledProcessError, OSError):
+            # The next check finds the link down and recovers it through the ladder
+            pass
+
+    def _finish_recovery(self, ssid, started, connected):
+        """Record how long a recovery took, measured from detection"""
+        if self.failover:
+            self.failover.record(ssid, connected)
+        metrics = self.backend.metrics
+        if connected:
+            elapsed = self.clock() - started
+            self.reconnect_stats.record(elapsed)
+            if metrics:
+                metrics.observe_reconnect(self.backend.interface, elapsed)
+            self.emit(f"Reconnected to {ssid} in {elapsed:.1f}s ({self.reconnect_stats.summary()})",
+                      kind="reconnect", ssid=ssid)
+        else:
+            self.reconnect_stats.record_failure()
+            if metrics:
+                metrics.observe_reconnect(self.backend.interface)
+            self.emit(f"Could not reconnect to {ssid} yet ({self.reconnect_stats.summary()})",
+                      "error", "reconnect_failed", ssid)
+
+
+class Supervisor:
+    """Keep several (interface, SSID) pairs connected from one process
+
+    Every interface gets its own ConnectionMonitor worker, so a slow recovery
+    on one radio never delays the others. The monitors do not poll on their
+    own: one ticker refreshes the shared backend snapshot for all interfaces
+    at once and then wakes every monitor, which reads it from the cache.
+    """
+
+    def __init__(self, backend, targets, interval=5, log=None, steps=DEFAULT_STEPS, event_interval=60,
+                 roaming=RoamPolicy(), store=None):
+        self.backend = backend
+        self.interval = interval
+        self.schedule = interval if isinstance(interval, AdaptiveInterval) else None
+        self.event_interval = event_interval
+        self.log = log if log is not None else EventLog()
+        self.watcher = None
+        self.targets = dict(targets)
+        self.monitors = {}
+        for interface, ssid in targets:
+            # Wake-only: the ticker paces every interface and alone feeds the schedule
+            monitor = ConnectionMonitor(backend.for_interface(interface), interval=None, log=self.log,
+                                        steps=steps, name=interface, roaming=roaming, store=store)
+            monitor.set_target(ssid)
+            self.monitors[interface] = monitor
+        self._schedule_lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def start(self):
+        for monitor in self.monitors.values():
+            monitor.start()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self.watcher:
+            self.watcher.stop()
+        for monitor in self.monitors.values():
+            monitor.stop(timeout)
+
+    def watch_events(self, command=None):
+        """Follow one shared event stream and wake only the interface it names"""
+        command = command or self.backend.event_command
+        if not command:
+            return False
+        self.watcher = LinkEventWatcher(self.on_event, command)
+        if not self.watcher.start():
+            self.watcher = None
+            return False
+        return True
+
+    def on_event(self, line):
+        device = line.split(':', 1)[0].strip() if line else None
+        for interface, monitor in self.monitors.items():
+            if device not in self.monitors or device == interface:
+                monitor.wake(line)
+
+    def tick(self):
+        """Refresh every interface with one batched probe, then wake all monitors"""
+        for monitor in self.monitors.values():
+            monitor.backend.invalidate()
+        next(iter(self.monitors.values())).backend.snapshot()
+        if self.schedule:
+            self._record_tick()
+        for monitor in self.monitors.values():
+            monitor.wake()
+
+    def _record_tick(self):
+        """Feed the shared schedule one outcome per tick: healthy only if every interface is"""
+        healthy, signals = True, []
+        for interface, monitor in self.monitors.items():
+            snap = monitor.backend.snapshot()
+            if snap.powered and snap.ssid == (monitor.target_ssid or self.targets[interface]):
+                if snap.signal is not None:
+                    signals.append(snap.signal)
+            else:
+                healthy = False
+        with self._schedule_lock:
+            # The weakest link decides whether the signal is falling
+            self.schedule.record(healthy, min(signals) if healthy and signals else None)
+            interval = self.schedule.interval
+        if self.backend.metrics:
+            for interface in self.monitors:
+                self.backend.metrics.observe_interval(interface, interval)
+
+    def _next_interval(self):
+        with self._schedule_lock:
+            return self.schedule.next_interval()
+
+    def run(self):
+        """Start the monitors and tick until stopped"""
+        self.start()
+        try:
+            while not self._stop.is_set():
+                if self.monitors:
+                    self.tick()
+                alive = self.watcher is not None and self.watcher.is_alive()
+                if alive:
+                    self._stop.wait(self.event_interval)
+                else:
+                    self._stop.wait(self._next_interval() if self.schedule else self.interval)
+        finally:
+            self.stop(timeout=0)
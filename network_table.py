@@ -0,0 +1,82 @@
+from typing import NamedTuple
+
+
+class RowDiff(NamedTuple):
+    """Result of applying a fresh scan onto the table's rows"""
+    rows: list
+    added: int
+    removed: int
+    updated: int
+    reordered: bool
+
+    @property
+    def changed(self):
+        return bool(self.added or self.removed or self.updated or self.reordered)
+
+
+def _signal(value):
+    return -1 if value is None else value
+
+
+def network_rows(records, selected_ssid=None):
+    """Table rows: one per SSID, strongest first, each followed by its BSSIDs"""
+    groups = {}
+    for record in records:
+        groups.setdefault(record.ssid, []).append(record)
+    rows = []
+    for ssid, members in sorted(groups.items(), key=lambda item: -max(_signal(r.signal) for r in item[1])):
+        members.sort(key=lambda r: -_signal(r.signal))
+        best = members[0]
+        rows.append({
+            "key": ("ssid", ssid),
+            "kind": "ssid",
+            "ssid": ssid,
+            "name": ssid or "<hidden>",
+            "bssid": f"{len(members)} BSSID" + ("s" if len(members) > 1 else ""),
+            "signal": best.signal,
+            "detail": best.band or "",
+            "selected": ssid == selected_ssid,
+        })
+        for record in members:
+            rows.append({
+                "key": ("bssid", ssid, record.bssid),
+                "kind": "bssid",
+                "ssid": ssid,
+                "name": "",
+                "bssid": record.bssid,
+                "signal": record.signal,
+                "detail": f"ch {record.channel}" if record.channel else "",
+                "selected": False,
+            })
+    return rows
+
+
+def diff_rows(current, rows):
+    """Merge rows into current by key, reusing and updating existing row dicts in place"""
+    existing = {row["key"]: row for row in current}
+    merged = []
+    added = updated = 0
+    for row in rows:
+        old = existing.pop(row["key"], None)
+        if old is None:
+            merged.append(row)
+            added += 1
+        else:
+            if old != row:
+                old.update(row)
+                updated += 1
+            merged.append(old)
+    removed = len(existing)
+    reordered = not added and not removed and any(a is not b for a, b in zip(merged, current))
+    return RowDiff(merged, added, removed, updated, reordered)
+
+
+def select_rows(rows, ssid):
+    """Mark the SSID row for ssid as selected; return the number of rows changed"""
+    changed = 0
+    for row in rows:
+        selected = row["kind"] == "ssid" and row["ssid"] == ssid
+        if row["selected"] != selected:
+            row["selected"] = selected
+            changed += 1
+    return changed
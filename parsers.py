@@ -0,0 +1,169 @@
+import re
+from typing import NamedTuple, Optional
+
+
+class ScanRecord(NamedTuple):
+    """One BSSID seen in a scan"""
+    ssid: str
+    bssid: str
+    signal: Optional[int] = None  # percent, 0-100
+    channel: Optional[int] = None
+    band: Optional[str] = None
+    security: Optional[str] = None
+
+
+def dbm_to_percent(dbm):
+    """Map an RSSI in dBm to the 0-100 scale netsh and nmcli report"""
+    return max(0, min(100, 2 * (int(dbm) + 100)))
+
+
+def band_for_channel(channel):
+    """Best guess of the band from a channel number"""
+    if channel is None:
+        return None
+    return "2.4 GHz" if channel <= 14 else "5 GHz"
+
+
+def band_for_frequency(mhz):
+    if mhz < 3000:
+        return "2.4 GHz"
+    if mhz < 5925:
+        return "5 GHz"
+    return "6 GHz"
+
+
+def normalize_bssid(text):
+    """Lowercase, zero-padded form of a BSSID, or None for an empty one
+
+    airport drops leading zeros ('aa:bb:cc:dd:ee:1'), so every parser and
+    snapshot goes through here before BSSIDs are compared or stored.
+    """
+    text = (text or "").strip()
+    if not text:
+        return None
+    return ":".join(octet.zfill(2) for octet in text.lower().split(":"))
+
+
+def _int(text):
+    """Leading integer of text, or None"""
+    match = re.match(r'\s*(-?\d+)', text or "")
+    return int(match.group(1)) if match else None
+
+
+def split_terse(line):
+    """Split an `nmcli -t` line on ':' while honouring '\\:' escapes"""
+    if '\\' not in line:
+        return line.split(':')
+    fields, current, escaped = [], [], False
+    for ch in line:
+        if escaped:
+            current.append(ch)
+            escaped = False
+        elif ch == "\\":
+            escaped = True
+        elif ch == ":":
+            fields.append("".join(current))
+            current = []
+        else:
+            current.append(ch)
+    fields.append("".join(current))
+    return fields
+
+
+def parse_key_values(lines):
+    """Yield (key, value) from 'key : value' lines, splitting on the first colon only"""
+    for line in lines:
+        key, sep, value = line.partition(':')
+        if sep:
+            yield key.strip(), value.strip()
+
+
+def parse_netsh_interfaces(lines):
+    """Yield one dict per interface block of `netsh wlan show interfaces`"""
+    block = None
+    for key, value in parse_key_values(lines):
+        if key == "Name":
+            if block is not None:
+                yield block
+            block = {}
+        if block is not None:
+            block[key] = value
+    if block is not None:
+        yield block
+
+
+def parse_netsh_networks(lines):
+    """Yield a ScanRecord per BSSID from `netsh wlan show networks mode=bssid`"""
+    ssid = security = None
+    record = None
+    for key, value in parse_key_values(lines):
+        if key.startswith("SSID"):
+            if record:
+                yield ScanRecord(**record)
+                record = None
+            ssid, security = value, None
+        elif key == "Authentication":
+            security = value
+        elif key.startswith("BSSID") and ssid is not None:
+            if record:
+                yield ScanRecord(**record)
+            record = {"ssid": ssid, "bssid": normalize_bssid(value), "security": security}
+        elif record is None:
+            continue
+        elif key == "Signal":
+            record["signal"] = _int(value)
+        elif key == "Channel":
+            record["channel"] = _int(value)
+            record.setdefault("band", band_for_channel(record["channel"]))
+        elif key == "Band":
+            record["band"] = value
+    if record:
+        yield ScanRecord(**record)
+
+
+_AIRPORT_ROW = re.compile(
+    r'^\s*(?P<ssid>.*?)\s+(?P<bssid>[0-9a-fA-F]{1,2}(?::[0-9a-fA-F]{1,2}){5})\s+(?P<rssi>-?\d+)'
+    r'\s+(?P<channel>\d+)\S*\s+[YN-]\s+\S+\s+(?P<security>.*?)\s*$'
+)
+
+
+def parse_airport_scan(lines):
+    """Yield a ScanRecord per row of `airport -s`; SSIDs may contain spaces"""
+    for line in lines:
+        match = _AIRPORT_ROW.match(line)
+        if not match:
+            continue
+        channel = int(match.group("channel"))
+        yield ScanRecord(
+            ssid=match.group("ssid"),
+            bssid=normalize_bssid(match.group("bssid")),
+            signal=dbm_to_percent(match.group("rssi")),
+            channel=channel,
+            band=band_for_channel(channel),
+            security=match.group("security") or None,
+        )
+
+
+NMCLI_SCAN_FIELDS = ("SSID", "BSSID", "SIGNAL", "CHAN", "FREQ", "SECURITY")
+
+
+def parse_nmcli_terse(lines, fields):
+    """Yield a dict per `nmcli -t -f <fields>` line, skipping malformed ones"""
+    for line in lines:
+        values = split_terse(line.rstrip('\n'))
+        if len(values) == len(fields):
+            yield dict(zip(fields, values))
+
+
+def parse_nmcli_scan(lines):
+    """Yield a ScanRecord per line of `nmcli -t -f SSID,BSSID,SIGNAL,CHAN,FREQ,SECURITY device wifi`"""
+    for row in parse_nmcli_terse(lines, NMCLI_SCAN_FIELDS):
+        freq = _int(row["FREQ"])
+        yield ScanRecord(
+            ssid=row["SSID"],
+            bssid=normalize_bssid(row["BSSID"]),
+            signal=_int(row["SIGNAL"]),
+            channel=_int(row["CHAN"]),
+            band=band_for_frequency(freq) if freq else None,
+            security=row["SECURITY"] or None,
+        )
@@ -0,0 +1,278 @@
+import subprocess
+import time
+from collections import deque
+from typing import NamedTuple
+
+
+def wait_until(condition, timeout, initial_delay=0.1, max_delay=2.0, sleep=time.sleep, clock=time.monotonic):
+    """Poll condition with exponential backoff until it is true or timeout passes"""
+    deadline = clock() + timeout
+    delay = initial_delay
+    while True:
+        if condition():
+            return True
+        remaining = deadline - clock()
+        if remaining <= 0:
+            return False
+        sleep(min(delay, remaining))
+        delay = min(delay * 2, max_delay)
+
+
+def wait_for_link(backend, ssid, timeout=15, **kwargs):
+    """Wait until the backend reports a link to ssid with an IP address"""
+    def ready():
+        snap = backend.snapshot(max_age=0)
+        return snap.ssid == ssid and backend.has_ip()
+    return wait_until(ready, timeout, **kwargs)
+
+
+def wait_for_power(backend, powered, timeout=10, **kwargs):
+    """Wait until the radio reports the requested power state"""
+    return wait_until(lambda: backend.snapshot(max_age=0).powered == powered, timeout, **kwargs)
+
+
+def run_action(backend, action, *args, clock=time.monotonic):
+    """Run one backend action, timing it when metrics are attached"""
+    started = clock()
+    try:
+        return getattr(backend, action)(*args)
+    finally:
+        if backend.metrics:
+            backend.metrics.observe_action(action, clock() - started)
+
+
+class ReconnectStats:
+    """Rolling record of measured time-to-reconnect"""
+
+    def __init__(self, size=200):
+        self.samples = deque(maxlen=size)
+        self.failures = 0
+
+    def record(self, seconds):
+        self.samples.append(seconds)
+
+    def record_failure(self):
+        self.failures += 1
+
+    def percentile(self, p):
+        """Nearest-rank percentile of the recorded samples, or None"""
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        rank = max(1, -(-len(ordered) * p // 100))
+        return ordered[int(rank) - 1]
+
+    def summary(self):
+        if not self.samples:
+            return f"no reconnects yet, {self.failures} failed"
+        return (f"p50 {self.percentile(50):.1f}s, p95 {self.percentile(95):.1f}s "
+                f"over {len(self.samples)} reconnects, {self.failures} failed")
+
+
+class RecoveryStep(NamedTuple):
+    """One rung of the recovery ladder"""
+    name: str
+    timeout: float
+
+
+# Cheapest first; each rung only runs once the ones below it have failed
+DEFAULT_STEPS = (
+    RecoveryStep("connect", 15),
+    RecoveryStep("connect_bssid", 15),
+    RecoveryStep("rescan_connect", 20),
+    RecoveryStep("radio_cycle", 30),
+    RecoveryStep("interface_cycle", 40),
+)
+
+# Backend capability each step needs, if any
+STEP_CAPABILITIES = {
+    "connect_bssid": "bssid_connect",
+    "rescan_connect": "rescan",
+    "radio_cycle": "radio",
+    "interface_cycle": "interface",
+}
+
+# Steps that knock every connection on the adapter over; skipped while backing off
+DISRUPTIVE_STEPS = frozenset({"radio_cycle", "interface_cycle"})
+
+
+class RecoveryLadder:
+    """Escalating recovery actions, tracked per failure episode
+
+    An episode starts with the first failure and ends once the link has stayed
+    healthy for episode_window seconds. Within an episode every new failure
+    starts one rung above the step that fixed the previous one, so repeated
+    flaps escalate while a single blip is fixed with a plain reconnect.
+
+    When every rung fails the next attempt starts from the bottom again.
+    Until retry_backoff seconds have passed (doubling per failed climb, up
+    to max_retry_backoff) only the non-disruptive rungs are tried, so a
+    network that is simply out of range does not cycle the radio forever.
+    """
+
+    def __init__(self, backend, steps=DEFAULT_STEPS, episode_window=300, notify=print, clock=time.monotonic,
+                 sleep=time.sleep, store=None, fast_timeout=8, retry_backoff=60, max_retry_backoff=900):
+        self.backend = backend
+        self.steps = [RecoveryStep(*step) for step in steps]
+        self.episode_window = episode_window
+        self.notify = notify
+        self.clock = clock
+        self.sleep = sleep
+        # connection_store.ConnectionStore; enables the remembered-BSSID fast path
+        self.store = store
+        self.fast_timeout = fast_timeout
+        self.time_saved = 0.0
+        self.last_good_bssid = {}
+        self.level = 0
+        self.episode_started = None
+        self.last_failure = None
+        self.retry_backoff = retry_backoff
+        self.max_retry_backoff = max_retry_backoff
+        self.failed_climbs = 0
+        self.retry_at = None
+
+    def available_steps(self):
+        """Steps the backend can actually perform"""
+        return [step for step in self.steps
+                if STEP_CAPABILITIES.get(step.name) in (None, *self.backend.capabilities)]
+
+    def note_healthy(self, snapshot):
+        """Remember the working BSSID and close the episode once stable"""
+        if snapshot.ssid and snapshot.bssid:
+            self.last_good_bssid[snapshot.ssid] = snapshot.bssid
+            if self.store:
+                self.store.remember(snapshot.ssid, snapshot.bssid, self._channel(snapshot.bssid))
+        if self.last_failure is not None and self.clock() - self.last_failure >= self.episode_window:
+            self.episode_started = None
+            self.last_failure = None
+            self.level = 0
+            self.failed_climbs = 0
+            self.retry_at = None
+
+    def recover(self, ssid):
+        """Climb the ladder from the episode's current rung; return True once connected"""
+        now = self.clock()
+        if self.last_failure is None or now - self.last_failure >= self.episode_window:
+            self.episode_started = now
+            self.level = 0
+        self.last_failure = now
+        available = self.available_steps()
+        backing_off = self.retry_at is not None and now < self.retry_at
+        steps = [step for step in available if step.name not in DISRUPTIVE_STEPS] if backing_off else available
+        if not steps:
+            return False
+        if not self.backend.snapshot(max_age=0).powered:
+            self.notify("Wi-Fi powered down. Powering up...")
+            self._act("enable")
+            wait_for_power(self.backend, True, **self._waits())
+        if self.store and self.level == 0 and "bssid_connect" in self.backend.capabilities:
+            if self._fast_path(ssid, now):
+                self.level = 1
+                return True
+        # A full reconnect is timed from its first rung, not from a failed fast path before it
+        climb_started = self.clock()
+        for index in range(0 if backing_off else min(self.level, len(steps) - 1), len(steps)):
+            step = steps[index]
+            self.notify(f"Recovery step {index + 1}/{len(steps)}: {step.name}")
+            try:
+                ok = getattr(self, f"_{step.name}")(ssid, step.timeout)
+            except (subprocess.CalledProcessError, OSError) as e:
+                self.notify(f"{step.name} failed: {e}")
+                ok = False
+            if ok:
+                self.level = available.index(step) + 1
+                self.failed_climbs = 0
+                self.retry_at = None
+                self._record_connect(ssid, climb_started, fast=False)
+                return True
+        self.level = 0
+        if not backing_off:
+            self.failed_climbs += 1
+            delay = min(self.retry_backoff * 2 ** (self.failed_climbs - 1), self.max_retry_backoff)
+            self.retry_at = self.clock() + delay
+            self.notify(f"Every recovery step failed; only gentle steps for the next {delay:.0f}s")
+        if self.store:
+            self.store.record_failure(ssid)
+        return False
+
+    def _fast_path(self, ssid, started):
+        """Connect straight to the remembered BSSID, skipping scans and escalation"""
+        bssid, channel = self.store.remembered(ssid)
+        if not bssid:
+            return False
+        self.notify(f"Fast path: {ssid} via remembered {bssid}" + (f" (channel {channel})" if channel else ""))
+        try:
+            self._act("connect", ssid, bssid)
+            ok = wait_for_link(self.backend, ssid, self.fast_timeout, **self._waits())
+        except (subprocess.CalledProcessError, OSError):
+            ok = False
+        if not ok:
+            self.notify("Fast path failed; climbing the recovery ladder")
+            return False
+        elapsed = self.clock() - started
+        typical = self.store.typical_connect_time(ssid)
+        self._record_connect(ssid, started, fast=True)
+        if typical is None:
+            self.notify(f"Fast path connected in {elapsed:.1f}s")
+        elif elapsed < typical:
+            saved = typical - elapsed
+            self.time_saved += saved
+            self.notify(f"Fast path connected in {elapsed:.1f}s, {saved:.1f}s faster than a typical full "
+                        f"reconnect ({typical:.1f}s); {self.time_saved:.1f}s saved so far")
+        else:
+            self.notify(f"Fast path connected in {elapsed:.1f}s, no faster than a typical full reconnect "
+                        f"({typical:.1f}s)")
+        return True
+
+    def _channel(self, bssid):
+        """Channel of bssid in the last cached scan, if it was seen"""
+        for record in self.backend.cached_scan() or ():
+            if record.bssid and record.bssid.lower() == bssid.lower():
+                return record.channel
+        return None
+
+    def _record_connect(self, ssid, started, fast):
+        if self.store:
+            bssid = self.backend.snapshot().bssid
+            self.store.record_connect(ssid, self.clock() - started, fast, bssid, bssid and self._channel(bssid))
+
+    def _waits(self):
+        return {"sleep": self.sleep, "clock": self.clock}
+
+    def _act(self, action, *args):
+        return run_action(self.backend, action, *args, clock=self.clock)
+
+    def _connect(self, ssid, timeout):
+        self._act("connect", ssid)
+        return wait_for_link(self.backend, ssid, timeout, **self._waits())
+
+    def _connect_bssid(self, ssid, timeout):
+        bssid = self.last_good_bssid.get(ssid) or (self.store and self.store.remembered(ssid)[0])
+        if not bssid:
+            return False
+        self._act("connect", ssid, bssid)
+        return wait_for_link(self.backend, ssid, timeout, **self._waits())
+
+    def _rescan_connect(self, ssid, timeout):
+        self._act("rescan")
+        return self._connect(ssid, timeout)
+
+    def _connect_by(self, ssid, deadline):
+        return self._connect(ssid, max(0.0, deadline - self.clock()))
+
+    # The cycles share the step's timeout: each power wait may take a quarter, the connect the rest
+
+    def _radio_cycle(self, ssid, timeout):
+        deadline = self.clock() + timeout
+        self._act("disable")
+        wait_for_power(self.backend, False, timeout / 4, **self._waits())
+        self._act("enable")
+        wait_for_power(self.backend, True, timeout / 4, **self._waits())
+        return self._connect_by(ssid, deadline)
+
+    def _interface_cycle(self, ssid, timeout):
+        deadline = self.clock() + timeout
+        self._act("interface_down")
+        self._act("interface_up")
+        wait_for_power(self.backend, True, timeout / 4, **self._waits())
+        return self._connect_by(ssid, deadline)
@@ -0,0 +1,92 @@
+import subprocess
+import time
+from typing import NamedTuple
+
+from recovery import run_action, wait_for_link
+
+
+class RoamPolicy(NamedTuple):
+    """When a weak link is worth moving to another BSSID of the same SSID"""
+    threshold: int = 40  # percent; below this the link counts as weak
+    hysteresis: int = 15  # a candidate must beat the current signal by this much
+    sustain: float = 20  # seconds the link must stay weak before roaming
+    dwell: float = 120  # minimum seconds between roams
+    scan_age: float = 60  # reuse a scan this fresh instead of taking a new one
+    timeout: float = 15  # seconds to wait for the new BSSID
+
+
+def best_bssids(records, ssid):
+    """BSSIDs of ssid seen in records as (signal, band, bssid), strongest first"""
+    seen = {}
+    for record in records:
+        if record.ssid == ssid and record.bssid and record.signal is not None:
+            if record.bssid not in seen or record.signal > seen[record.bssid][0]:
+                seen[record.bssid] = (record.signal, record.band, record.bssid)
+    return sorted(seen.values(), reverse=True)
+
+
+class Roamer:
+    """Move a weak link to a stronger BSSID of the same network
+
+    The link has to stay below the threshold for `sustain` seconds, the
+    candidate has to beat it by `hysteresis` points and roams are at least
+    `dwell` seconds apart, so two similar APs never ping-pong.
+    """
+
+    def __init__(self, backend, policy=RoamPolicy(), notify=print, clock=time.monotonic, sleep=time.sleep):
+        self.backend = backend
+        self.policy = policy
+        self.notify = notify
+        self.clock = clock
+        self.sleep = sleep
+        self.weak_since = None
+        self.last_roam = None
+        self.roams = 0
+
+    def consider(self, ssid, snapshot):
+        """Called with every healthy snapshot; return True if it roamed"""
+        policy = self.policy
+        now = self.clock()
+        if snapshot.signal is None or snapshot.signal >= policy.threshold:
+            self.weak_since = None
+            return False
+        if self.weak_since is None:
+            self.weak_since = now
+        if now - self.weak_since < policy.sustain:
+            return False
+        if self.last_roam is not None and now - self.last_roam < policy.dwell:
+            return False
+        records = self.backend.cached_scan(policy.scan_age)
+        if records is None:
+            records = self.backend.scan()
+        current_bssid = (snapshot.bssid or "").lower()
+        seen = best_bssids(records, ssid)
+        # Compare against the scan's reading of the current BSSID: the snapshot
+        # signal may come from another source (e.g. /proc dBm) on another scale
+        current = next((signal for signal, _, bssid in seen if bssid.lower() == current_bssid), snapshot.signal)
+        candidates = [c for c in seen if c[2].lower() != current_bssid]
+        if not candidates or candidates[0][0] < current + policy.hysteresis:
+            return False
+        signal, band, bssid = candidates[0]
+        return self.roam(ssid, snapshot, bssid, signal, band)
+
+    def roam(self, ssid, snapshot, bssid, expected, band):
+        # Count the attempt towards the dwell time even if it fails
+        self.last_roam = self.clock()
+        self.weak_since = None
+        started = self.clock()
+        try:
+            run_action(self.backend, "connect", ssid, bssid, clock=self.clock)
+        except (subprocess.CalledProcessError, OSError) as e:
+            self.notify(f"Roam to {bssid} failed: {e}")
+            return False
+        if not wait_for_link(self.backend, ssid, self.policy.timeout, sleep=self.sleep, clock=self.clock):
+            self.notify(f"Roam to {bssid} did not come up")
+            return False
+        after = self.backend.snapshot(max_age=0)
+        self.roams += 1
+        gain = None if after.signal is None else after.signal - snapshot.signal
+        self.notify(f"Roamed {ssid} from {snapshot.bssid} ({snapshot.signal}%) to {after.bssid} "
+                    f"({after.signal}%, {band or 'band ?'}, expected {expected}%) in "
+                    f"{self.clock() - started:.1f}s, gain {'?' if gain is None else f'{gain:+d}'}")
+        return True
@@ -0,0 +1,56 @@
+import random
+import time
+from collections import deque
+
+
+class AdaptiveInterval:
+    """Check interval that backs off while the link is stable and tightens after trouble
+
+    Every healthy check stretches the interval by `backoff` up to a ceiling;
+    the ceiling drops for each failure seen in the last `flap_window`
+    seconds, so a link that just flapped stays under close watch. A failure
+    snaps the interval to the minimum and a falling signal shrinks it ahead
+    of the drop it usually announces. Jitter keeps many machines (or
+    interfaces) from probing in lockstep.
+    """
+
+    def __init__(self, start=10, min_interval=2, max_interval=60, backoff=1.5, jitter=0.1,
+                 trend_drop=10, flap_window=600, clock=time.monotonic, rng=None):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.interval = min(max(start, min_interval), max_interval)
+        self.backoff = backoff
+        self.jitter = jitter
+        self.trend_drop = trend_drop
+        self.flap_window = flap_window
+        self.clock = clock
+        self.rng = rng or random.Random()
+        self.signals = deque(maxlen=4)
+        self.failures = deque(maxlen=16)
+
+    def ceiling(self):
+        """Longest interval allowed given the failures inside the flap window"""
+        now = self.clock()
+        while self.failures and now - self.failures[0] > self.flap_window:
+            self.failures.popleft()
+        return max(self.min_interval, self.max_interval / (1 + len(self.failures)))
+
+    def record(self, healthy, signal=None):
+        """Feed the outcome of one check"""
+        if not healthy:
+            self.failures.append(self.clock())
+            self.signals.clear()
+            self.interval = self.min_interval
+            return
+        falling = signal is not None and bool(self.signals) and max(self.signals) - signal >= self.trend_drop
+        if signal is not None:
+            self.signals.append(signal)
+        if falling:
+            self.interval = max(self.min_interval, self.interval / self.backoff)
+        else:
+            self.interval = min(self.ceiling(), self.interval * self.backoff)
+
+    def next_interval(self):
+        """Seconds until the next check, jittered"""
+        spread = self.interval * self.jitter
+        return min(max(self.interval + self.rng.uniform(-spread, spread), self.min_interval), self.max_interval)
@@ -0,0 +1,264 @@
+"""Replay fault traces against the real monitor on a virtual clock
+
+    python simulation.py [--hours 24] [--seed 1] [--intervals 1,5,10,30,adaptive]
+
+Each strategy/interval pair runs the same randomized trace and reports mean
+time-to-recover, total downtime, the number of OS actions it took and how
+many times the monitor woke up to check.
+"""
+import argparse
+import heapq
+import queue
+import random
+from typing import NamedTuple, Optional
+
+from backends import FakeBackend
+from eventlog import EventLog
+from metrics import Metrics
+from monitor import ConnectionMonitor
+from parsers import ScanRecord
+from recovery import DEFAULT_STEPS, RecoveryStep
+from scheduler import AdaptiveInterval
+
+FAULT_KINDS = ("drop", "roam", "radio_off", "slow_dhcp", "stuck")
+
+STRATEGIES = {
+    "connect": (RecoveryStep("connect", 15),),
+    "radio_first": (RecoveryStep("radio_cycle", 30),),
+    "connect+radio": (RecoveryStep("connect", 15), RecoveryStep("radio_cycle", 30)),
+    "ladder": DEFAULT_STEPS,
+}
+
+
+class VirtualClock:
+    """Monotonic time that only moves when something sleeps on it"""
+
+    def __init__(self, start=0.0):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += max(0.0, seconds)
+
+    def get_job(self, jobs, timeout=None):
+        """queue.Queue.get on virtual time: a queued job at once, else timeout seconds pass and queue.Empty"""
+        try:
+            return jobs.get_nowait()
+        except queue.Empty:
+            if timeout is None:
+                # Nothing else runs on virtual time, so nothing could ever queue a job
+                raise RuntimeError("waiting without a timeout would never end on virtual time")
+            self.sleep(timeout)
+            raise
+
+
+class Fault(NamedTuple):
+    """One scripted link failure"""
+    at: float
+    kind: str  # one of FAULT_KINDS
+    duration: float = 0.0  # extra DHCP time for slow_dhcp
+    ssid: Optional[str] = None  # foreign network for roam
+
+
+def random_trace(seed, hours, mean_gap=1800, foreign="Neighbour"):
+    """Faults with exponentially distributed gaps; the same seed gives the same trace"""
+    rng = random.Random(seed)
+    faults = []
+    at = rng.expovariate(1 / mean_gap)
+    while at < hours * 3600:
+        kind = rng.choice(FAULT_KINDS)
+        faults.append(Fault(at, kind, rng.uniform(5, 40) if kind == "slow_dhcp" else 0.0,
+                            foreign if kind == "roam" else None))
+        at += rng.expovariate(1 / mean_gap)
+    return faults
+
+
+class SimulatedBackend(FakeBackend):
+    """FakeBackend whose link follows a fault trace and takes time to associate
+
+    Faults and pending associations live on one event queue keyed by virtual
+    time; every probe first applies what is due, so the backend never needs
+    its own thread. Outages of the target network are recorded as they
+    happen and are the ground truth the benchmark scores against.
+    """
+
+    name = "simulated"
+
+    def __init__(self, trace, clock, target="Home", associate_time=2.0, dhcp_time=1.0, interface=None):
+        networks = [ScanRecord(target, "02:00:00:00:00:01", 70, 6, "2.4GHz", "WPA2"),
+                    ScanRecord(target, "02:00:00:00:00:02", 55, 36, "5GHz", "WPA2")]
+        foreign = {fault.ssid for fault in trace if fault.ssid}
+        networks += [ScanRecord(ssid, f"02:00:00:00:01:{i:02x}", 60, 11, "2.4GHz", "WPA2")
+                     for i, ssid in enumerate(sorted(foreign))]
+        super().__init__(networks, interface)
+        self.clock = clock
+        self.target = target
+        self.associate_time = associate_time
+        self.dhcp_time = dhcp_time
+        self.extra_dhcp = 0.0
+        self.stuck = False
+        self.ip_at = 0.0
+        self.link = (target, networks[0].bssid, networks[0].signal)
+        self.outages = []  # [down_at, up_at or None]
+        self.faults_applied = 0
+        self._epoch = 0
+        self._seq = 0
+        self._events = []
+        for fault in trace:
+            self._schedule(fault.at, None, self._apply_fault, fault)
+
+    def _schedule(self, at, epoch, func, *args):
+        """Queue func(at, *args); a non-None epoch voids it once the link drops"""
+        self._seq += 1
+        heapq.heappush(self._events, (at, self._seq, epoch, func, args))
+
+    def advance(self):
+        """Apply every event that is due at the current virtual time"""
+        while self._events and self._events[0][0] <= self.clock.now:
+            at, _, epoch, func, args = heapq.heappop(self._events)
+            if epoch is None or epoch == self._epoch:
+                func(at, *args)
+            self._track(at)
+        self._track(self.clock.now)
+
+    def is_up(self, now):
+        return (self.powered and self.link is not None and self.link[0] == self.target
+                and self.ip_at is not None and now >= self.ip_at)
+
+    def _track(self, now):
+        up = self.is_up(now)
+        if not up and (not self.outages or self.outages[-1][1] is not None):
+            self.outages.append([now, None])
+        elif up and self.outages and self.outages[-1][1] is None:
+            # The address may have arrived before this probe noticed it
+            self.outages[-1][1] = max(self.outages[-1][0], min(now, self.ip_at))
+
+    def _drop(self):
+        self._epoch += 1
+        self.link = None
+        self.ip_at = None
+        self.invalidate()
+
+    def _apply_fault(self, at, fault):
+        self.faults_applied += 1
+        self._drop()
+        if fault.kind == "roam":
+            foreign = next(n for n in self.networks if n.ssid == fault.ssid)
+            self.link = (foreign.ssid, foreign.bssid, foreign.signal)
+            self.ip_at = at
+        elif fault.kind == "radio_off":
+            self.powered = False
+        elif fault.kind == "slow_dhcp":
+            self.extra_dhcp = fault.duration
+        elif fault.kind == "stuck":
+            # Driver wedged: only a radio or interface cycle brings it back
+            self.stuck = True
+
+    def _associated(self, at, network):
+        self.link = (network.ssid, network.bssid, network.signal)
+        self.ip_at = at + self.dhcp_time + self.extra_dhcp
+        self.extra_dhcp = 0.0
+        self.invalidate()
+
+    def snapshot(self, max_age=None):
+        self.advance()
+        return super().snapshot(max_age)
+
+    def query_has_ip(self):
+        self.advance()
+        return self.link is not None and self.ip_at is not None and self.clock.now >= self.ip_at
+
+    def connect(self, ssid, bssid=None):
+        self.advance()
+        self.actions.append("connect")
+        candidates = [n for n in self.networks if n.ssid == ssid and bssid in (None, n.bssid)]
+        if not self.powered or self.stuck or not candidates:
+            return
+        self._drop()
+        self._schedule(self.clock.now + self.associate_time, self._epoch, self._associated,
+                       max(candidates, key=lambda n: n.signal or 0))
+
+    def enable(self):
+        self.advance()
+        self.actions.append("enable")
+        self.powered = True
+        self.stuck = False
+        self.invalidate()
+
+    def disable(self):
+        self.advance()
+        self.actions.append("disable")
+        self.powered = False
+        self._drop()
+
+    interface_up = enable
+    interface_down = disable
+
+
+class SimulationResult(NamedTuple):
+    strategy: str
+    interval: str
+    faults: int
+    mean_recover: Optional[float]
+    downtime: float
+    actions: int
+    unrecovered: int
+    wakeups: int
+
+
+def simulate(trace, steps=DEFAULT_STEPS, interval=10, hours=24, strategy="ladder", target="Home", seed=0):
+    """Run the monitor's own worker loop over trace on virtual time and score the outages
+
+    interval is a number of seconds or "adaptive" for an AdaptiveInterval.
+    """
+    clock = VirtualClock()
+    backend = SimulatedBackend(trace, clock, target)
+    backend.metrics = Metrics(clock=clock)
+    label = interval if interval == "adaptive" else f"{interval:g}s"
+    if interval == "adaptive":
+        interval = AdaptiveInterval(rng=random.Random(seed))
+    monitor = ConnectionMonitor(backend, interval=interval, log=EventLog(maxlen=100), steps=steps,
+                                clock=clock, sleep=clock.sleep)
+    end = hours * 3600
+    # The first probe at or after the end stops the loop once its check finishes
+    backend._schedule(end, None, lambda at: monitor.stop())
+    monitor.set_target(target)
+    monitor.run()
+    backend.advance()
+    wakeups = int(sum(backend.metrics.checks.values.values()))
+    durations = [(up if up is not None else end) - down for down, up in backend.outages]
+    recovered = [down_up for down_up in backend.outages if down_up[1] is not None]
+    return SimulationResult(
+        strategy, label, backend.faults_applied,
+        sum(up - down for down, up in recovered) / len(recovered) if recovered else None,
+        sum(durations), len(backend.actions), len(backend.outages) - len(recovered), wakeups,
+    )
+
+
+def benchmark(hours=24, seed=1, intervals=(1, 5, 10, 30, "adaptive"), strategies=STRATEGIES):
+    trace = random_trace(seed, hours)
+    return [simulate(trace, steps, interval, hours, name, seed=seed)
+            for name, steps in strategies.items() for interval in intervals]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare recovery strategies on a simulated fault trace.")
+    parser.add_argument("--hours", type=float, default=24)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--intervals", default="1,5,10,30,adaptive",
+                        help="comma separated polling intervals; 'adaptive' for the adaptive scheduler")
+    args = parser.parse_args(argv)
+    intervals = [value if value == "adaptive" else float(value) for value in args.intervals.split(',')]
+
+    print(f"{'Strategy':<15}{'Interval':>9}{'Faults':>8}{'MTTR':>9}{'Downtime':>10}{'Actions':>9}{'Open':>7}"
+          f"{'Wakeups':>9}")
+    for result in benchmark(args.hours, args.seed, intervals):
+        mttr = "-" if result.mean_recover is None else f"{result.mean_recover:.1f}s"
+        print(f"{result.strategy:<15}{result.interval:>9}{result.faults:>8}{mttr:>9}"
+              f"{result.downtime:>9.0f}s{result.actions:>9}{result.unrecovered:>7}{result.wakeups:>9}")
+
+
+if __name__ == "__main__":
+    main()
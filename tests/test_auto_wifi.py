@@ -0,0 +1,61 @@
+import json
+
+import pytest
+
+from auto_wifi import DEFAULTS, build_parser, load_config, parse_strategy, parse_targets
+from recovery import DEFAULT_STEPS, RecoveryStep
+
+
+def daemon_config(*flags):
+    return load_config(build_parser().parse_args(["daemon", *flags]))
+
+
+def test_parse_strategy_takes_default_timeouts_and_overrides():
+    defaults = {step.name: step.timeout for step in DEFAULT_STEPS}
+    assert parse_strategy("connect, radio_cycle:20") == [RecoveryStep("connect", defaults["connect"]),
+                                                         RecoveryStep("radio_cycle", 20.0)]
+    assert parse_strategy(["rescan_connect", "connect:5"]) == [
+        RecoveryStep("rescan_connect", defaults["rescan_connect"]), RecoveryStep("connect", 5.0)]
+
+
+@pytest.mark.parametrize("value", ["connect,reboot", "connect:soon"])
+def test_parse_strategy_rejects_unknown_steps_and_bad_timeouts(value):
+    with pytest.raises(ValueError):
+        parse_strategy(value)
+
+
+def test_parse_targets_accepts_pairs_and_a_mapping():
+    assert parse_targets(["wlan0=Home", "wlan1=Back=haul"]) == [("wlan0", "Home"), ("wlan1", "Back=haul")]
+    assert parse_targets({"wlan0": "Home"}) == [("wlan0", "Home")]
+
+
+@pytest.mark.parametrize("item", ["wlan0", "=Home", "wlan0="])
+def test_parse_targets_rejects_malformed_items(item):
+    with pytest.raises(ValueError):
+        parse_targets([item])
+
+
+def test_defaults_without_a_config_file():
+    assert daemon_config() == DEFAULTS
+
+
+def test_flags_override_the_config_file(tmp_path):
+    path = tmp_path / "auto_wifi.json"
+    path.write_text(json.dumps({"ssid": "Office", "interval": 30, "strategy": ["connect"], "events": False}))
+    config = daemon_config("--config", str(path), "--ssid", "Home")
+    assert config["ssid"] == "Home"
+    assert config["interval"] == 30
+    assert config["strategy"] == ["connect"]
+    assert config["events"] is False
+
+
+@pytest.mark.parametrize("key, flag", [("events", "--no-events"), ("roaming", "--no-roaming")])
+def test_no_flags_are_tri_state(tmp_path, key, flag):
+    # Unset keeps the default or the config file's value; the flag turns it off
+    assert daemon_config()[key] is True
+    path = tmp_path / "auto_wifi.json"
+    path.write_text(json.dumps({key: False}))
+    assert daemon_config("--config", str(path))[key] is False
+    assert daemon_config(flag)[key] is False
+    path.write_text(json.dumps({key: True}))
+    assert daemon_config("--config", str(path), flag)[key] is False
@@ -0,0 +1,178 @@
+import os
+
+from backends import LinkSnapshot, LinuxNativeBackend, NmcliBackend, WindowsBackend
+from parsers import dbm_to_percent
+from simulation import VirtualClock
+
+NMCLI_LINKS = ("wlan0:yes:Home:AA\\:BB\\:CC\\:DD\\:EE\\:01:70\n"
+               "wlan1:yes:Backhaul:AA\\:BB\\:CC\\:DD\\:EE\\:02:55\n")
+
+
+class SysfsBackend(LinuxNativeBackend):
+    """LinuxNativeBackend over a temporary sysfs/procfs tree, answering nmcli from canned output"""
+
+    def __init__(self, root, clock, nmcli=None, **kwargs):
+        super().__init__(sysfs_root=os.path.join(root, "sys"), procfs_root=os.path.join(root, "proc"), **kwargs)
+        self.clock = clock
+        self.nmcli = nmcli or {}
+        self.commands = []
+
+    def run(self, argv):
+        self.commands.append(argv)
+        for words, output in self.nmcli.items():
+            if " ".join(argv).startswith(words):
+                return output
+        raise OSError(f"no canned output for {argv}")
+
+
+def write(root, path, text):
+    path = os.path.join(root, path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text)
+
+
+def make_tree(root, operstate="up", carrier="1", level="-60.", rfkill=("0", "0")):
+    os.makedirs(os.path.join(root, "sys", "class", "net", "wlan0", "wireless"))
+    os.makedirs(os.path.join(root, "sys", "class", "net", "eth0"))
+    write(root, "sys/class/net/wlan0/operstate", operstate + "\n")
+    write(root, "sys/class/net/wlan0/carrier", carrier + "\n")
+    if rfkill is not None:
+        write(root, "sys/class/net/wlan0/phy80211/rfkill1/type", "wlan\n")
+        write(root, "sys/class/net/wlan0/phy80211/rfkill1/soft", rfkill[0] + "\n")
+        write(root, "sys/class/net/wlan0/phy80211/rfkill1/hard", rfkill[1] + "\n")
+        # A second radio, soft-blocked, must not affect wlan0
+        write(root, "sys/class/net/wlan1/phy80211/rfkill2/type", "wlan\n")
+        write(root, "sys/class/net/wlan1/phy80211/rfkill2/soft", "1\n")
+        write(root, "sys/class/net/wlan1/phy80211/rfkill2/hard", "0\n")
+    write(root, "proc/net/wireless",
+          "Inter-| sta-|   Quality        |   Discarded packets\n"
+          " face | tus | link level noise |  nwid  crypt   frag  retry   misc | beacon | 22\n"
+          f"wlan0: 0000   50.  {level}  -256        0      0      0      0      0        0\n")
+    write(root, "proc/net/route",
+          "Iface\tDestination\tGateway\tFlags\tRefCnt\tUse\tMetric\tMask\tMTU\tWindow\tIRTT\n"
+          "wlan0\t00000000\t0101A8C0\t0003\t0\t0\t600\t00000000\t0\t0\t0\n")
+
+
+def backend_for(tmp_path, **kwargs):
+    clock = VirtualClock(100.0)
+    nmcli = {"nmcli -t -f DEVICE,ACTIVE": NMCLI_LINKS, "nmcli radio wifi": "enabled\n",
+             "nmcli -t -f DEVICE,TYPE": "wlan0:wifi\n"}
+    return SysfsBackend(str(tmp_path), clock, nmcli, interface="wlan0", ttl=0, **kwargs), clock
+
+
+def test_discovers_wireless_interfaces_from_sysfs(tmp_path):
+    make_tree(str(tmp_path))
+    backend, _ = backend_for(tmp_path)
+    assert backend.discover_interfaces(native_only=True) == ["wlan0", "wlan1"]
+    assert backend.commands == []
+
+
+def test_link_up_reads_signal_from_proc_and_caches_the_ssid(tmp_path):
+    make_tree(str(tmp_path))
+    backend, clock = backend_for(tmp_path, ssid_ttl=30)
+    snap = backend.snapshot()
+    assert snap == LinkSnapshot(True, "Home", "aa:bb:cc:dd:ee:01", dbm_to_percent(-60))
+    assert len(backend.commands) == 1
+    # Within ssid_ttl the SSID comes from the cache; only sysfs and procfs are read
+    clock.now += 10
+    assert backend.snapshot().ssid == "Home"
+    assert len(backend.commands) == 1
+    clock.now += 25
+    backend.snapshot()
+    assert len(backend.commands) == 2
+
+
+def test_unsigned_signal_levels_are_converted(tmp_path):
+    make_tree(str(tmp_path), level="196.")
+    backend, _ = backend_for(tmp_path)
+    assert backend.snapshot().signal == dbm_to_percent(-60)
+
+
+def test_rfkill_block_reports_powered_down_without_nmcli(tmp_path):
+    make_tree(str(tmp_path), rfkill=("1", "0"))
+    backend, _ = backend_for(tmp_path)
+    assert backend.snapshot() == LinkSnapshot(powered=False)
+    assert backend.commands == []
+
+
+def test_no_carrier_is_powered_but_idle(tmp_path):
+    make_tree(str(tmp_path), operstate="down", carrier="0")
+    backend, _ = backend_for(tmp_path)
+    assert backend.snapshot() == LinkSnapshot(powered=True)
+    assert backend.commands == []
+
+
+def test_no_carrier_without_rfkill_asks_nmcli(tmp_path):
+    make_tree(str(tmp_path), operstate="down", carrier="0", rfkill=None)
+    backend, _ = backend_for(tmp_path)
+    backend.nmcli["nmcli -t -f DEVICE,ACTIVE"] = ""
+    backend.nmcli["nmcli radio wifi"] = "disabled\n"
+    assert backend.snapshot() == LinkSnapshot(powered=False)
+
+
+def test_has_ip_from_proc_route(tmp_path):
+    make_tree(str(tmp_path))
+    backend, _ = backend_for(tmp_path)
+    assert backend.has_ip()
+    assert not backend.for_interface("wlan1").has_ip()
+    assert backend.commands == []
+
+
+def test_rfkill_is_read_for_the_probed_radio_only(tmp_path):
+    make_tree(str(tmp_path))
+    backend, _ = backend_for(tmp_path)
+    assert backend.radio_blocked() is False
+    assert backend.radio_blocked("wlan1") is True
+    assert backend.radio_blocked("eth0") is None
+
+
+class RecordingMixin:
+    """Record action commands instead of running them"""
+
+    def call(self, argv):
+        self.calls.append(argv)
+        return 0
+
+
+def test_nmcli_actions_name_the_interface():
+    class Backend(RecordingMixin, NmcliBackend):
+        calls = []
+    backend = Backend(interface="wlan1")
+    backend.connect("Home", bssid="aa:bb:cc:dd:ee:01")
+    backend.rescan()
+    assert backend.calls == [
+        ["nmcli", "device", "wifi", "connect", "Home", "bssid", "aa:bb:cc:dd:ee:01", "ifname", "wlan1"],
+        ["nmcli", "device", "wifi", "rescan", "ifname", "wlan1"],
+    ]
+
+
+def test_netsh_connect_names_the_interface():
+    class Backend(RecordingMixin, WindowsBackend):
+        calls = []
+    Backend().for_interface("Wi-Fi 2").connect("Home")
+    assert Backend.calls == [["netsh", "wlan", "connect", "name=Home", "ssid=Home", "interface=Wi-Fi 2"]]
+
+
+def test_scans_are_scoped_to_the_interface():
+    assert NmcliBackend(interface="wlan1").scan_command()[-4:] == ["wifi", "list", "ifname", "wlan1"]
+    assert "interface=Wi-Fi 2" in WindowsBackend().for_interface("Wi-Fi 2").scan_command()
+
+
+def test_interface_views_drop_the_global_radio_switch():
+    backend = NmcliBackend(interface="wlan0")
+    view = backend.for_interface("wlan1")
+    assert "radio" in backend.capabilities
+    assert view.capabilities == {"bssid_connect", "rescan", "interface"}
+
+
+def test_forget_link_drops_the_cached_ssid(tmp_path):
+    make_tree(str(tmp_path))
+    backend, clock = backend_for(tmp_path, ssid_ttl=30)
+    assert backend.snapshot().ssid == "Home"
+    # The carrier stayed up while the link moved to another network
+    backend.nmcli["nmcli -t -f DEVICE,ACTIVE"] = "wlan0:yes:Cafe:AA\\:BB\\:CC\\:DD\\:EE\\:09:40\n"
+    clock.now += 1
+    assert backend.snapshot().ssid == "Home"
+    backend.forget_link()
+    assert backend.snapshot().ssid == "Cafe"
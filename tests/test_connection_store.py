@@ -0,0 +1,137 @@
+import os
+
+from backends import FakeBackend
+from connection_store import ConnectionStore
+from monitor import ConnectionMonitor
+from parsers import ScanRecord
+
+
+def test_unwritable_state_file_is_reported_once_and_kept_in_memory(tmp_path):
+    messages = []
+    store = ConnectionStore(str(tmp_path / "missing" / "state.json"), notify=messages.append)
+    store.record_connect("Home", 3.0, fast=False, bssid="aa:aa:aa:aa:aa:aa")
+    store.record_connect("Home", 5.0, fast=False)
+    assert len(messages) == 1
+    assert store.typical_connect_time("Home") == 4.0
+    assert store.remembered("Home") == ("aa:aa:aa:aa:aa:aa", None)
+
+
+def test_recovery_completes_when_the_store_cannot_save(tmp_path):
+    store = ConnectionStore(str(tmp_path / "missing" / "state.json"), notify=lambda message: None)
+    backend = FakeBackend([ScanRecord("Home", "aa:aa:aa:aa:aa:aa", 70)])
+    monitor = ConnectionMonitor(backend, interval=None, roaming=None, store=store)
+    monitor.target_ssid = "Home"
+    monitor.check_once()
+    assert backend.link[0] == "Home"
+    assert len(monitor.reconnect_stats.samples) == 1
+
+
+def test_full_reconnect_time_excludes_a_failed_fast_path(tmp_path):
+    from recovery import RecoveryLadder
+    from simulation import VirtualClock
+
+    clock = VirtualClock(1000.0)
+    store = ConnectionStore(str(tmp_path / "state.json"))
+    # The remembered access point is gone; another one of the same network is in range
+    store.remember("Home", "old:old:old", 6)
+    backend = FakeBackend([ScanRecord("Home", "aa:aa:aa:aa:aa:aa", 70)])
+    backend.clock = clock
+    ladder = RecoveryLadder(backend, notify=lambda message: None, clock=clock, sleep=clock.sleep, store=store,
+                            fast_timeout=8)
+    assert ladder.recover("Home")
+    assert clock() - 1000.0 >= 8
+    assert store.typical_connect_time("Home") < 1
+
+
+def test_store_survives_a_reload_from_disk(tmp_path):
+    path = str(tmp_path / "state.json")
+    store = ConnectionStore(path)
+    store.set_last_target("Home")
+    store.record_connect("Home", 6.0, fast=False, bssid="aa:aa:aa:aa:aa:aa", channel=36)
+    store.record_connect("Home", 1.5, fast=True)
+    store.record_failure("Home")
+    reloaded = ConnectionStore(path)
+    assert reloaded.last_target == "Home"
+    assert reloaded.remembered("Home") == ("aa:aa:aa:aa:aa:aa", 36)
+    assert reloaded.typical_connect_time("Home") == 6.0
+    assert reloaded.typical_connect_time("Home", fast=True) == 1.5
+    assert len(reloaded.network("Home")["failures"]) == 1
+    assert os.listdir(tmp_path) == ["state.json"]
+
+
+def test_fast_path_connects_to_the_remembered_bssid_and_reports_the_time_saved(tmp_path):
+    from recovery import RecoveryLadder
+    from simulation import VirtualClock
+
+    clock = VirtualClock(1000.0)
+    path = str(tmp_path / "state.json")
+    store = ConnectionStore(path)
+    store.record_connect("Home", 12.0, fast=False, bssid="bb:bb:bb:bb:bb:bb", channel=36)
+    # A fresh process: only the file remembers which access point worked
+    store = ConnectionStore(path)
+    backend = FakeBackend([ScanRecord("Home", "aa:aa:aa:aa:aa:aa", 90), ScanRecord("Home", "bb:bb:bb:bb:bb:bb", 60)])
+    backend.clock = clock
+    messages = []
+    ladder = RecoveryLadder(backend, notify=messages.append, clock=clock, sleep=clock.sleep, store=store)
+    assert ladder.recover("Home")
+    assert backend.link[1] == "bb:bb:bb:bb:bb:bb"
+    assert backend.actions == ["connect"]
+    assert ladder.time_saved == 12.0
+    assert any("12.0s faster than a typical full reconnect" in message for message in messages)
+    assert ConnectionStore(path).typical_connect_time("Home", fast=True) == 0.0
+
+
+def test_two_writers_never_leave_a_corrupt_file(tmp_path):
+    import json
+    import threading
+
+    path = str(tmp_path / "state.json")
+    stores = [ConnectionStore(path), ConnectionStore(path)]
+
+    def write(store, ssid):
+        for i in range(50):
+            store.record_connect(ssid, float(i), fast=False, bssid="aa:aa:aa:aa:aa:aa")
+
+    threads = [threading.Thread(target=write, args=(store, f"Net {n}")) for n, store in enumerate(stores)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    with open(path, encoding="utf-8") as f:
+        assert json.load(f)["networks"]
+    assert os.listdir(tmp_path) == ["state.json"]
+
+
+def test_fallbacks_are_remembered_with_the_target(tmp_path):
+    path = str(tmp_path / "state.json")
+    store = ConnectionStore(path)
+    monitor = ConnectionMonitor(FakeBackend(), interval=None, roaming=None, store=store)
+    monitor.set_targets(["Home, upstairs", "Phone"])
+    monitor.submit(monitor.stop)
+    monitor.run()
+    reloaded = ConnectionStore(path)
+    assert (reloaded.last_target, reloaded.last_fallbacks) == ("Home, upstairs", ["Phone"])
+    reloaded.set_last_target("Home, upstairs")
+    assert ConnectionStore(path).last_fallbacks == []
+
+
+def test_a_slow_fast_path_saves_no_time(tmp_path):
+    from recovery import RecoveryLadder
+    from simulation import VirtualClock
+
+    class SlowBackend(FakeBackend):
+        def connect(self, ssid, bssid=None):
+            self.clock.sleep(5)
+            super().connect(ssid, bssid)
+
+    clock = VirtualClock(1000.0)
+    store = ConnectionStore(str(tmp_path / "state.json"))
+    store.record_connect("Home", 2.0, fast=False, bssid="aa:aa:aa:aa:aa:aa")
+    backend = SlowBackend([ScanRecord("Home", "aa:aa:aa:aa:aa:aa", 70)])
+    backend.clock = clock
+    messages = []
+    ladder = RecoveryLadder(backend, notify=messages.append, clock=clock, sleep=clock.sleep, store=store)
+    assert ladder.recover("Home")
+    assert ladder.time_saved == 0.0
+    assert any("no faster than a typical full reconnect (2.0s)" in message for message in messages)
+    assert not any("faster than a typical" in message and "no faster" not in message for message in messages)
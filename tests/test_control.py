@@ -0,0 +1,232 @@
+import json
+import os
+import socket
+import stat
+import time
+
+import pytest
+
+from backends import FakeBackend
+import control
+from control import ControlClient, ControlServer, default_socket_path
+from monitor import ConnectionMonitor
+
+pytestmark = pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="needs Unix domain sockets")
+
+
+@pytest.fixture
+def server(tmp_path):
+    monitor = ConnectionMonitor(FakeBackend(), interval=None, roaming=None)
+    control = ControlServer(monitor, str(tmp_path / "control.sock"), request_timeout=1)
+    assert control.start()
+    yield control
+    control.stop()
+
+
+def test_socket_is_owner_only(server):
+    assert stat.S_IMODE(os.stat(server.path).st_mode) == 0o600
+
+
+def test_default_socket_prefers_the_runtime_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path))
+    assert default_socket_path() == str(tmp_path / "auto_wifi.sock")
+
+
+def test_default_socket_without_a_runtime_dir_is_not_directly_in_tmp(tmp_path, monkeypatch):
+    monkeypatch.delenv("XDG_RUNTIME_DIR", raising=False)
+    monkeypatch.setattr(control.tempfile, "gettempdir", lambda: str(tmp_path))
+    assert os.path.dirname(default_socket_path()) != str(tmp_path)
+
+
+def test_private_dir_is_created_owner_only(tmp_path, monkeypatch):
+    monkeypatch.setattr(control.tempfile, "gettempdir", lambda: str(tmp_path))
+    path = os.path.join(control._private_dir(), "auto_wifi.sock")
+    server = ControlServer(ConnectionMonitor(FakeBackend(), interval=None, roaming=None), path)
+    assert server.start()
+    try:
+        assert stat.S_IMODE(os.stat(os.path.dirname(path)).st_mode) == 0o700
+    finally:
+        server.stop()
+
+
+def test_start_refuses_a_shared_private_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(control.tempfile, "gettempdir", lambda: str(tmp_path))
+    os.mkdir(control._private_dir(), 0o777)
+    os.chmod(control._private_dir(), 0o777)
+    server = ControlServer(ConnectionMonitor(FakeBackend(), interval=None, roaming=None),
+                           os.path.join(control._private_dir(), "auto_wifi.sock"))
+    with pytest.raises(OSError):
+        server.start()
+
+
+def test_start_refuses_to_replace_anything_but_a_socket(tmp_path):
+    path = tmp_path / "notes.txt"
+    path.write_text("keep me")
+    server = ControlServer(ConnectionMonitor(FakeBackend(), interval=None, roaming=None), str(path))
+    with pytest.raises(OSError):
+        server.start()
+    assert path.read_text() == "keep me"
+
+
+def test_start_replaces_a_stale_socket_of_ours(tmp_path):
+    path = str(tmp_path / "control.sock")
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(path)
+    stale.close()
+    server = ControlServer(ConnectionMonitor(FakeBackend(), interval=None, roaming=None), path)
+    assert server.start()
+    server.stop()
+
+
+def owned_by(monkeypatch, path, uid):
+    """Make path look as if uid owned it"""
+    real_lstat = os.lstat
+
+    def lstat(name, *args, **kwargs):
+        st = real_lstat(name, *args, **kwargs)
+        if os.fspath(name) != path:
+            return st
+        fields = list(st)
+        fields[stat.ST_UID] = uid
+        return os.stat_result(fields)
+    monkeypatch.setattr(control.os, "lstat", lstat)
+
+
+def test_client_does_not_trust_another_users_socket(server, monkeypatch):
+    other = 4242 if os.getuid() != 4242 else 4243
+    owned_by(monkeypatch, server.path, other)
+    client, blocked = ControlClient.find(server.path)
+    assert client is None and blocked == server.path
+    with pytest.raises(OSError):
+        ControlServer(server.monitor, server.path).start()
+    assert os.path.exists(server.path)
+
+
+def test_client_trusts_a_root_owned_system_socket(server, monkeypatch):
+    owned_by(monkeypatch, server.path, 0)
+    client = ControlClient.connect(server.path)
+    assert client is not None
+    client.close()
+
+
+def test_clients_fall_back_to_the_system_socket(server, tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path / "runtime"))
+    (tmp_path / "runtime").mkdir()
+    monkeypatch.setattr(control, "SYSTEM_SOCKET", server.path)
+    client = ControlClient.connect()
+    assert client is not None and client.path == server.path
+    client.close()
+
+
+def test_a_stale_socket_does_not_count_as_blocked(tmp_path):
+    path = str(tmp_path / "stale.sock")
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(path)
+    stale.close()
+    assert ControlClient.find(path) == (None, None)
+
+
+def test_socket_group_opens_the_socket_to_the_group(tmp_path):
+    path = str(tmp_path / "control.sock")
+    server = ControlServer(ConnectionMonitor(FakeBackend(), interval=None, roaming=None), path,
+                           group=os.getgid())
+    assert server.start()
+    try:
+        st = os.stat(path)
+        assert stat.S_IMODE(st.st_mode) == 0o660 and st.st_gid == os.getgid()
+    finally:
+        server.stop()
+
+
+def test_unknown_socket_group_leaves_no_socket_behind(tmp_path):
+    path = str(tmp_path / "control.sock")
+    server = ControlServer(ConnectionMonitor(FakeBackend(), interval=None, roaming=None), path,
+                           group="no-such-group-here")
+    with pytest.raises(OSError):
+        server.start()
+    assert not os.path.exists(path)
+
+
+def test_state_copes_with_the_worker_accounting_failover_time(server):
+    import threading
+
+    from failover import Failover
+
+    ssids = ["Home"] + [f"Backup {i}" for i in range(500)]
+    failover = server.monitor.failover = Failover(server.monitor.backend, ssids, notify=lambda message: None)
+    stop = threading.Event()
+
+    def account():
+        # Each new network adds a key to time_on while state() copies it
+        i = 0
+        while not stop.is_set():
+            failover._account(ssids[i % len(ssids)], float(i))
+            i += 1
+    worker = threading.Thread(target=account)
+    worker.start()
+    try:
+        for _ in range(200):
+            assert server.state()["targets"][0] == "Home"
+    finally:
+        stop.set()
+        worker.join()
+
+
+@pytest.mark.parametrize("request_args", [{"ssids": "Home"}, {"ssids": []}, {"ssids": ["Home", 5]}, {"ssid": None}])
+def test_set_target_rejects_anything_but_a_list_of_ssids(server, request_args):
+    client = ControlClient(server.path)
+    try:
+        assert not client.request("set_target", **request_args)["ok"]
+        assert client.request("set_target", ssids=["Home", "Backup"])["ok"]
+    finally:
+        client.close()
+
+
+def test_subscriber_that_stops_reading_is_dropped_without_stalling_events(server):
+    stalled = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stalled.connect(server.path)
+    stalled.sendall(b'{"cmd": "subscribe"}\n')
+    deadline = time.monotonic() + 2
+    while not server.subscribers and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert server.subscribers
+    started = time.monotonic()
+    # Far more than the socket buffers and the push queue can hold
+    for i in range(2000):
+        server.monitor.emit(f"event {i} " + "x" * 10000)
+    assert time.monotonic() - started < 2
+    deadline = time.monotonic() + 2
+    while server.subscribers and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not server.subscribers
+    stalled.close()
+
+
+def test_subscriber_receives_pushed_events(server):
+    received = []
+    client = ControlClient(server.path)
+    try:
+        client.subscribe(received.append)
+        deadline = time.monotonic() + 2
+        while not server.subscribers and time.monotonic() < deadline:
+            time.sleep(0.01)
+        server.monitor.emit("hello")
+        while not any("event" in message for message in received) and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        client.close()
+    assert received[0]["ok"]
+    assert json.dumps(received).count("hello") == 1
+
+
+@pytest.mark.parametrize("count", [0, -1, "5", 1.5, True])
+def test_events_rejects_anything_but_a_positive_count(server, count):
+    client = ControlClient(server.path)
+    try:
+        assert not client.request("events", count=count)["ok"]
+        for i in range(3):
+            server.monitor.emit(f"event {i}")
+        events = client.request("events", count=2)["events"]
+        assert [event["message"] for event in events] == ["event 1", "event 2"]
+    finally:
+        client.close()
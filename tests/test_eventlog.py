@@ -0,0 +1,81 @@
+import json
+import os
+
+from eventlog import EventLog
+
+
+def test_rotation_counts_bytes_for_non_ascii_ssids(tmp_path):
+    path = str(tmp_path / "events.jsonl")
+    log = EventLog(path=path, max_bytes=2000, backups=2)
+    for i in range(200):
+        log.emit(f"Connected to Café Ωmega ☕ {i} " + "Ω" * 300, ssid="Café Ωmega ☕")
+    log.close()
+    for name in (path, path + ".1", path + ".2"):
+        assert os.path.getsize(name) <= 2000
+    with open(path, encoding="utf-8") as f:
+        assert json.loads(f.readline())["ssid"] == "Café Ωmega ☕"
+
+
+class FullDisk:
+    def write(self, data):
+        raise OSError(28, "No space left on device")
+
+    def flush(self):
+        pass
+
+    def tell(self):
+        return 0
+
+    def close(self):
+        pass
+
+
+def test_a_full_disk_is_reported_once_and_events_stay_in_memory(tmp_path):
+    messages = []
+    log = EventLog(path=str(tmp_path / "events.jsonl"), notify=messages.append)
+    log.writer._file = FullDisk()
+    for i in range(3):
+        log.emit(f"event {i}")
+    assert len(messages) == 1 and "No space left" in messages[0]
+    assert [event.message for event in log.recent()] == ["event 0", "event 1", "event 2"]
+
+
+def test_a_failing_listener_does_not_reach_the_caller():
+    messages, received = [], []
+
+    def broken(event):
+        raise BrokenPipeError(32, "Broken pipe")
+
+    log = EventLog(notify=messages.append)
+    log.subscribe(broken)
+    log.subscribe(received.append)
+    log.emit("one")
+    log.emit("two")
+    assert [event.message for event in received] == ["one", "two"]
+    assert len(messages) == 1
+
+
+def test_monitor_worker_survives_an_unwritable_log(tmp_path):
+    import time
+
+    from backends import FakeBackend
+    from monitor import ConnectionMonitor
+    from parsers import ScanRecord
+
+    log = EventLog(path=str(tmp_path / "events.jsonl"), notify=lambda message: None)
+    log.writer._file = FullDisk()
+    backend = FakeBackend([ScanRecord("Home", "aa:aa:aa:aa:aa:aa", 70)])
+
+    def unplugged():
+        raise RuntimeError("adapter vanished")
+
+    backend.query_snapshot = unplugged
+    monitor = ConnectionMonitor(backend, interval=0.01, log=log, roaming=None)
+    monitor.target_ssid = "Home"
+    monitor.start()
+    try:
+        time.sleep(0.1)
+        assert monitor._thread.is_alive()
+    finally:
+        monitor.stop(timeout=1)
+    assert any(event.kind == "error" for event in log.recent())
@@ -0,0 +1,87 @@
+from backends import FakeBackend
+from eventlog import EventLog
+from failover import FailoverPolicy
+from metrics import Metrics
+from monitor import ConnectionMonitor
+from parsers import ScanRecord
+from simulation import VirtualClock
+
+
+class DeadSpotBackend(FakeBackend):
+    """FakeBackend where connecting to an unreachable SSID drops the link"""
+
+    def __init__(self, networks, unreachable=()):
+        super().__init__(networks)
+        self.unreachable = set(unreachable)
+
+    def connect(self, ssid, bssid=None):
+        if ssid in self.unreachable:
+            self.actions.append("connect")
+            self.link = None
+            self.invalidate()
+            return
+        super().connect(ssid, bssid)
+
+
+def monitor_on_fallback(unreachable=()):
+    """A monitor that has held Backup, a fallback, for longer than the stability window"""
+    clock = VirtualClock(1000.0)
+    backend = DeadSpotBackend([ScanRecord("Home", "aa:aa:aa:aa:aa:aa", 70),
+                               ScanRecord("Backup", "bb:bb:bb:bb:bb:bb", 50)], unreachable)
+    backend.clock = clock
+    backend.metrics = Metrics(clock=clock)
+    backend.link = ("Backup", "bb:bb:bb:bb:bb:bb", 50)
+    monitor = ConnectionMonitor(backend, interval=None, log=EventLog(), roaming=None, clock=clock,
+                                sleep=clock.sleep, failover=FailoverPolicy(stability_window=300))
+    monitor.set_targets(["Home", "Backup"])
+    func, _ = monitor._jobs.get()
+    func()
+    backend.scan()
+    monitor._jobs.get()  # the wake queued by set_targets
+    monitor.check_once()
+    clock.now += 301
+    backend.scan()
+    return monitor, backend
+
+
+def kinds(monitor):
+    return [event.kind for event in monitor.log.recent()]
+
+
+def test_failback_is_one_plain_connect():
+    monitor, backend = monitor_on_fallback()
+    monitor.check_once()
+    assert backend.actions == ["connect"]
+    assert backend.link[0] == "Home"
+    assert monitor.target_ssid == "Home"
+    assert "failback" in kinds(monitor)
+    assert "mismatch" not in kinds(monitor)
+    assert not monitor.reconnect_stats.samples and monitor.reconnect_stats.failures == 0
+    assert monitor.ladder.last_failure is None and monitor.ladder.level == 0
+    text = backend.metrics.render()
+    assert "wifi_link_events_total{" not in text
+    assert "wifi_reconnects_total{" not in text
+
+
+def test_failed_failback_returns_to_the_fallback():
+    monitor, backend = monitor_on_fallback(unreachable={"Home"})
+    monitor.check_once()
+    assert backend.actions == ["connect", "connect"]
+    assert backend.link[0] == "Backup"
+    assert monitor.target_ssid == "Backup"
+    assert not monitor.reconnect_stats.samples and monitor.reconnect_stats.failures == 0
+    assert monitor.ladder.last_failure is None
+    # Home now cools down, so the next checks stay on Backup without touching the link
+    monitor.check_once()
+    assert backend.actions == ["connect", "connect"]
+
+
+def test_time_off_preferred_is_exported():
+    from control import ControlServer
+
+    monitor, backend = monitor_on_fallback(unreachable={"Home"})
+    monitor.check_once()
+    assert 'wifi_time_off_preferred_seconds_total{interface="wlan0"} 301' in backend.metrics.render()
+    state = ControlServer(monitor, path=None).state()
+    assert state["time_off_preferred"] == 301
+    assert state["time_on"] == {"Backup": 301}
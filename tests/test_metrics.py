@@ -0,0 +1,40 @@
+from metrics import Metrics
+
+
+def test_slow_actions_land_in_finite_buckets():
+    metrics = Metrics()
+    metrics.observe_action("connect", 12.0)
+    metrics.observe_action("disable", 0.2)
+    text = metrics.render()
+    assert 'wifi_action_seconds_bucket{action="connect",le="10"} 0' in text
+    assert 'wifi_action_seconds_bucket{action="connect",le="20"} 1' in text
+    assert 'wifi_toggles_total{kind="radio"} 1' in text
+
+
+def test_probes_keep_their_fine_buckets():
+    metrics = Metrics()
+    metrics.observe_probe("snapshot", 0.004)
+    assert 'wifi_probe_seconds_bucket{probe="snapshot",le="0.005"} 1' in metrics.render()
+
+
+def test_large_counters_keep_every_digit():
+    clock = [0.0]
+    metrics = Metrics(clock=lambda: clock[0])
+    for _ in range(3):
+        metrics.checks.inc((("interface", "wlan0"),), 1234567)
+    metrics.downtime.inc((("interface", "wlan0"),), 3703700.25)
+    metrics.link_event("wlan0", "disconnect")
+    clock[0] = 1.5
+    metrics.observe_reconnect("wlan0", 1234567.125)
+    text = metrics.render()
+    assert 'wifi_checks_total{interface="wlan0"} 3703701\n' in text
+    assert 'wifi_downtime_seconds_total{interface="wlan0"} 3703701.75\n' in text
+    assert 'wifi_reconnect_seconds_sum{interface="wlan0"} 1234567.125\n' in text
+
+
+def test_pending_downtime_keeps_every_digit():
+    clock = [0.0]
+    metrics = Metrics(clock=lambda: clock[0])
+    metrics.link_event("wlan0", "disconnect")
+    clock[0] = 3703701.5
+    assert 'wifi_downtime_seconds_total{interface="wlan0"} 3703701.5\n' in metrics.render()
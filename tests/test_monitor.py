@@ -0,0 +1,179 @@
+import time
+
+from backends import FakeBackend
+from monitor import ConnectionMonitor
+from parsers import ScanRecord
+
+FRAME = 1 / 60
+
+
+class SlowBackend(FakeBackend):
+    """FakeBackend whose every probe blocks like a slow netsh/nmcli call"""
+
+    def __init__(self, delay, sleep=time.sleep):
+        super().__init__([ScanRecord("Home", "aa:aa:aa:aa:aa:aa", 70, 6, "2.4GHz", "WPA2")])
+        self.delay = delay
+        self.sleep = sleep
+        self.link = ("Home", "aa:aa:aa:aa:aa:aa", 70)
+        self.probes = 0
+
+    def query_snapshot(self):
+        self.probes += 1
+        self.sleep(self.delay)
+        return super().query_snapshot()
+
+
+def run_frames(duration, on_frame):
+    """Drive a 60 fps loop like the Kivy clock; return the worst frame overrun in seconds"""
+    worst = 0.0
+    last = time.monotonic()
+    deadline = last + duration
+    while last < deadline:
+        on_frame()
+        time.sleep(FRAME)
+        now = time.monotonic()
+        worst = max(worst, now - last - FRAME)
+        last = now
+    return worst
+
+
+def test_slow_probes_block_frames_when_run_on_the_ui_thread():
+    backend = SlowBackend(delay=0.2)
+    monitor = ConnectionMonitor(backend, interval=None, roaming=None)
+    monitor.target_ssid = "Home"
+    assert run_frames(0.3, monitor.check_once) >= 0.15
+
+
+def test_slow_probes_do_not_delay_ui_frames():
+    backend = SlowBackend(delay=0.2)
+    monitor = ConnectionMonitor(backend, interval=0.05, roaming=None)
+    monitor.target_ssid = "Home"
+    monitor.start()
+    try:
+        # What the GUI does from the UI thread: request checks and queue jobs
+        worst = run_frames(1.0, lambda: (monitor.wake(), monitor.submit(lambda: None)))
+    finally:
+        monitor.stop(timeout=2)
+    assert backend.probes >= 2
+    assert worst < 0.1
+
+
+def test_scripted_event_stream_wakes_checks_and_falls_back_to_polling():
+    backend = FakeBackend([ScanRecord("Home", "aa:aa:aa:aa:aa:aa", 70, 6, "2.4GHz", "WPA2")])
+    backend.link = ("Home", "aa:aa:aa:aa:aa:aa", 70)
+    monitor = ConnectionMonitor(backend, interval=30, event_interval=60, roaming=None)
+    monitor.target_ssid = "Home"
+    checks = []
+    monitor.log.subscribe(lambda event: event.kind == "status" and checks.append(event.timestamp))
+    # Stands in for `nmcli device monitor`: two state changes, noise, then the stream ends
+    script = ("sleep 0.3; echo 'wlan0: disconnected'; echo 'wlan0: using connection Home'; "
+              "sleep 0.3; echo 'wlan0: connected'; sleep 0.3")
+    assert monitor.watch_events(["sh", "-c", script])
+    assert monitor.current_interval() == 60
+    monitor.start()
+    try:
+        deadline = time.monotonic() + 3
+        while monitor.watcher.is_alive() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        time.sleep(0.2)
+    finally:
+        monitor.stop(timeout=2)
+    # Both link events and the end of the stream woke a check long before the 30 s poll
+    assert len(checks) >= 2
+    assert not monitor.watcher.is_alive()
+    assert monitor.current_interval() == 30
+
+
+def run_jobs(monitor):
+    """Run every queued job on the calling thread, as the worker would"""
+    while not monitor._jobs.empty():
+        func, on_done = monitor._jobs.get()
+        result = func()
+        if on_done:
+            on_done(result)
+
+
+def test_set_target_leaves_a_healthy_link_alone():
+    backend = FakeBackend([ScanRecord("Home", "aa:aa:aa:aa:aa:aa", 70)])
+    backend.link = ("Home", "aa:aa:aa:aa:aa:aa", 70)
+    monitor = ConnectionMonitor(backend, roaming=None)
+    monitor.set_target("Home")
+    run_jobs(monitor)
+    assert backend.actions == []
+    assert not monitor.reconnect_stats.samples
+    assert monitor.ladder.level == 0
+
+
+def test_set_target_connects_when_on_another_network():
+    backend = FakeBackend([ScanRecord("Home", "aa:aa:aa:aa:aa:aa", 70), ScanRecord("Cafe", "bb:bb:bb:bb:bb:bb", 50)])
+    backend.link = ("Cafe", "bb:bb:bb:bb:bb:bb", 50)
+    monitor = ConnectionMonitor(backend, roaming=None)
+    monitor.set_target("Home")
+    run_jobs(monitor)
+    assert backend.actions == ["connect"]
+    assert backend.link[0] == "Home"
+    assert len(monitor.reconnect_stats.samples) == 1
+
+
+def test_supervisor_records_one_combined_outcome_per_tick():
+    from monitor import Supervisor
+    from scheduler import AdaptiveInterval
+
+    schedule = AdaptiveInterval(start=10, min_interval=2, max_interval=60, jitter=0)
+    supervisor = Supervisor(FakeBackend(), [("wlan0", "Home"), ("wlan1", "Backhaul")], interval=schedule,
+                            roaming=None)
+    assert all(monitor.schedule is None for monitor in supervisor.monitors.values())
+    supervisor.monitors["wlan0"].backend.link = ("Home", "aa:aa:aa:aa:aa:aa", 70)
+    supervisor.monitors["wlan1"].backend.link = ("Backhaul", "bb:bb:bb:bb:bb:bb", 60)
+    supervisor.tick()
+    assert schedule.interval == 15
+    supervisor.monitors["wlan1"].backend.link = None
+    supervisor.tick()
+    assert schedule.interval == 2
+    assert len(schedule.failures) == 1
+
+
+def test_failing_checks_wait_a_full_interval():
+    class BrokenBackend(FakeBackend):
+        def query_snapshot(self):
+            raise ValueError("probe exploded")
+
+    monitor = ConnectionMonitor(BrokenBackend(), interval=0.1, roaming=None)
+    monitor.target_ssid = "Home"
+    monitor.start()
+    time.sleep(0.5)
+    monitor.stop(timeout=2)
+    errors = [event for event in monitor.log.recent() if event.kind == "error"]
+    assert 1 <= len(errors) <= 10
+
+
+def test_event_wake_checks_past_the_probe_cache():
+    from simulation import VirtualClock
+
+    clock = VirtualClock()
+    backend = FakeBackend([ScanRecord("Home", "aa:aa:aa:aa:aa:aa", 70)], ttl=1.0)
+    backend.clock = clock
+    backend.link = ("Home", "aa:aa:aa:aa:aa:aa", 70)
+    monitor = ConnectionMonitor(backend, interval=60, roaming=None, clock=clock, sleep=clock.sleep)
+    monitor.target_ssid = "Home"
+    monitor.check_once()
+    # The link drops and the OS says so well within the snapshot TTL
+    backend.link = None
+    monitor.wake("wlan0: disconnected")
+    monitor.submit(monitor.stop)
+    monitor.run()
+    assert backend.actions == ["connect"]
+    assert any(event.kind == "disconnect" for event in monitor.log.recent())
+
+
+def test_set_backend_attaches_a_backend_between_jobs():
+    monitor = ConnectionMonitor(interval=None, roaming=None)
+    monitor.target_ssid = "Home"
+    monitor.check_once()
+    backend = FakeBackend([ScanRecord("Home", "aa:aa:aa:aa:aa:aa", 70)])
+    monitor.set_backend(backend)
+    assert monitor.backend is None
+    run_jobs(monitor)
+    assert monitor.backend is backend and monitor.ladder.backend is backend
+    monitor.check_once()
+    assert backend.link[0] == "Home"
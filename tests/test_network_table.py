@@ -0,0 +1,78 @@
+from network_table import diff_rows, network_rows, select_rows
+from parsers import ScanRecord
+
+SCAN = [
+    ScanRecord("Cafe", "cc:cc:cc:cc:cc:01", 40, 6),
+    ScanRecord("Home", "aa:aa:aa:aa:aa:02", 55, 36),
+    ScanRecord("Home", "aa:aa:aa:aa:aa:01", 80, 6),
+    ScanRecord("", "dd:dd:dd:dd:dd:01", None),
+]
+
+
+def keys(rows):
+    return [row["key"] for row in rows]
+
+
+def test_rows_group_bssids_under_their_ssid_strongest_first():
+    rows = network_rows(SCAN)
+    assert keys(rows) == [
+        ("ssid", "Home"), ("bssid", "Home", "aa:aa:aa:aa:aa:01"), ("bssid", "Home", "aa:aa:aa:aa:aa:02"),
+        ("ssid", "Cafe"), ("bssid", "Cafe", "cc:cc:cc:cc:cc:01"),
+        ("ssid", ""), ("bssid", "", "dd:dd:dd:dd:dd:01"),
+    ]
+    assert (rows[0]["bssid"], rows[0]["signal"], rows[3]["bssid"]) == ("2 BSSIDs", 80, "1 BSSID")
+    assert rows[5]["name"] == "<hidden>"
+
+
+def test_diff_counts_added_removed_and_updated_rows_by_key():
+    current = network_rows(SCAN)
+    home = current[0]
+    scan = [record._replace(signal=70) if record.bssid == "aa:aa:aa:aa:aa:02" else record
+            for record in SCAN if record.ssid != "Cafe"] + [ScanRecord("Office", "ee:ee:ee:ee:ee:01", 20)]
+    diff = diff_rows(current, network_rows(scan))
+    assert (diff.added, diff.removed, diff.updated) == (2, 2, 1)
+    assert not diff.reordered and diff.changed
+    # Rows that stayed are the same dicts, updated in place
+    assert diff.rows[0] is home
+    assert diff.rows[2]["signal"] == 70
+
+
+def test_diff_of_an_unchanged_scan_changes_nothing():
+    current = network_rows(SCAN)
+    diff = diff_rows(current, network_rows(list(reversed(SCAN))))
+    assert not diff.changed
+    assert all(a is b for a, b in zip(diff.rows, current))
+
+
+def test_diff_flags_a_pure_reorder():
+    current = network_rows(SCAN)
+    scan = [record._replace(signal=90) if record.ssid == "Cafe" else record for record in SCAN]
+    diff = diff_rows(current, network_rows(scan))
+    # The Cafe SSID row and its BSSID row both changed signal
+    assert (diff.added, diff.removed, diff.updated) == (0, 0, 2)
+    assert diff.reordered
+    assert keys(diff.rows)[:2] == [("ssid", "Cafe"), ("bssid", "Cafe", "cc:cc:cc:cc:cc:01")]
+
+
+def test_select_rows_marks_only_the_ssid_row():
+    rows = network_rows(SCAN)
+    assert select_rows(rows, "Cafe") == 1
+    assert [row["key"] for row in rows if row["selected"]] == [("ssid", "Cafe")]
+    assert select_rows(rows, "Home") == 2
+    assert select_rows(rows, "Home") == 0
+
+
+def test_selection_survives_a_refresh_that_changes_the_selected_networks_rows():
+    current = network_rows(SCAN)
+    select_rows(current, "Home")
+    # Home lost one access point, gained another and its best signal moved
+    scan = [ScanRecord("Cafe", "cc:cc:cc:cc:cc:01", 40, 6), ScanRecord("Home", "aa:aa:aa:aa:aa:01", 60, 6),
+            ScanRecord("Home", "aa:aa:aa:aa:aa:03", 30, 11)]
+    # The refresh as the GUI does it: build, reapply the selection, then merge
+    rows = network_rows(scan)
+    select_rows(rows, "Home")
+    diff = diff_rows(current, rows)
+    assert (diff.added, diff.removed) == (1, 3)
+    home = next(row for row in diff.rows if row["key"] == ("ssid", "Home"))
+    assert home["selected"] and home["signal"] == 60
+    assert [row["ssid"] for row in diff.rows if row["selected"]] == ["Home"]
@@ -0,0 +1,102 @@
+import os
+
+from backends import LinkSnapshot, MacBackend, NmcliBackend, WindowsBackend
+from parsers import (ScanRecord, dbm_to_percent, normalize_bssid, parse_airport_scan, parse_netsh_interfaces,
+                     parse_netsh_networks, parse_nmcli_scan, split_terse)
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def fixture(name):
+    with open(os.path.join(FIXTURES, name)) as f:
+        return f.read()
+
+
+class CannedBackend:
+    """Mixin answering run() with a recorded fixture"""
+
+    output = ""
+
+    def run(self, argv):
+        return self.output
+
+
+def test_split_terse_honours_escaped_colons():
+    assert split_terse("Cafe\\: Guest:AA\\:BB:20") == ["Cafe: Guest", "AA:BB", "20"]
+    assert split_terse("a:b::") == ["a", "b", "", ""]
+
+
+def test_normalize_bssid_pads_and_lowercases():
+    assert normalize_bssid("AA:B:cc:D:ee:1") == "aa:0b:cc:0d:ee:01"
+    assert normalize_bssid("aa:bb:cc:dd:ee:01") == "aa:bb:cc:dd:ee:01"
+    assert normalize_bssid("") is None
+    assert normalize_bssid(None) is None
+
+
+def test_netsh_networks():
+    records = list(parse_netsh_networks(fixture("netsh_networks.txt").split('\n')))
+    assert records == [
+        ScanRecord("Home Network", "aa:bb:cc:dd:ee:01", 88, 36, "5 GHz", "WPA2-Personal"),
+        ScanRecord("Home Network", "aa:bb:cc:dd:ee:02", 41, 6, "2.4 GHz", "WPA2-Personal"),
+        ScanRecord("Cafe: Guest", "aa:bb:cc:dd:ee:03", 20, 11, "2.4 GHz", "Open"),
+        ScanRecord("", "aa:bb:cc:dd:ee:04", 55, 37, "6 GHz", "WPA2-Personal"),
+        ScanRecord("Office 5G", "aa:bb:cc:dd:ee:05", 73, 149, "5 GHz", "WPA3-Personal"),
+    ]
+
+
+def test_netsh_interfaces():
+    blocks = list(parse_netsh_interfaces(fixture("netsh_interfaces.txt").split('\n')))
+    assert [block["Name"] for block in blocks] == ["Wi-Fi", "Wi-Fi 2"]
+    assert blocks[0]["Physical address"] == "11:22:33:44:55:66"
+    assert WindowsBackend.block_snapshot(blocks[0]) == LinkSnapshot(True, "Home Network", "aa:bb:cc:dd:ee:01", 88)
+    assert WindowsBackend.block_snapshot(blocks[1]) == LinkSnapshot(powered=True)
+
+
+def test_windows_snapshots_cover_every_interface():
+    class Backend(CannedBackend, WindowsBackend):
+        output = fixture("netsh_interfaces.txt")
+    found = Backend().query_snapshots()
+    assert set(found) == {"Wi-Fi", "Wi-Fi 2"}
+    assert found["Wi-Fi"].ssid == "Home Network"
+
+
+def test_airport_scan():
+    records = list(parse_airport_scan(fixture("airport_scan.txt").split('\n')))
+    assert [(r.ssid, r.bssid, r.channel, r.band, r.security) for r in records] == [
+        ("Home Network", "aa:bb:cc:dd:ee:01", 36, "5 GHz", "WPA2(PSK/AES/AES)"),
+        ("Home Network", "aa:bb:cc:dd:ee:02", 6, "2.4 GHz", "WPA2(PSK/AES/AES)"),
+        ("Cafe: Guest", "aa:bb:cc:dd:ee:03", 11, "2.4 GHz", "NONE"),
+        ("Office 5G", "aa:bb:cc:dd:ee:05", 149, "5 GHz", "WPA3(SAE/AES/AES)"),
+        ("Guest Annex", "aa:bb:cc:0d:ee:06", 1, "2.4 GHz", "WPA2(PSK/AES/AES)"),
+    ]
+    assert records[0].signal == dbm_to_percent(-56)
+
+
+def test_airport_info():
+    class Backend(CannedBackend, MacBackend):
+        output = fixture("airport_info.txt")
+    assert Backend().query_snapshot() == LinkSnapshot(True, "Home Network", "aa:bb:cc:dd:ee:01", dbm_to_percent(-56))
+
+
+def test_nmcli_scan():
+    records = list(parse_nmcli_scan(fixture("nmcli_scan.txt").split('\n')))
+    assert records == [
+        ScanRecord("Home Network", "aa:bb:cc:dd:ee:01", 88, 36, "5 GHz", "WPA2"),
+        ScanRecord("Home Network", "aa:bb:cc:dd:ee:02", 41, 6, "2.4 GHz", "WPA2"),
+        ScanRecord("Cafe: Guest", "aa:bb:cc:dd:ee:03", 20, 11, "2.4 GHz", None),
+        ScanRecord("", "aa:bb:cc:dd:ee:04", 55, 37, "6 GHz", "WPA2"),
+        ScanRecord("Office 5G", "aa:bb:cc:dd:ee:05", 73, 149, "5 GHz", "WPA1 WPA2"),
+    ]
+
+
+def test_nmcli_snapshots_pick_the_active_row_per_device():
+    class Backend(CannedBackend, NmcliBackend):
+        output = fixture("nmcli_links.txt")
+
+        def interfaces(self):
+            return ["wlan0", "wlan1"]
+    found = Backend(interface="wlan0").query_snapshots()
+    assert found == {
+        "wlan0": LinkSnapshot(True, "Home Network", "aa:bb:cc:dd:ee:01", 88),
+        "wlan1": LinkSnapshot(True, "Cafe: Guest", "aa:bb:cc:dd:ee:03", 35),
+    }
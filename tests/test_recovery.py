@@ -0,0 +1,158 @@
+from backends import FakeBackend
+from parsers import ScanRecord
+from recovery import ReconnectStats, RecoveryLadder, RecoveryStep, wait_until
+from simulation import VirtualClock
+
+HOME = ScanRecord("Home", "aa:aa:aa:aa:aa:aa", 70)
+
+
+def make_ladder(networks=(HOME,), **kwargs):
+    clock = VirtualClock(1000.0)
+    backend = FakeBackend(networks)
+    backend.clock = clock
+    ladder = RecoveryLadder(backend, notify=lambda message: None, clock=clock, sleep=clock.sleep, **kwargs)
+    return ladder, backend, clock
+
+
+def test_failed_climb_restarts_from_the_bottom_and_backs_off_the_cycles():
+    ladder, backend, clock = make_ladder(networks=())
+    assert not ladder.recover("Home")
+    # FakeBackend's interface cycle is a power cycle too
+    assert backend.actions.count("disable") == 2
+    assert ladder.level == 0
+
+    backend.actions.clear()
+    clock.sleep(10)
+    assert not ladder.recover("Home")
+    assert backend.actions and backend.actions[0] == "connect"
+    assert "disable" not in backend.actions
+
+    # Once the backoff has passed the whole ladder runs again, and the next backoff is longer
+    backend.actions.clear()
+    clock.sleep(60)
+    assert not ladder.recover("Home")
+    assert "disable" in backend.actions
+    assert ladder.retry_at - clock() == 120
+
+
+def test_success_after_a_failed_climb_clears_the_backoff():
+    ladder, backend, clock = make_ladder(networks=())
+    ladder.recover("Home")
+    backend.networks = [HOME]
+    backend.actions.clear()
+    assert ladder.recover("Home")
+    assert backend.actions == ["connect"]
+    assert ladder.retry_at is None and ladder.failed_climbs == 0
+
+
+def drop(backend):
+    backend.link = None
+    backend.invalidate()
+
+
+def test_single_blip_is_fixed_with_a_plain_connect():
+    ladder, backend, clock = make_ladder()
+    drop(backend)
+    assert ladder.recover("Home")
+    assert backend.actions == ["connect"]
+    assert ladder.level == 1
+
+
+def test_repeated_flaps_within_the_episode_escalate():
+    messages = []
+    ladder, backend, clock = make_ladder()
+    ladder.notify = messages.append
+    for expected_level, expected_step in ((1, "connect"), (2, "connect_bssid"), (3, "rescan_connect")):
+        drop(backend)
+        assert ladder.recover("Home")
+        assert ladder.level == expected_level
+        assert messages[-1].endswith(expected_step)
+        ladder.note_healthy(backend.snapshot())
+        clock.sleep(30)
+    assert backend.actions[-2:] == ["rescan", "connect"]
+
+
+def test_note_healthy_closes_the_episode_after_the_window():
+    ladder, backend, clock = make_ladder(episode_window=300)
+    drop(backend)
+    ladder.recover("Home")
+    clock.sleep(299)
+    ladder.note_healthy(backend.snapshot())
+    assert ladder.level == 1 and ladder.episode_started is not None
+    clock.sleep(1)
+    ladder.note_healthy(backend.snapshot())
+    assert ladder.level == 0 and ladder.episode_started is None
+    # The next blip is a fresh episode and starts with a plain connect again
+    backend.actions.clear()
+    drop(backend)
+    assert ladder.recover("Home")
+    assert backend.actions == ["connect"] and ladder.level == 1
+
+
+def test_rungs_without_a_backend_capability_are_skipped():
+    ladder, backend, clock = make_ladder(networks=())
+    backend.capabilities = frozenset({"interface"})
+    assert [step.name for step in ladder.available_steps()] == ["connect", "interface_cycle"]
+    ladder.recover("Home")
+    assert "rescan" not in backend.actions
+    assert backend.actions.count("disable") == 1
+
+
+class StuckRadio(FakeBackend):
+    """A radio that ignores being switched off, an interface that never comes back up, and no network"""
+
+    def disable(self):
+        self.actions.append("disable")
+
+    def interface_up(self):
+        self.actions.append("interface_up")
+
+    interface_down = FakeBackend.disable
+
+
+def test_cycle_steps_finish_within_their_timeout():
+    for step in (RecoveryStep("radio_cycle", 30), RecoveryStep("interface_cycle", 40)):
+        clock = VirtualClock(1000.0)
+        backend = StuckRadio()
+        backend.clock = clock
+        ladder = RecoveryLadder(backend, [step], notify=lambda message: None, clock=clock, sleep=clock.sleep)
+        assert not ladder.recover("Home")
+        assert clock() - 1000.0 <= step.timeout
+
+
+def test_wait_until_backs_off_and_stops_at_the_deadline():
+    clock = VirtualClock(0.0)
+    polls = []
+
+    def never():
+        polls.append(clock())
+        return False
+
+    assert not wait_until(never, 5, initial_delay=0.5, max_delay=2.0, sleep=clock.sleep, clock=clock)
+    # Delays double up to max_delay; the last sleep is cut short at the deadline
+    assert polls == [0.0, 0.5, 1.5, 3.5, 5.0]
+    assert clock() == 5.0
+
+
+def test_wait_until_returns_as_soon_as_the_condition_holds():
+    clock = VirtualClock(0.0)
+    assert wait_until(lambda: clock() >= 1.5, 10, initial_delay=0.5, sleep=clock.sleep, clock=clock)
+    assert clock() == 1.5
+    assert wait_until(lambda: True, 0, sleep=clock.sleep, clock=clock)
+
+
+def test_reconnect_percentiles_use_the_nearest_rank():
+    stats = ReconnectStats()
+    assert stats.percentile(50) is None
+    for seconds in (5.0, 1.0, 3.0, 2.0, 4.0):
+        stats.record(seconds)
+    assert stats.percentile(50) == 3.0
+    assert stats.percentile(95) == 5.0
+    assert stats.percentile(20) == 1.0
+    assert stats.percentile(21) == 2.0
+    for seconds in range(6, 21):
+        stats.record(float(seconds))
+    # 20 samples: p95 is the 19th, not the maximum
+    assert stats.percentile(95) == 19.0
+    stats.record_failure()
+    assert stats.summary() == "p50 10.0s, p95 19.0s over 20 reconnects, 1 failed"
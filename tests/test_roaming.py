@@ -0,0 +1,93 @@
+from backends import FakeBackend, LinkSnapshot
+from metrics import Metrics
+from parsers import ScanRecord
+from roaming import RoamPolicy, Roamer
+from simulation import VirtualClock
+
+
+def weak_link(candidate_signal):
+    """A link on AP a reading 30% in the snapshot but 50% in the scan, and AP b at candidate_signal"""
+    backend = FakeBackend([ScanRecord("Home", "aa:aa:aa:aa:aa:aa", 50),
+                           ScanRecord("Home", "bb:bb:bb:bb:bb:bb", candidate_signal)])
+    backend.link = ("Home", "aa:aa:aa:aa:aa:aa", 30)
+    backend.scan()
+    clock = VirtualClock()
+    roamer = Roamer(backend, RoamPolicy(), notify=lambda message: None, clock=clock, sleep=clock.sleep)
+    return backend, roamer, clock
+
+
+def consider_until_sustained(roamer, backend, clock):
+    roamer.consider("Home", backend.snapshot())
+    clock.now += RoamPolicy().sustain
+    return roamer.consider("Home", backend.snapshot())
+
+
+def test_candidates_are_compared_with_the_scan_reading_of_the_current_bssid():
+    # 60 beats the snapshot's 30 by more than the hysteresis but the scan's 50 by less
+    backend, roamer, clock = weak_link(60)
+    assert not consider_until_sustained(roamer, backend, clock)
+    assert backend.actions == []
+
+
+def test_roam_connect_is_timed():
+    backend, roamer, clock = weak_link(80)
+    backend.metrics = Metrics()
+    assert consider_until_sustained(roamer, backend, clock)
+    assert backend.link[1] == "bb:bb:bb:bb:bb:bb"
+    assert 'wifi_action_seconds_count{action="connect"} 1' in backend.metrics.render()
+
+
+def on_a(signal):
+    return LinkSnapshot(True, "Home", "aa:aa:aa:aa:aa:aa", signal)
+
+
+def test_no_roam_before_the_link_has_been_weak_for_sustain_seconds():
+    backend, roamer, clock = weak_link(80)
+    assert not roamer.consider("Home", on_a(30))
+    clock.now += RoamPolicy().sustain - 1
+    assert not roamer.consider("Home", on_a(30))
+    assert backend.actions == []
+    clock.now += 1
+    assert roamer.consider("Home", on_a(30))
+
+
+def test_one_strong_sample_restarts_the_weak_streak():
+    backend, roamer, clock = weak_link(80)
+    sustain = RoamPolicy().sustain
+    roamer.consider("Home", on_a(30))
+    clock.now += sustain / 2
+    roamer.consider("Home", on_a(RoamPolicy().threshold))
+    clock.now += sustain / 2
+    # Weak again, but only since just now
+    assert not roamer.consider("Home", on_a(30))
+    clock.now += sustain - 1
+    assert not roamer.consider("Home", on_a(30))
+    assert backend.actions == []
+    clock.now += 1
+    assert roamer.consider("Home", on_a(30))
+
+
+def test_no_second_roam_inside_dwell():
+    backend, roamer, clock = weak_link(80)
+    policy = RoamPolicy()
+    assert consider_until_sustained(roamer, backend, clock)
+    roamed_at = roamer.last_roam
+    # Back on the weak AP with the strong one still in the scan
+    backend.link = ("Home", "aa:aa:aa:aa:aa:aa", 30)
+    roamer.consider("Home", on_a(30))
+    clock.now = roamed_at + policy.dwell - 1
+    assert not roamer.consider("Home", on_a(30))
+    assert backend.actions == ["connect"]
+    clock.now = roamed_at + policy.dwell
+    assert roamer.consider("Home", on_a(30))
+    assert roamer.roams == 2
+
+
+def test_no_roam_to_a_candidate_inside_the_hysteresis_margin():
+    # The scan reads the current AP at 50
+    margin = RoamPolicy().hysteresis
+    backend, roamer, clock = weak_link(50 + margin - 1)
+    assert not consider_until_sustained(roamer, backend, clock)
+    assert backend.actions == []
+    backend, roamer, clock = weak_link(50 + margin)
+    assert consider_until_sustained(roamer, backend, clock)
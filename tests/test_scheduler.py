@@ -0,0 +1,40 @@
+from scheduler import AdaptiveInterval
+
+
+def test_stable_link_backs_off_to_the_ceiling():
+    schedule = AdaptiveInterval(start=10, max_interval=60, jitter=0)
+    schedule.record(True, 70)
+    assert schedule.interval == 15
+    for _ in range(10):
+        schedule.record(True, 70)
+    assert schedule.interval == 60
+
+
+def test_falling_signal_tightens_the_interval():
+    schedule = AdaptiveInterval(start=10, jitter=0)
+    schedule.record(True, 70)
+    schedule.record(True, 55)
+    assert schedule.interval == 10
+
+
+def test_failure_snaps_to_the_minimum_and_lowers_the_ceiling():
+    now = [0.0]
+    schedule = AdaptiveInterval(start=10, min_interval=2, max_interval=60, jitter=0, clock=lambda: now[0])
+    schedule.record(False)
+    assert schedule.interval == 2
+    assert schedule.ceiling() == 30
+    now[0] += 601
+    assert schedule.ceiling() == 60
+
+
+def test_monitor_runs_its_schedule_on_its_own_clock():
+    from monitor import ConnectionMonitor
+    from simulation import VirtualClock
+
+    clock = VirtualClock(5000.0)
+    schedule = AdaptiveInterval(flap_window=600)
+    ConnectionMonitor(interval=schedule, roaming=None, clock=clock)
+    schedule.record(False)
+    assert schedule.failures[-1] == 5000.0
+    clock.sleep(601)
+    assert schedule.ceiling() == schedule.max_interval
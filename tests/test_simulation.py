@@ -0,0 +1,50 @@
+import pytest
+
+from backends import FakeBackend
+from monitor import ConnectionMonitor
+from parsers import ScanRecord
+from simulation import STRATEGIES, Fault, VirtualClock, simulate
+
+TRACE = [Fault(100, "drop"), Fault(1000, "stuck")]
+
+
+def test_ladder_recovers_a_stuck_driver_that_connect_alone_cannot():
+    ladder = simulate(TRACE, STRATEGIES["ladder"], 10, hours=1, strategy="ladder")
+    connect = simulate(TRACE, STRATEGIES["connect"], 10, hours=1, strategy="connect")
+    assert (ladder.faults, ladder.unrecovered) == (2, 0)
+    assert ladder.downtime < 120
+    assert (connect.faults, connect.unrecovered) == (2, 1)
+    assert connect.downtime > 2500
+    # One wakeup per 10 s interval, less the time spent inside recoveries
+    assert 300 < ladder.wakeups <= 360
+
+
+def test_simulation_is_deterministic():
+    first = simulate(TRACE, STRATEGIES["ladder"], "adaptive", hours=1, seed=3)
+    assert simulate(TRACE, STRATEGIES["ladder"], "adaptive", hours=1, seed=3) == first
+
+
+def test_a_raising_check_waits_a_full_interval_on_virtual_time():
+    clock = VirtualClock()
+    backend = FakeBackend([ScanRecord("Home", "aa:aa:aa:aa:aa:aa", 70)])
+    backend.clock = clock
+    monitor = ConnectionMonitor(backend, interval=10, roaming=None, clock=clock, sleep=clock.sleep)
+    calls = []
+
+    def broken():
+        calls.append(clock())
+        if clock() >= 100:
+            monitor.stop()
+        raise RuntimeError("driver error")
+
+    backend.query_snapshot = broken
+    monitor.set_target("Home")
+    monitor.run()
+    assert calls == [10.0 * i for i in range(11)]
+    assert any(event.kind == "error" for event in monitor.log.recent())
+
+
+def test_virtual_clock_refuses_to_wait_forever():
+    monitor = ConnectionMonitor(FakeBackend(), interval=None, roaming=None, clock=VirtualClock())
+    with pytest.raises(RuntimeError):
+        monitor.run()